@@ -0,0 +1,557 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for KubeConfigManager against synthetic kubeconfigs.
+
+Usage:
+    python benchmark.py switch [--sizes 100,1000,5000]
+    python benchmark.py listing [--sizes 100,1000,5000]
+    python benchmark.py coldstart [--sizes 100,1000,5000]
+    python benchmark.py durability [--sizes 100,1000,5000] [--dir PATH]
+    python benchmark.py import [--sizes 10,50,200]
+    python benchmark.py nks [--sizes 4,16,64] [--delay 0.2]
+    python benchmark.py token [--repeat 5] [--delay 0.2]
+    python benchmark.py search [--sizes 1000,5000,20000]
+    python benchmark.py startup [--repeat 5]
+    python benchmark.py session [--sizes 100,1000,5000]
+    python benchmark.py current [--sizes 100,1000,5000]
+    python benchmark.py daemon [--sizes 100,1000,5000] [--processes 8]
+"""
+
+import argparse
+import base64
+import copy
+import os
+import shutil
+import statistics
+import stat
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import tracemalloc
+
+import yaml
+
+# Add current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from kube_config_daemon import DaemonManager, connect
+from kube_config_manager import DURABILITY_LEVELS, KubeConfigManager
+
+
+def make_config(num_contexts: int, cert_bytes: int = 1500) -> dict:
+    """Build a kubeconfig with one cluster and user per context and embedded certs."""
+    blob = base64.b64encode(os.urandom(cert_bytes)).decode('ascii')
+    return {
+        'apiVersion': 'v1',
+        'kind': 'Config',
+        'clusters': [{'name': f'cluster-{i}',
+                      'cluster': {'server': f'https://10.0.{i // 250}.{i % 250}:6443',
+                                  'certificate-authority-data': blob}}
+                     for i in range(num_contexts)],
+        'contexts': [{'name': f'context-{i}',
+                      'context': {'cluster': f'cluster-{i}', 'user': f'user-{i}',
+                                  'namespace': 'default'}}
+                     for i in range(num_contexts)],
+        'users': [{'name': f'user-{i}',
+                   'user': {'client-certificate-data': blob, 'client-key-data': blob}}
+                  for i in range(num_contexts)],
+        'current-context': 'context-0',
+    }
+
+
+def write_config(directory: str, num_contexts: int) -> str:
+    """Write a synthetic kubeconfig to directory and return its path."""
+    path = os.path.join(directory, f'config-{num_contexts}')
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.dump(make_config(num_contexts), f, Dumper=getattr(yaml, 'CSafeDumper', yaml.SafeDumper),
+                  default_flow_style=False)
+    return path
+
+
+def timed(func, repeat: int) -> float:
+    """Return the median wall time of func() in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def bench_switch(sizes, repeat):
+    """Compare a minimal-diff context switch with a full re-serialization.
+
+    'copy ms' is the floor under any switch that keeps the temp file and
+    atomic move: copying the unchanged file through _atomic_write(). It
+    grows with the file, and so does the splice, which stays close to it.
+    """
+    print(f"{'contexts':>10} {'file MB':>8} {'copy ms':>8} {'splice ms':>10} {'full dump ms':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = write_config(directory, size)
+            manager = KubeConfigManager(path)
+            manager.load_model()
+            targets = iter(f'context-{i % 2}' for i in range(10 ** 9))
+
+            def copy():
+                with open(path, 'rb') as f:
+                    copier._atomic_write((f, 0, os.fstat(f.fileno()).st_size))
+
+            copier = KubeConfigManager(path + '.copy', create=False)
+            copy_ms = timed(copy, repeat)
+
+            def full_dump():
+                model = manager.load_model().copy()
+                model.set_current_context(next(targets))
+                manager.save_model(model, rewrite=True)
+
+            splice_ms = timed(lambda: manager.set_current_context(next(targets)), repeat)
+            full_ms = timed(full_dump, repeat)
+
+            megabytes = os.path.getsize(path) / 1e6
+            print(f"{size:>10} {megabytes:>8.1f} {copy_ms:>8.2f} {splice_ms:>10.2f} {full_ms:>13.2f}")
+
+
+def cold_run(func):
+    """Return (milliseconds, peak traced MB) of one func() call."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = (time.perf_counter() - start) * 1000
+    peak = tracemalloc.get_traced_memory()[1] / 1e6
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench_listing(sizes, repeat):
+    """Compare the event-stream context listing with a full parse, both cold."""
+    print(f"{'contexts':>10} {'file MB':>8} {'listing ms':>11} {'full ms':>9} "
+          f"{'listing peak MB':>16} {'full peak MB':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = write_config(directory, size)
+
+            def listing():
+                KubeConfigManager(path, use_snapshot=False).get_context_listing()
+
+            def full():
+                KubeConfigManager(path, use_snapshot=False).load_model()
+
+            listing_ms = timed(listing, repeat)
+            full_ms = timed(full, repeat)
+            listing_peak = cold_run(listing)[1]
+            full_peak = cold_run(full)[1]
+
+            megabytes = os.path.getsize(path) / 1e6
+            print(f"{size:>10} {megabytes:>8.1f} {listing_ms:>11.1f} {full_ms:>9.1f} "
+                  f"{listing_peak:>16.1f} {full_peak:>13.1f}")
+
+
+def bench_coldstart(sizes, repeat):
+    """Compare a cold load from YAML with a cold load from the binary snapshot."""
+    print(f"{'contexts':>10} {'file MB':>8} {'yaml ms':>9} {'snapshot ms':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = write_config(directory, size)
+
+            yaml_ms = timed(lambda: KubeConfigManager(path, use_snapshot=False).load_model(), repeat)
+            KubeConfigManager(path).load_model()
+            snapshot_ms = timed(lambda: KubeConfigManager(path).load_model(), repeat)
+
+            megabytes = os.path.getsize(path) / 1e6
+            print(f"{size:>10} {megabytes:>8.1f} {yaml_ms:>9.1f} {snapshot_ms:>12.1f}")
+
+
+def bench_durability(sizes, repeat, directory=None):
+    """Time a context switch under each durability level, plus a no-op switch."""
+    print(f"{'contexts':>10} {'file MB':>8} {'durability':>10} {'write ms':>9} {'fsync ms':>9} "
+          f"{'no-op ms':>9}")
+    with tempfile.TemporaryDirectory(dir=directory) as directory:
+        for size in sizes:
+            path = write_config(directory, size)
+            for durability in DURABILITY_LEVELS:
+                manager = KubeConfigManager(path, durability=durability)
+                manager.load_model()
+                targets = iter(f'context-{i % 2}' for i in range(10 ** 9))
+                syncs = []
+
+                def switch():
+                    manager.set_current_context(next(targets))
+                    syncs.append(manager.last_write['sync_ms'])
+
+                write_ms = timed(switch, repeat)
+                current = manager.get_current_context()
+                noop_ms = timed(lambda: manager.set_current_context(current), repeat)
+
+                megabytes = os.path.getsize(path) / 1e6
+                print(f"{size:>10} {megabytes:>8.1f} {durability:>10} {write_ms:>9.2f} "
+                      f"{statistics.median(syncs):>9.2f} {noop_ms:>9.3f}")
+
+
+def write_import_files(directory: str, count: int) -> str:
+    """Write count single-context kubeconfigs (as handed out per cluster) and return their folder."""
+    folder = os.path.join(directory, f'import-{count}')
+    os.makedirs(folder)
+    template = make_config(1)
+    for i in range(count):
+        document = copy.deepcopy(template)
+        document['clusters'][0]['name'] = document['contexts'][0]['context']['cluster'] = f'imported-{i}'
+        document['users'][0]['name'] = document['contexts'][0]['context']['user'] = f'imported-{i}'
+        document['contexts'][0]['name'] = document['current-context'] = f'imported-{i}'
+        with open(os.path.join(folder, f'kubeconfig-{i}.yaml'), 'w', encoding='utf-8') as f:
+            yaml.dump(document, f, Dumper=getattr(yaml, 'CSafeDumper', yaml.SafeDumper),
+                      default_flow_style=False)
+    return folder
+
+
+def bench_import(sizes, base_contexts: int = 500):
+    """Import a folder of kubeconfigs one file per save versus in bulk, into a 500-context config."""
+    print(f"{'files':>6} {'one by one ms':>14} {'bulk serial ms':>15} {'bulk parallel ms':>17} "
+          f"{'bulk tar.gz ms':>15}")
+    with tempfile.TemporaryDirectory() as directory:
+        for count in sizes:
+            folder = write_import_files(directory, count)
+            archive = os.path.join(directory, f'import-{count}.tar.gz')
+            with tarfile.open(archive, 'w:gz') as tar:
+                tar.add(folder, arcname='kubeconfigs')
+            files = sorted(os.path.join(folder, name) for name in os.listdir(folder))
+
+            def fresh_manager():
+                path = write_config(directory, base_contexts)
+                manager = KubeConfigManager(path, use_snapshot=False)
+                manager.load_model()
+                return manager
+
+            def run(func):
+                manager = fresh_manager()
+                start = time.perf_counter()
+                func(manager)
+                elapsed = (time.perf_counter() - start) * 1000
+                assert len(manager.get_contexts()) == base_contexts + count
+                return elapsed
+
+            one_by_one = run(lambda manager: [manager.add_context_from_file(path) for path in files])
+            serial = run(lambda manager: manager.import_contexts([folder], workers=1))
+            parallel = run(lambda manager: manager.import_contexts([folder]))
+            tarball = run(lambda manager: manager.import_contexts([archive]))
+            print(f"{count:>6} {one_by_one:>14.1f} {serial:>15.1f} {parallel:>17.1f} {tarball:>15.1f}")
+
+
+FAKE_AUTHENTICATOR = """#!{python}
+# Stand-in for ncp-iam-authenticator: takes DELAY seconds per call, fails with
+# 'cluster not found' for UUIDs starting with 'missing' and once (then works)
+# for UUIDs starting with 'flaky'. 'token' prints a 10-minute ExecCredential.
+import json, os, sys, time
+from datetime import datetime, timedelta, timezone
+
+DELAY = {delay!r}
+args = sys.argv[1:]
+options = dict(zip(args[1::2], args[2::2]))
+uuid, region = options['--clusterUuid'], options['--region']
+time.sleep(DELAY)
+if args[0] == 'token':
+    expires = datetime.now(timezone.utc) + timedelta(minutes=10)
+    print(json.dumps({{'kind': 'ExecCredential', 'apiVersion': 'client.authentication.k8s.io/v1beta1',
+                      'spec': {{}}, 'status': {{'token': 'k8s-aws-v1.' + uuid + '.' + str(time.time()),
+                      'expirationTimestamp': expires.strftime('%Y-%m-%dT%H:%M:%SZ')}}}}))
+    sys.exit(0)
+import yaml
+if uuid.startswith('missing'):
+    sys.stderr.write('Error: cluster not found\\n')
+    sys.exit(1)
+marker = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'flaky-' + uuid)
+if uuid.startswith('flaky') and not os.path.exists(marker):
+    open(marker, 'w').close()
+    sys.stderr.write('Error: connection reset\\n')
+    sys.exit(1)
+
+name = options.get('--alias') or 'nks_%s_%s' % (region.lower(), uuid)
+path = options['--kubeconfig']
+config = {{}}
+if os.path.exists(path):
+    with open(path) as f:
+        config = yaml.safe_load(f) or {{}}
+def put(section, entry):
+    entries = [e for e in config.get(section) or [] if e.get('name') != entry['name']]
+    config[section] = entries + [entry]
+put('clusters', {{'name': name, 'cluster': {{'server': 'https://%s.kr.vnks.ntruss.com' % uuid,
+                                           'certificate-authority-data': 'Q0E='}}}})
+put('users', {{'name': name, 'user': {{'exec': {{
+    'apiVersion': 'client.authentication.k8s.io/v1beta1', 'command': 'ncp-iam-authenticator',
+    'args': ['token', '--clusterUuid', uuid, '--region', region]}}}}}})
+put('contexts', {{'name': name, 'context': {{'cluster': name, 'user': name}}}})
+config.update({{'apiVersion': 'v1', 'kind': 'Config', 'current-context': name}})
+with open(path, 'w') as f:
+    yaml.safe_dump(config, f)
+print('Updated context %s in %s' % (name, path))
+"""
+
+
+def write_fake_authenticator(directory: str, delay: float) -> str:
+    """Write an executable fake ncp-iam-authenticator to directory and return its path."""
+    path = os.path.join(directory, 'ncp-iam-authenticator')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(FAKE_AUTHENTICATOR.format(python=sys.executable, delay=delay))
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+    return path
+
+
+def bench_nks(sizes, delay: float):
+    """Add NKS clusters one add_nks_context() call at a time versus add_nks_contexts()."""
+    print(f"{'clusters':>9} {'sequential ms':>14} {'batch x4 ms':>12} {'batch x16 ms':>13}")
+    with tempfile.TemporaryDirectory() as directory:
+        authenticator = write_fake_authenticator(directory, delay)
+        for count in sizes:
+            clusters = [(f'{count}-{i:04d}', 'KR') for i in range(count)]
+
+            def run(func):
+                manager = KubeConfigManager(write_config(directory, 100), use_snapshot=False)
+                start = time.perf_counter()
+                func(manager)
+                elapsed = (time.perf_counter() - start) * 1000
+                assert len(manager.get_contexts()) == 100 + count
+                return elapsed
+
+            sequential = run(lambda manager: [manager.add_nks_context(uuid, region, authenticator_path=authenticator)
+                                              for uuid, region in clusters])
+            batch4 = run(lambda manager: manager.add_nks_contexts(clusters, authenticator, concurrency=4))
+            batch16 = run(lambda manager: manager.add_nks_contexts(clusters, authenticator, concurrency=16))
+            print(f"{count:>9} {sequential:>14.0f} {batch4:>12.0f} {batch16:>13.0f}")
+
+
+def bench_token(repeat: int, delay: float):
+    """Time the exec plugin of an NKS user as kubectl runs it, direct versus through the token cache."""
+    from kube_config_token_cache import wrap_user
+
+    with tempfile.TemporaryDirectory() as directory:
+        authenticator = write_fake_authenticator(directory, delay)
+        user = {'name': 'nks', 'user': {'exec': {'command': authenticator,
+                                                 'args': ['token', '--clusterUuid', 'c1', '--region', 'KR']}}}
+        cache_dir = os.path.join(directory, 'tokens')
+
+        def run(exec_config):
+            env = dict(os.environ, KCM_TOKEN_CACHE_DIR=cache_dir)
+            process = subprocess.run([exec_config['command']] + exec_config['args'], stdout=subprocess.PIPE, env=env)
+            assert process.returncode == 0 and b'ExecCredential' in process.stdout
+
+        direct_ms = timed(lambda: run(user['user']['exec']), repeat)
+        wrapped = wrap_user(user)['user']['exec']
+        cold_ms = timed(lambda: (shutil.rmtree(cache_dir, ignore_errors=True), run(wrapped)), repeat)
+        warm_ms = timed(lambda: run(wrapped), repeat)
+        print(f"{'direct ms':>10} {'cache miss ms':>14} {'cache hit ms':>13}")
+        print(f"{direct_ms:>10.1f} {cold_ms:>14.1f} {warm_ms:>13.1f}")
+
+
+def search_listing(num_contexts: int) -> list:
+    """Build a listing with team-env-region style context names."""
+    teams = ['payments', 'search', 'platform', 'ml', 'data', 'web', 'mobile', 'infra']
+    envs = ['prod', 'staging', 'dev', 'qa', 'sandbox']
+    regions = ['kr', 'jp', 'sg', 'us-east', 'eu-west', 'fkr']
+    contexts = []
+    for i in range(num_contexts):
+        name = f"{teams[i % 8]}-{envs[i // 8 % 5]}-{regions[i // 40 % 6]}-{i}"
+        contexts.append({'name': name, 'context': {'cluster': f'nks-{name}', 'user': f'user-{teams[i * 7 % 8]}-{i % 300}',
+                                                   'namespace': ['default', 'kube-system', teams[i * 3 % 8]][i % 3]}})
+    return contexts
+
+
+def bench_search(sizes):
+    """Time palette queries typed a key at a time, against a linear scan of every row."""
+    from kube_config_search import ContextIndex
+
+    queries = ['payments-prod-kr', 'kube-system', 'mlqajp', 'plaform-dev', 'zzz']
+    print(f"{'contexts':>10} {'index ms':>9} {'key median ms':>14} {'key max ms':>11} {'scan median ms':>15}")
+    for size in sizes:
+        contexts = search_listing(size)
+        index = ContextIndex()
+        start = time.perf_counter()
+        index.update(contexts)
+        build_ms = (time.perf_counter() - start) * 1000
+        recent = [contexts[size // 2]['name']]
+
+        def scan(query):
+            # Baseline: lowercase and test every row, then rank the hits
+            hits = [context['name'] for context in contexts
+                    if query in ' '.join((context['name'], context['context']['cluster'],
+                                          context['context']['user'], context['context']['namespace'])).lower()]
+            return sorted(hits, key=lambda name: (not name.startswith(query), name))[:50]
+
+        keys, scans = [], []
+        for query in queries:
+            for end in range(1, len(query) + 1):
+                keys.append(timed(lambda: index.search(query[:end], 50, recent), 1))
+                scans.append(timed(lambda: scan(query[:end]), 1))
+        print(f"{size:>10} {build_ms:>9.0f} {statistics.median(keys):>14.2f} {max(keys):>11.2f} "
+              f"{statistics.median(scans):>15.2f}")
+
+
+def bench_current(sizes, repeat):
+    """Time reading current-context by scanning the file, against load_config()."""
+    from kube_config_current import read_current_context
+
+    print(f"{'contexts':>10} {'file MB':>8} {'scan ms':>8} {'load_config ms':>15} {'snapshot ms':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = write_config(directory, size)
+            assert read_current_context([path]) == 'context-0'
+            scan_ms = timed(lambda: read_current_context([path]), max(repeat, 100))
+            yaml_ms = timed(lambda: KubeConfigManager(path, use_snapshot=False).load_config(), repeat)
+            KubeConfigManager(path).load_model()
+            snapshot_ms = timed(lambda: KubeConfigManager(path).load_config(), repeat)
+
+            megabytes = os.path.getsize(path) / 1e6
+            print(f"{size:>10} {megabytes:>8.1f} {scan_ms:>8.3f} {yaml_ms:>15.1f} {snapshot_ms:>12.1f}")
+
+
+def bench_session(sizes, repeat):
+    """Compare switching the shared config with switching a session overlay in front of it."""
+    print(f"{'contexts':>10} {'file MB':>8} {'shared ms':>10} {'overlay ms':>11} {'overlay bytes':>14}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = write_config(directory, size)
+            shared = KubeConfigManager(path)
+            shared.load_model()
+            targets = iter(f'context-{i % 2}' for i in range(10 ** 9))
+            shared_ms = timed(lambda: shared.set_current_context(next(targets)), repeat)
+
+            manager = KubeConfigManager(path)
+            manager.session_dir = os.path.join(directory, 'sessions')
+            manager.get_context_listing()
+            overlay_ms = timed(lambda: manager.set_session_context(next(targets), session_id='bench'), repeat)
+            overlay = os.path.join(manager.session_dir, 'bench.yaml')
+
+            megabytes = os.path.getsize(path) / 1e6
+            print(f"{size:>10} {megabytes:>8.1f} {shared_ms:>10.2f} {overlay_ms:>11.2f} "
+                  f"{os.path.getsize(overlay):>14}")
+
+
+def bench_startup(repeat: int):
+    """Time a fresh process answering `current` through the CLI, against importing the GUI."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as directory:
+        path = write_config(directory, 100)
+        commands = [
+            ('python', [sys.executable, '-c', 'pass']),
+            ('prompt', [sys.executable, os.path.join(here, 'kube_config_current.py'), '--config', path]),
+            ('cli', [sys.executable, os.path.join(here, 'kube_context_cli.py'), 'current', '--config', path]),
+            ('run.py cli', [sys.executable, os.path.join(here, 'run.py'), 'current', '--config', path]),
+            ('gui import', [sys.executable, '-c', f'import sys; sys.path.insert(0, {here!r}); '
+                                                  'import kube_context_pyside_gui']),
+        ]
+        print(f"{'entry point':>12} {'median ms':>10}")
+        for label, command in commands:
+            def run():
+                subprocess.run(command, stdout=subprocess.DEVNULL, check=True)
+            run()
+            print(f"{label:>12} {timed(run, repeat):>10.0f}")
+
+
+def start_daemon(path: str, socket_path: str) -> subprocess.Popen:
+    """Start kube_config_daemon.py for path and wait until it accepts connections."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    process = subprocess.Popen([sys.executable, os.path.join(here, 'kube_config_daemon.py'),
+                                '--config', path, '--socket', socket_path], stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while connect([path], socket_path) is None:
+        if process.poll() is not None or time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError("The daemon did not start")
+        time.sleep(0.05)
+    return process
+
+
+def bench_daemon(sizes, repeat, clients):
+    """Compare requests through the daemon with a fresh manager per request, as a CLI run has.
+
+    Also times whole `kcm list` processes both ways, and counts the commits
+    the daemon needs for switches sent by clients threads at once.
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"{'contexts':>10} {'list ms':>8} {'daemon':>7} {'switch ms':>10} {'daemon':>7} "
+          f"{'kcm list ms':>12} {'daemon':>7} {'switches':>9} {'commits':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, 'kcm.sock')
+        for size in sizes:
+            path = write_config(directory, size)
+            KubeConfigManager(path).load_model()
+            targets = iter(f'context-{i % 2}' for i in range(10 ** 9))
+            command = [sys.executable, os.path.join(here, 'kube_context_cli.py'), 'list', '--config', path]
+            env = dict(os.environ, KCM_DAEMON_SOCKET=socket_path)
+            # Direct first: a running daemon would re-parse after every direct write
+            list_ms = timed(lambda: KubeConfigManager(path).get_context_listing(), repeat)
+            switch_ms = timed(lambda: KubeConfigManager(path).set_current_context(next(targets)), repeat)
+            process_ms = timed(lambda: subprocess.run(command, env=env, stdout=subprocess.DEVNULL, check=True),
+                               repeat)
+
+            process = start_daemon(path, socket_path)
+            try:
+                daemon = DaemonManager(connect([path], socket_path), None)
+                daemon_list_ms = timed(daemon.get_context_listing, repeat)
+                daemon_switch_ms = timed(lambda: daemon.set_current_context(next(targets)), repeat)
+                daemon_process_ms = timed(lambda: subprocess.run(command, env=env, stdout=subprocess.DEVNULL,
+                                                                 check=True), repeat)
+
+                # Concurrent switches from separate connections, committed in groups
+                before = daemon.client.request('stats')
+                managers = [DaemonManager(connect([path], socket_path), None) for _ in range(clients)]
+                threads = [threading.Thread(target=manager.set_current_context, args=(f'context-{i}',))
+                           for i, manager in enumerate(managers)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                after = daemon.client.request('stats')
+            finally:
+                process.terminate()
+                process.wait(timeout=10)
+            print(f"{size:>10} {list_ms:>8.2f} {daemon_list_ms:>7.2f} {switch_ms:>10.2f} {daemon_switch_ms:>7.2f} "
+                  f"{process_ms:>12.0f} {daemon_process_ms:>7.0f} {after['writes'] - before['writes']:>9} "
+                  f"{after['commits'] - before['commits']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('benchmark', choices=['switch', 'listing', 'coldstart', 'durability',
+                                              'import', 'nks', 'token', 'search', 'startup', 'current', 'session',
+                                              'daemon'])
+    parser.add_argument('--sizes', default='100,1000,5000',
+                        help='comma-separated context counts (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--processes', type=int, default=8,
+                        help='concurrent clients (daemon)')
+    parser.add_argument('--delay', type=float, default=0.2,
+                        help='seconds per fake authenticator call (nks, token)')
+    parser.add_argument('--dir', help='directory for the test files, e.g. a network home')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    if args.benchmark == 'switch':
+        bench_switch(sizes, args.repeat)
+    elif args.benchmark == 'listing':
+        bench_listing(sizes, args.repeat)
+    elif args.benchmark == 'coldstart':
+        bench_coldstart(sizes, args.repeat)
+    elif args.benchmark == 'durability':
+        bench_durability(sizes, args.repeat, args.dir)
+    elif args.benchmark == 'import':
+        bench_import(sizes)
+    elif args.benchmark == 'nks':
+        bench_nks(sizes, args.delay)
+    elif args.benchmark == 'token':
+        bench_token(args.repeat, args.delay)
+    elif args.benchmark == 'search':
+        bench_search(sizes)
+    elif args.benchmark == 'startup':
+        bench_startup(args.repeat)
+    elif args.benchmark == 'current':
+        bench_current(sizes, args.repeat)
+    elif args.benchmark == 'session':
+        bench_session(sizes, args.repeat)
+    elif args.benchmark == 'daemon':
+        bench_daemon(sizes, args.repeat, args.processes)
+
+
+if __name__ == "__main__":
+    main()
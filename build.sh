@@ -9,6 +9,10 @@ APP_NAME="KubeContextManager"
 # Entry point script
 ENTRY_POINT="run.py"
 
+# Command-line interface, built separately without Qt so that it starts fast
+CLI_NAME="kcm"
+CLI_ENTRY_POINT="kube_context_cli.py"
+
 # Detect OS
 OS="$(uname)"
 
@@ -22,15 +26,24 @@ PYINSTALLER_OPTS=(
     --hidden-import="PySide6.QtCore"
 )
 
+CLI_PYINSTALLER_OPTS=(
+    --name "$CLI_NAME"
+    --onefile
+    --console
+    --exclude-module PySide6
+    --exclude-module tkinter
+)
+
 echo "========================================"
 echo "Building $APP_NAME for $OS..."
 echo "========================================"
 
 # Clean up previous builds
-rm -rf build/ dist/ "$APP_NAME.spec"
+rm -rf build/ dist/ "$APP_NAME.spec" "$CLI_NAME.spec"
 
 # Run PyInstaller with platform-specific options
 pyinstaller "${PYINSTALLER_OPTS[@]}" "$ENTRY_POINT"
+pyinstaller "${CLI_PYINSTALLER_OPTS[@]}" "$CLI_ENTRY_POINT"
 
 # Check if the build was successful
 BUILD_SUCCESS=false
@@ -45,6 +58,9 @@ elif [ "$OS" == "Linux" ]; then
         BUILD_SUCCESS=true
     fi
 fi
+if [ ! -f "dist/$CLI_NAME" ] && [ ! -f "dist/$CLI_NAME.exe" ]; then
+    BUILD_SUCCESS=false
+fi
 
 if [ "$BUILD_SUCCESS" = true ]; then
     echo "========================================"
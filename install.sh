@@ -53,12 +53,14 @@ fi
 if [[ -w "/usr/local/bin" ]]; then
     echo "Creating command line launcher..."
     ln -sf "$(pwd)/run.py" "/usr/local/bin/kube-context-manager"
-    echo "You can now run 'kube-context-manager' from anywhere in the terminal"
+    ln -sf "$(pwd)/run.py" "/usr/local/bin/kcm"
+    echo "You can now run 'kube-context-manager' (GUI) and 'kcm' (CLI) from anywhere in the terminal"
 elif [[ -w "$HOME/.local/bin" ]]; then
     echo "Creating command line launcher in ~/.local/bin..."
     mkdir -p "$HOME/.local/bin"
     ln -sf "$(pwd)/run.py" "$HOME/.local/bin/kube-context-manager"
-    echo "You can now run 'kube-context-manager' from anywhere in the terminal"
+    ln -sf "$(pwd)/run.py" "$HOME/.local/bin/kcm"
+    echo "You can now run 'kube-context-manager' (GUI) and 'kcm' (CLI) from anywhere in the terminal"
     echo "Make sure ~/.local/bin is in your PATH"
 fi
 
@@ -69,6 +71,7 @@ echo "How to run:"
 echo "  1. Double-click the desktop entry (Linux)"
 echo "  2. Run 'kube-context-manager' in terminal"
 echo "  3. Run 'python3 run.py' from this directory"
+echo "  4. Run 'kcm list', 'kcm switch NAME', ... for the command-line interface"
 echo ""
 echo "The application will manage your ~/.kube/config file."
 echo "A backup will be created automatically before any changes."
\ No newline at end of file
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""Reading current-context without parsing the kubeconfig.
+
+Shell prompts ask for the current context before every command, and a
+full parse reads every certificate in the file to answer. The root of a
+kubeconfig is a block mapping, so its keys are the lines that start in
+column 0, block scalars being indented. Quoted and flow values are not:
+PyYAML reads `foo: "abc` followed by a `current-context: evil"` line as
+one string. scan_current_context() finds the `current-context` key with
+bytes.find() over an mmap of the file, makes sure no quote or bracket
+opened before it is still open, and reads the value from that line alone
+(plain, single- or double-quoted, with or without a comment).
+
+The search is bounded: it stops at the first top-level current-context,
+as mapping keys are unique, and only the bytes before it are checked for
+document markers and open quotes. kubectl writes the key ahead of the
+users section, so most of the file is never touched.
+
+Whatever a line cannot settle on its own is left to the YAML parser: a
+value continued on the next lines, escapes, anchors, aliases, tags,
+values YAML reads as null/bool/number, a key in a later document, merge
+keys, and files whose root is not a block mapping (JSON, for one).
+
+This module imports only mmap, os, sys and typing, so a prompt can run it
+in a fresh interpreter cheaply; kubeconfig_paths() lives here for the
+same reason.
+
+Usage:
+    python kube_config_current.py [--config PATH]
+"""
+
+import mmap
+import os
+import sys
+from typing import List, Optional
+
+KEY = b'current-context'
+BOM = b'\xef\xbb\xbf'
+# Plain scalars that resolve to null, and (lowercased) to bool or a special key rather than a string
+NULLS = {'', '~', 'null', 'Null', 'NULL'}
+NON_STRINGS = {'true', 'false', 'yes', 'no', 'on', 'off', '=', '<<'}
+# A plain scalar starting with one of these and made only of NUMBER_CHARS may be a number or timestamp
+NUMBER_START = set('+-.0123456789')
+NUMBER_CHARS = set('0123456789+-.:_ eExXoObBaAcCdDfFiInNtTzZ')
+# A value starting with one of these is not a plain scalar on one line, nor is one
+# starting with '-' or '?' and a space
+INDICATORS = set('&*!|>[]{}%@`,')
+# First bytes of a root line that is not a block mapping in column 0
+ROOT_NOT_BLOCK = {b' ', b'\t', b'{', b'[', b'-', b'?', b'!', b'&', b'*', b'|', b'>'}
+# Quotes and brackets that may carry a value over to the next lines, and what may come before them
+OPENERS = (b'"', b"'", b'[', b'{')
+OPENER_AFTER = {None, ':', '-', '?', ',', '[', '{'}
+
+
+def kubeconfig_paths(value: Optional[str] = None) -> List[str]:
+    """Split a KUBECONFIG value (default: the environment) into files, like kubectl.
+
+    Empty elements and duplicates are dropped; without KUBECONFIG the
+    result is ~/.kube/config.
+    """
+    if value is None:
+        value = os.environ.get('KUBECONFIG', '')
+    paths = []
+    for path in value.split(os.pathsep):
+        path = os.path.expanduser(path)
+        if path and path not in paths:
+            paths.append(path)
+    return paths or [os.path.expanduser("~/.kube/config")]
+
+
+def _line_end(data, offset: int) -> int:
+    end = data.find(b'\n', offset)
+    return len(data) if end < 0 else end
+
+
+def _at_line_start(data, offset: int) -> bool:
+    return offset == 0 or data[offset - 1:offset] == b'\n' or (offset == len(BOM) and data[:offset] == BOM)
+
+
+def _root_is_block_mapping(data) -> bool:
+    """Whether the first content line starts a block mapping in column 0."""
+    offset = len(BOM) if data[:len(BOM)] == BOM else 0
+    while offset < len(data):
+        end = _line_end(data, offset)
+        line = data[offset:end].rstrip(b'\r')
+        content = line.lstrip(b' \t')
+        if content and not content.startswith(b'#') and not line.startswith(b'%') and line.rstrip() != b'---':
+            return line[:1] not in ROOT_NOT_BLOCK
+        offset = end + 1
+    return True
+
+
+def _document_start_before(data, end: int) -> bool:
+    """Whether a '---' line comes after the first line and before offset end.
+
+    ('...' needs a '---' after it to start another document.)
+    """
+    offset = data.find(b'\n---', 0, end)
+    while offset >= 0:
+        if data[offset + 4:offset + 5] in (b'', b'\n', b'\r', b' ', b'\t'):
+            return True
+        offset = data.find(b'\n---', offset + 1, end)
+    return False
+
+
+def _line_is_closed(line: str) -> bool:
+    """Whether every quoted scalar and flow collection opened on line also ends on it.
+
+    Errs towards False: a quote that only looks like it starts a scalar
+    sends the file to the parser, which costs time but no correctness.
+    """
+    quote = None
+    depth = 0
+    previous = None
+    position = 0
+    while position < len(line):
+        char = line[position]
+        if quote == '"':
+            if char == '\\':
+                position += 1
+            elif char == '"':
+                quote = None
+        elif quote == "'":
+            if char == "'":
+                if line[position + 1:position + 2] == "'":
+                    position += 1
+                else:
+                    quote = None
+        elif char == '#' and (position == 0 or line[position - 1] in ' \t'):
+            break
+        elif char not in ' \t':
+            if char in '"\'' and previous in OPENER_AFTER:
+                quote = char
+            elif char in '[{' and previous in OPENER_AFTER:
+                depth += 1
+            elif char in ']}' and depth:
+                depth -= 1
+            previous = char
+        position += 1
+    return quote is None and not depth
+
+
+def _open_before(data, end: int) -> bool:
+    """Whether a quoted or flow value opened before offset end is still open there."""
+    checked = set()
+    for opener in OPENERS:
+        offset = data.find(opener, 0, end)
+        while offset >= 0:
+            line_start = data.rfind(b'\n', 0, offset) + 1
+            line_end = _line_end(data, offset)
+            if line_start not in checked:
+                checked.add(line_start)
+                try:
+                    line = data[line_start:line_end].decode('utf-8')
+                except UnicodeDecodeError:
+                    return True
+                if not _line_is_closed(line):
+                    return True
+            offset = data.find(opener, line_end, end)
+    return False
+
+
+def _comment_or_blank(rest: str) -> bool:
+    return not rest.strip() or rest[:1] in ' \t' and rest.lstrip().startswith('#')
+
+
+def _scan_value(text: str) -> Optional[str]:
+    """Return the string value written after 'current-context:' on one line, or None."""
+    value = text.strip(' \t\r')
+    if value.startswith('"'):
+        end = value.find('"', 1)
+        if end < 0 or '\\' in value[1:end] or not _comment_or_blank(value[end + 1:]):
+            return None
+        return value[1:end]
+    if value.startswith("'"):
+        parts = []
+        position = 1
+        while True:
+            end = value.find("'", position)
+            if end < 0:
+                return None
+            parts.append(value[position:end])
+            if value[end + 1:end + 2] != "'":
+                break
+            parts.append("'")
+            position = end + 2
+        return ''.join(parts) if _comment_or_blank(value[end + 1:]) else None
+
+    # Plain scalar: up to a comment
+    if value.startswith('#'):
+        value = ''
+    for separator in (' #', '\t#'):
+        if separator in value:
+            value = value[:value.index(separator)].rstrip(' \t')
+    if value in NULLS:
+        return ''
+    if value.lower() in NON_STRINGS:
+        return None
+    if value[0] in INDICATORS or value[:2] in ('-', '?', '- ', '? ') or ': ' in value or value.endswith(':') or '\t' in value:
+        return None
+    if value[0] in NUMBER_START and set(value) <= NUMBER_CHARS:
+        return None
+    # A stray closing quote or bracket: the end of a value opened elsewhere, most likely
+    if value[-1] in '"\']}':
+        return None
+    return value
+
+
+def scan_current_context(data) -> Optional[str]:
+    """Return the current-context of a kubeconfig held in data (bytes or mmap).
+
+    Returns '' if it is not set, and None if the answer needs the YAML
+    parser (see the module docstring).
+    """
+    if not _root_is_block_mapping(data):
+        return None
+
+    # The search stops at the first top-level key: a mapping has unique keys
+    offset = data.find(KEY)
+    if offset < 0:
+        # No key at all, unless a merge key could bring one in
+        return None if data.find(b'<<') >= 0 else ''
+    while offset >= 0:
+        # The key may be quoted; either way it must start its line to be a top-level key
+        quote = data[offset - 1:offset] if offset else b''
+        quoted = quote in (b'"', b"'")
+        start = offset - 1 if quoted else offset
+        end = offset + len(KEY) + (1 if quoted else 0)
+        if (not quoted or data[end - 1:end] == quote) and _at_line_start(data, start):
+            line_end = _line_end(data, end)
+            try:
+                rest = data[end:line_end].decode('utf-8').lstrip(' \t')
+            except UnicodeDecodeError:
+                return None
+            if rest.startswith(':') and rest[1:2] in ('', ' ', '\t', '\r'):
+                break
+        offset = data.find(KEY, offset + 1)
+    else:
+        return None
+    # A key after a second '---' belongs to a later document, and one inside an open quote to a value
+    if _document_start_before(data, start) or _open_before(data, start):
+        return None
+
+    value = _scan_value(rest[1:])
+    if value is None:
+        return None
+    # An indented line after ours continues the value (or makes it a mapping)
+    offset = line_end + 1
+    while offset < len(data):
+        next_end = _line_end(data, offset)
+        line = data[offset:next_end]
+        if line.strip(b' \t\r'):
+            if line[:1] in (b' ', b'\t'):
+                return None
+            break
+        offset = next_end + 1
+    return value
+
+
+def read_file(path: str) -> Optional[str]:
+    """Scan one kubeconfig file; '' if it is missing or empty, None if it needs parsing."""
+    try:
+        with open(path, 'rb') as f:
+            if not os.fstat(f.fileno()).st_size:
+                return ''
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return scan_current_context(mm)
+    except FileNotFoundError:
+        return ''
+
+
+def read_current_context(paths: Optional[List[str]] = None) -> str:
+    """Return the current context of the kubeconfig files (default: KUBECONFIG), like kubectl.
+
+    The first file that sets one wins. A file the scan cannot settle is
+    parsed with KubeConfigManager instead.
+    """
+    for path in paths or kubeconfig_paths():
+        value = read_file(path)
+        if value is None:
+            from kube_config_manager import KubeConfigManager
+            model = KubeConfigManager(path, create=False).load_model()
+            value = model.current_context if model is not None else ''
+        if value:
+            return value
+    return ''
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ['--config'] and len(args) == 2:
+        paths = [args[1]]
+    elif not args:
+        paths = None
+    else:
+        print("usage: kube_config_current.py [--config PATH]", file=sys.stderr)
+        sys.exit(2)
+    current = read_current_context(paths)
+    if not current:
+        sys.exit(1)
+    print(current)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,552 @@
+#!/usr/bin/env python3
+"""Resident daemon serving the kubeconfig over a Unix socket.
+
+Usage:
+    python kube_config_daemon.py [--config PATH] [--socket PATH]    (or: kcm daemon)
+
+Every CLI run and every GUI start begins with a cold KubeConfigManager
+and pays for parsing the config. The daemon keeps one manager warm (the
+parsed model, the listing and a ContextIndex), reloads it when the files
+change (see kube_config_watch), and answers requests on DAEMON_SOCKET.
+The CLI and the GUIs use it through through_daemon() when it is running
+and work on the files themselves when it is not.
+
+The protocol is one JSON object per line in each direction:
+
+    {"op": "get_context_listing", "args": {}, "paths": ["/home/me/.kube/config"]}
+    {"ok": true, "result": [[...contexts...], "dev"]}
+    {"ok": false, "error": "Context 'nope' not found"}
+
+paths are the config files of the client. A daemon serving other files
+answers {"ok": false, "unavailable": true, ...} before doing anything, and
+the client falls back to the files; a session overlay or --config never
+reaches the wrong config.
+
+Answers to listings, commits and imports carry a "revision": the (inode,
+size, mtime_ns) of each config file as of that answer, or null when the
+files changed since the daemon last read them. A client has seen the
+files as long as they still match it, so its own writes do not count as
+outside changes (DaemonManager.changed_on_disk()).
+
+Reads hold the daemon's lock for one request each. Switch, rename and
+delete requests are queued for a single writer thread, which applies
+every request that arrived meanwhile in one load-modify-save cycle (group
+commit). Each request is still all or nothing: one that fails is taken
+out and the others are committed without it.
+
+Only the client half is imported by the CLI; it needs nothing beyond
+json and socket.
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from kube_config_current import kubeconfig_paths
+
+DAEMON_SOCKET = os.environ.get('KCM_DAEMON_SOCKET') or os.path.join(
+    os.environ.get('XDG_RUNTIME_DIR') or os.path.expanduser("~/.kube"), "kcm-daemon.sock")
+# Seconds to wait for the daemon to accept, and for an answer
+CONNECT_TIMEOUT = 0.5
+REQUEST_TIMEOUT = 60.0
+# Requests answered under the read lock
+READ_OPS = ('get_context_listing', 'get_current_context', 'search', 'stats')
+# Mutations a 'commit' request may carry -> (argument names, description in a batch error)
+WRITE_OPS = {
+    'set_current_context': (('context_name',), "switch to '{context_name}'"),
+    'rename_context': (('old_name', 'new_name'), "rename '{old_name}' to '{new_name}'"),
+    'delete_context': (('context_name',), "delete '{context_name}'"),
+}
+
+
+def file_keys(paths: List[str]) -> Dict[str, Optional[List[int]]]:
+    """Return the [inode, size, mtime_ns] of each path (None if missing), as sent in a revision."""
+    keys = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            keys[path] = None
+            continue
+        keys[path] = [st.st_ino, st.st_size, st.st_mtime_ns]
+    return keys
+
+
+class DaemonUnavailable(Exception):
+    """No daemon serves these config files (any more); use the files directly."""
+
+
+class DaemonClient:
+    """One connection to the daemon. Requests from several threads are serialized."""
+
+    def __init__(self, sock: socket.socket, paths: List[str]):
+        self._sock = sock
+        self._reader = sock.makefile('rb')
+        self._lock = threading.Lock()
+        self.paths = [os.path.abspath(path) for path in paths]
+        # Revision of the last answer that had one
+        self.revision: Optional[Dict] = None
+
+    def request(self, op: str, **args):
+        """Return the result of op; raises ValueError if the daemon rejected it."""
+        message = json.dumps({'op': op, 'args': args, 'paths': self.paths}).encode('utf-8') + b'\n'
+        with self._lock:
+            try:
+                self._sock.sendall(message)
+                line = self._reader.readline()
+            except OSError as e:
+                raise DaemonUnavailable(f"Lost the daemon: {e}") from e
+        if not line:
+            raise DaemonUnavailable("The daemon closed the connection")
+        response = json.loads(line)
+        if response.get('unavailable'):
+            raise DaemonUnavailable(response['error'])
+        if not response['ok']:
+            raise ValueError(response['error'])
+        if 'revision' in response:
+            self.revision = response['revision']
+        return response.get('result')
+
+    def close(self):
+        self._reader.close()
+        self._sock.close()
+
+
+def connect(paths: Optional[List[str]] = None, socket_path: Optional[str] = None) -> Optional[DaemonClient]:
+    """Connect to the daemon for the config files paths (default: KUBECONFIG); None if none is running."""
+    socket_path = socket_path or DAEMON_SOCKET
+    if not hasattr(socket, 'AF_UNIX') or not os.path.exists(socket_path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return None
+    sock.settimeout(REQUEST_TIMEOUT)
+    return DaemonClient(sock, paths or kubeconfig_paths())
+
+
+def through_daemon(manager, socket_path: Optional[str] = None):
+    """Return a DaemonManager for manager's files if the daemon is running, else manager itself."""
+    client = connect(manager.config_paths, socket_path)
+    return DaemonManager(client, lambda: manager) if client is not None else manager
+
+
+class DaemonManager:
+    """KubeConfigManager stand-in that lists, switches, renames, deletes and imports through the daemon.
+
+    Return values and exceptions are those of KubeConfigManager. Once the
+    daemon is gone (or serves other files), every call goes to the
+    manager that fallback() returns instead.
+    """
+
+    def __init__(self, client: Optional[DaemonClient], fallback: Callable):
+        self.client = client
+        self._fallback = fallback
+        self._manager = None
+
+    @property
+    def direct(self):
+        """The KubeConfigManager used without the daemon, created on first use."""
+        if self._manager is None:
+            self._manager = self._fallback()
+        return self._manager
+
+    def _request(self, op: str, **args):
+        if self.client is None:
+            raise DaemonUnavailable("Not connected to the daemon")
+        try:
+            return self.client.request(op, **args)
+        except DaemonUnavailable:
+            self.client.close()
+            self.client = None
+            raise
+
+    def _commit(self, operations: List[tuple], transaction: bool = False):
+        self._request('commit', operations=operations, transaction=transaction)
+
+    def watch_paths(self) -> Tuple[List[str], List[str]]:
+        return self.direct.watch_paths()
+
+    def changed_on_disk(self) -> bool:
+        """Whether the config files differ from the daemon's last answer to us (one stat per file)."""
+        revision = self.client.revision if self.client is not None else None
+        if revision is None:
+            return self.direct.changed_on_disk()
+        return file_keys(self.watch_paths()[0]) != revision
+
+    def get_context_listing(self) -> Tuple[List[Dict], str]:
+        try:
+            contexts, current = self._request('get_context_listing')
+        except DaemonUnavailable:
+            return self.direct.get_context_listing()
+        return contexts, current
+
+    def get_current_context(self) -> str:
+        try:
+            return self._request('get_current_context')
+        except DaemonUnavailable:
+            return self.direct.get_current_context()
+
+    def set_current_context(self, context_name: str):
+        try:
+            self._commit([('set_current_context', {'context_name': context_name})])
+        except DaemonUnavailable:
+            self.direct.set_current_context(context_name)
+
+    def rename_context(self, old_name: str, new_name: str) -> Tuple[bool, str]:
+        if not new_name.strip():
+            return False, "New context name cannot be empty."
+        try:
+            self._commit([('rename_context', {'old_name': old_name, 'new_name': new_name})])
+        except DaemonUnavailable:
+            return self.direct.rename_context(old_name, new_name)
+        except ValueError as e:
+            return False, str(e)
+        return True, f"Context '{old_name}' renamed to '{new_name}' successfully."
+
+    def delete_context(self, context_name: str) -> bool:
+        try:
+            self._commit([('delete_context', {'context_name': context_name})])
+        except DaemonUnavailable:
+            return self.direct.delete_context(context_name)
+        except ValueError as e:
+            print(f"Error deleting context: {e}")
+            return False
+        return True
+
+    def import_contexts(self, paths: List[str], workers: Optional[int] = None) -> Tuple[bool, List[Dict]]:
+        try:
+            success, reports = self._request('import_contexts', paths=[os.path.abspath(path) for path in paths],
+                                             workers=workers)
+        except DaemonUnavailable:
+            return self.direct.import_contexts(paths, workers)
+        except ValueError as e:
+            print(f"Error importing contexts: {e}")
+            return False, []
+        return success, reports
+
+    @contextmanager
+    def batch(self) -> Iterator['DaemonTransaction']:
+        """Like KubeConfigManager.batch(): the operations go to the daemon as one request."""
+        tx = DaemonTransaction(self)
+        yield tx
+        tx.commit()
+
+
+class DaemonTransaction:
+    """Switches, renames and deletes sent to the daemon together, all or nothing."""
+
+    def __init__(self, manager: DaemonManager):
+        self.manager = manager
+        self._operations: List[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self._operations)
+
+    def set_current_context(self, context_name: str):
+        self._operations.append(('set_current_context', {'context_name': context_name}))
+
+    def rename_context(self, old_name: str, new_name: str):
+        self._operations.append(('rename_context', {'old_name': old_name, 'new_name': new_name}))
+
+    def delete_context(self, context_name: str):
+        self._operations.append(('delete_context', {'context_name': context_name}))
+
+    def commit(self):
+        if not self._operations:
+            return
+        try:
+            self.manager._commit(self._operations, transaction=True)
+        except DaemonUnavailable:
+            with self.manager.direct.batch() as tx:
+                for op, args in self._operations:
+                    getattr(tx, op)(**args)
+
+
+class _Write:
+    """A commit request waiting for the writer thread."""
+
+    def __init__(self, operations: List[tuple], transaction: bool):
+        self.operations = operations
+        self.transaction = transaction
+        self.error: Optional[str] = None
+        self.revision: Optional[Dict] = None
+        self.done = threading.Event()
+
+    def apply(self, model):
+        for op, args in self.operations:
+            names, description = WRITE_OPS[op]
+            try:
+                getattr(model, op)(*[args[name] for name in names])
+            except ValueError as e:
+                if self.transaction:
+                    raise ValueError(f"Cannot {description.format(**args)}: {e}") from e
+                raise
+
+
+class _Rejected(Exception):
+    """A request in a group commit failed; the others are retried without it."""
+
+
+class ConfigDaemon:
+    """The warm manager behind the socket, with its watcher and writer threads."""
+
+    def __init__(self, manager):
+        from kube_config_search import ContextIndex
+
+        self.manager = manager
+        self.paths = [os.path.abspath(path) for path in manager.config_paths]
+        self.lock = threading.Lock()
+        self.index = ContextIndex()
+        # Model the listing and the index were built from
+        self._model = None
+        self._contexts: List[Dict] = []
+        self._writes = []
+        self._writes_ready = threading.Condition()
+        self._stopping = threading.Event()
+        self.stats = {'requests': 0, 'writes': 0, 'commits': 0, 'reloads': 0}
+        self.warm()
+
+    def warm(self):
+        """Parse the config (if it changed) and bring the index up to date."""
+        with self.lock:
+            self._listing()
+
+    def _listing(self) -> Tuple[List[Dict], str]:
+        # load_model() returns the same model object until the files change
+        model = self.manager.load_model()
+        if model is not self._model:
+            self._model = model
+            self._contexts = model.contexts.to_list() if model is not None else []
+            self.index.update(self._contexts)
+        return self._contexts, model.current_context if model is not None else ''
+
+    def handle(self, request: Dict) -> Dict:
+        """Answer one request."""
+        op = request.get('op')
+        args = request.get('args') or {}
+        if [os.path.abspath(path) for path in request.get('paths') or []] != self.paths:
+            return {'ok': False, 'unavailable': True,
+                    'error': f"The daemon serves {os.pathsep.join(self.paths)}"}
+        self.stats['requests'] += 1
+        response = {'ok': True}
+        try:
+            if op in READ_OPS:
+                with self.lock:
+                    response['result'] = self._read(op, args)
+                    if op in ('get_context_listing', 'get_current_context'):
+                        response['revision'] = self._revision()
+            elif op == 'commit':
+                response['result'], response['revision'] = self._write(args)
+            elif op == 'import_contexts':
+                import multiprocessing
+                with self.lock:
+                    # Never fork this multi-threaded process (a held lock would stay held in the child)
+                    response['result'] = self.manager.import_contexts(
+                        args['paths'], args.get('workers'), multiprocessing.get_context('spawn'))
+                    response['revision'] = self._revision()
+            elif op == 'shutdown':
+                self._stopping.set()
+                response['result'] = None
+            else:
+                raise ValueError(f"Unknown request '{op}'")
+        except (ValueError, OSError) as e:
+            return {'ok': False, 'error': str(e)}
+        except (KeyError, TypeError) as e:
+            return {'ok': False, 'error': f"Malformed '{op}' request: {e}"}
+        return response
+
+    def _revision(self) -> Optional[Dict]:
+        """File keys of what the manager last read or wrote; None if the files changed since."""
+        # Stat first: a change after it makes changed_on_disk() true
+        keys = file_keys(self.manager.watch_paths()[0])
+        return None if self.manager.changed_on_disk() else keys
+
+    def _read(self, op: str, args: Dict):
+        if op == 'get_context_listing':
+            return self._listing()
+        if op == 'get_current_context':
+            return self._listing()[1]
+        if op == 'search':
+            self._listing()
+            return self.index.search(args['query'], args.get('limit'))
+        return dict(self.stats, paths=self.paths, contexts=len(self.index))
+
+    def _write(self, args: Dict):
+        operations = [(op, op_args) for op, op_args in args['operations']]
+        for op, op_args in operations:
+            if (op not in WRITE_OPS or not isinstance(op_args, dict) or set(op_args) != set(WRITE_OPS[op][0])
+                    or not all(isinstance(value, str) for value in op_args.values())):
+                raise ValueError(f"Malformed '{op}' operation")
+        write = _Write(operations, bool(args.get('transaction')))
+        with self._writes_ready:
+            self._writes.append(write)
+            self._writes_ready.notify()
+        write.done.wait()
+        if write.error is not None:
+            raise ValueError(write.error)
+        return None, write.revision
+
+    def write_loop(self):
+        """Writer thread: commit whatever queued up while the previous commit ran."""
+        while True:
+            with self._writes_ready:
+                while not self._writes:
+                    self._writes_ready.wait()
+                writes, self._writes = self._writes, []
+            revision = None
+            try:
+                with self.lock:
+                    self._commit_group(writes)
+                    revision = self._revision()
+            except Exception as e:
+                # A bug in one request must not leave every later one waiting
+                for write in writes:
+                    if write.error is None:
+                        write.error = f"Unexpected error: {e}"
+            for write in writes:
+                write.revision = revision
+                write.done.set()
+
+    def _commit_group(self, writes: List[_Write]):
+        pending = list(writes)
+        while pending:
+            def mutation(model):
+                for write in pending:
+                    try:
+                        write.apply(model)
+                    except Exception as e:
+                        # Not only ValueError: whatever one request trips over fails that request alone
+                        write.error = str(e) or type(e).__name__
+                        raise _Rejected() from e
+
+            try:
+                self.manager._commit(mutation)
+            except _Rejected:
+                pending = [write for write in pending if write.error is None]
+                continue
+            except (ValueError, OSError) as e:
+                for write in pending:
+                    write.error = str(e)
+                return
+            self.stats['writes'] += len(pending)
+            self.stats['commits'] += 1
+            return
+
+    def watch_loop(self):
+        """Watcher thread: re-parse as soon as another program changes the files."""
+        from kube_config_watch import ConfigWatcher, wait_for_change
+
+        watcher = ConfigWatcher(self.manager)
+        try:
+            while not self._stopping.is_set():
+                if wait_for_change(watcher, timeout=1.0):
+                    self.stats['reloads'] += 1
+                    self.warm()
+        finally:
+            watcher.close()
+
+
+def _socket_in_use(socket_path: str) -> bool:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        return False
+    finally:
+        sock.close()
+    return True
+
+
+def serve(manager, socket_path: Optional[str] = None):
+    """Serve manager's config on socket_path until a shutdown request, SIGTERM or Ctrl+C."""
+    import signal
+    import socketserver
+
+    socket_path = socket_path or DAEMON_SOCKET
+    if not hasattr(socket, 'AF_UNIX'):
+        raise OSError("Unix sockets are not available on this system")
+    if os.path.exists(socket_path):
+        if _socket_in_use(socket_path):
+            raise OSError(f"A daemon is already listening on {socket_path}")
+        # Left behind by a daemon that did not exit cleanly
+        os.unlink(socket_path)
+    os.makedirs(os.path.dirname(socket_path), mode=0o700, exist_ok=True)
+
+    daemon = ConfigDaemon(manager)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    response = {'ok': False, 'error': "Malformed request"}
+                else:
+                    response = daemon.handle(request) if isinstance(request, dict) else \
+                        {'ok': False, 'error': "Malformed request"}
+                self.wfile.write(json.dumps(response, default=str).encode('utf-8') + b'\n')
+                if daemon._stopping.is_set():
+                    threading.Thread(target=server.shutdown, daemon=True).start()
+                    return
+
+    class Server(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+        # Unix sockets refuse connections beyond the backlog outright
+        request_queue_size = 128
+
+    # Only the owner may connect
+    umask = os.umask(0o177)
+    try:
+        server = Server(socket_path, Handler)
+    finally:
+        os.umask(umask)
+    threading.Thread(target=daemon.write_loop, name='kcm-writer', daemon=True).start()
+    threading.Thread(target=daemon.watch_loop, name='kcm-watcher', daemon=True).start()
+
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, stop)
+    print(f"Serving {os.pathsep.join(daemon.paths)} on {socket_path}", file=sys.stderr, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon._stopping.set()
+        server.server_close()
+        try:
+            os.unlink(socket_path)
+        except FileNotFoundError:
+            pass
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--config', help='kubeconfig file (default: KUBECONFIG or ~/.kube/config)')
+    parser.add_argument('--socket', help=f'socket path (default: {DAEMON_SOCKET})')
+    args = parser.parse_args()
+
+    from kube_config_manager import KubeConfigManager
+
+    try:
+        serve(KubeConfigManager(os.path.abspath(args.config) if args.config else None), args.socket)
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
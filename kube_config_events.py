@@ -0,0 +1,137 @@
+"""Partial kubeconfig parsing driven by the PyYAML event stream.
+
+Listing contexts only needs the `contexts` section and the `current-context`
+scalar. Walking the events lets us build Python objects for just those two
+keys and step over the (much larger) clusters and users payloads without
+constructing them.
+"""
+
+from typing import Dict, Iterator, List, Tuple
+
+import yaml
+from yaml.constructor import SafeConstructor
+from yaml.events import (AliasEvent, CollectionStartEvent, MappingEndEvent, MappingStartEvent,
+                         ScalarEvent, SequenceEndEvent, SequenceStartEvent)
+from yaml.nodes import MappingNode, ScalarNode, SequenceNode
+from yaml.resolver import Resolver
+
+LISTING_KEYS = ('contexts', 'current-context')
+
+
+class ListingUnsupported(Exception):
+    """The document cannot be listed from events alone; use a full parse."""
+
+
+def _compose(event, events: Iterator, resolver: Resolver, anchors: Dict):
+    """Build a node tree from the events of one value, like yaml.composer does."""
+    if isinstance(event, AliasEvent):
+        if event.anchor not in anchors:
+            # The anchor lives in a section we skipped
+            raise ListingUnsupported(f"alias '{event.anchor}' refers to a skipped section")
+        return anchors[event.anchor]
+
+    if isinstance(event, ScalarEvent):
+        tag = event.tag
+        if tag is None or tag == '!':
+            tag = resolver.resolve(ScalarNode, event.value, event.implicit)
+        node = ScalarNode(tag, event.value, event.start_mark, event.end_mark, style=event.style)
+    elif isinstance(event, SequenceStartEvent):
+        tag = event.tag
+        if tag is None or tag == '!':
+            tag = resolver.resolve(SequenceNode, None, event.implicit)
+        node = SequenceNode(tag, [], event.start_mark, None, flow_style=event.flow_style)
+        for child in events:
+            if isinstance(child, SequenceEndEvent):
+                node.end_mark = child.end_mark
+                break
+            node.value.append(_compose(child, events, resolver, anchors))
+    elif isinstance(event, MappingStartEvent):
+        tag = event.tag
+        if tag is None or tag == '!':
+            tag = resolver.resolve(MappingNode, None, event.implicit)
+        node = MappingNode(tag, [], event.start_mark, None, flow_style=event.flow_style)
+        for child in events:
+            if isinstance(child, MappingEndEvent):
+                node.end_mark = child.end_mark
+                break
+            key = _compose(child, events, resolver, anchors)
+            node.value.append((key, _compose(next(events), events, resolver, anchors)))
+    else:
+        raise ListingUnsupported(f"unexpected {event.__class__.__name__}")
+
+    if getattr(event, 'anchor', None):
+        anchors[event.anchor] = node
+    return node
+
+
+def _skip(event, events: Iterator):
+    """Consume the events of one value without building anything."""
+    if not isinstance(event, CollectionStartEvent):
+        return
+    depth = 1
+    for child in events:
+        if isinstance(child, CollectionStartEvent):
+            depth += 1
+        elif isinstance(child, (MappingEndEvent, SequenceEndEvent)):
+            depth -= 1
+            if depth == 0:
+                return
+
+
+def parse_context_listing(stream, loader=yaml.SafeLoader) -> Tuple[List[Dict], str]:
+    """Return (contexts, current_context) from a kubeconfig stream.
+
+    Only the contexts section and the current-context scalar are
+    constructed; everything else is skipped at the event level, and
+    parsing stops as soon as both keys have been seen. Raises
+    ListingUnsupported when the document needs a full parse.
+    """
+    events = yaml.parse(stream, Loader=loader)
+    resolver = Resolver()
+    constructor = SafeConstructor()
+    anchors: Dict = {}
+    found: Dict = {}
+    try:
+        for event in events:
+            if isinstance(event, MappingStartEvent):
+                break
+            if isinstance(event, (CollectionStartEvent, ScalarEvent, AliasEvent)):
+                raise ListingUnsupported("top level of the document is not a mapping")
+        else:
+            return [], ''
+
+        for event in events:
+            if isinstance(event, MappingEndEvent):
+                break
+            if not isinstance(event, ScalarEvent):
+                # Complex keys never name a kubeconfig section
+                _skip(event, events)
+                _skip(next(events), events)
+                continue
+
+            value_event = next(events)
+            if event.value == 'contexts' and isinstance(value_event, SequenceStartEvent) \
+                    and not value_event.anchor:
+                # Construct entry by entry so only one entry's nodes are alive at a time
+                contexts = []
+                for item in events:
+                    if isinstance(item, SequenceEndEvent):
+                        break
+                    node = _compose(item, events, resolver, anchors)
+                    contexts.append(constructor.construct_document(node))
+                found['contexts'] = contexts
+            elif event.value in LISTING_KEYS:
+                node = _compose(value_event, events, resolver, anchors)
+                found[event.value] = constructor.construct_document(node)
+            else:
+                _skip(value_event, events)
+                continue
+            if len(found) == len(LISTING_KEYS):
+                break
+    finally:
+        events.close()
+
+    contexts = found.get('contexts') or []
+    if not isinstance(contexts, list):
+        raise ListingUnsupported("contexts is not a list")
+    return contexts, found.get('current-context') or ''
@@ -1,20 +1,166 @@
 import os
+import atexit
+import copy
+import hashlib
+import marshal
+import mmap
+import struct
 import yaml
 import shutil
 import tempfile
 import subprocess
 import platform
+import random
 import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, compare-and-swap still applies
+    fcntl = None
+
+from kube_config_current import kubeconfig_paths, read_current_context
+from kube_config_events import ListingUnsupported, parse_context_listing
+from kube_config_import import merge_parsed, parse_sources
+from kube_config_merge import MergedView, assign_document, default_kubeconfig_path, file_key, upsert_document
+from kube_config_model import SECTIONS, KubeConfigModel, context_refs
+from kube_config_nks import (NKS_CONCURRENCY, NKS_RETRIES, NKS_TIMEOUT, authenticator_error, list_region_clusters,
+                             normalize_clusters, plan_region_sync, run_update_kubeconfig_batch,
+                             update_kubeconfig_command)
+from kube_config_sessions import (SESSION_DIR, base_paths, collect_sessions, current_session_id, is_overlay,
+                                  kubeconfig_value, overlay_path, remove_overlay, write_overlay)
+from kube_config_shards import INDEX_NAME, ShardedView
+from kube_config_token_cache import is_nks_user, unwrap_user, wrap_user, wrapped_command
+from kube_config_writer import SourceLayout, extract_layout, render_full, render_splice
+
+# Prefer the libyaml bindings when PyYAML was built with them; they parse and
+# emit the same documents as the pure-Python classes, only much faster.
+YAML_BACKENDS = {'python': (yaml.SafeLoader, yaml.SafeDumper)}
+if getattr(yaml, '__with_libyaml__', False):
+    YAML_BACKENDS['libyaml'] = (yaml.CSafeLoader, yaml.CSafeDumper)
+DEFAULT_YAML_BACKEND = 'libyaml' if 'libyaml' in YAML_BACKENDS else 'python'
+
+# How hard a save pushes the new file to stable storage: not at all, fsync
+# the file before the rename, or also fsync the directory after it
+DURABILITY_NONE = 'none'
+DURABILITY_FILE = 'file'
+DURABILITY_DIRECTORY = 'directory'
+DURABILITY_LEVELS = (DURABILITY_NONE, DURABILITY_FILE, DURABILITY_DIRECTORY)
+DEFAULT_DURABILITY = DURABILITY_FILE
+
+# Read-modify-write cycles: how long to wait for the advisory lock, and how
+# often to re-apply a mutation after another program changed the file
+LOCK_TIMEOUT = 10.0
+COMMIT_ATTEMPTS = 8
+COMMIT_BACKOFF = 0.02
+
+# Sidecar snapshot layout: magic, format version, marshal version, source
+# size and mtime_ns, SHA-256 of the source and of the marshal payload
+# (a (document, source layout) tuple)
+SNAPSHOT_MAGIC = b'KCMSNAP\0'
+SNAPSHOT_VERSION = 3
+SNAPSHOT_HEADER = struct.Struct('>8sIIQQ32s32s')
+
+
+def copy_file_range(src, dst, offset: int, length: int):
+    """Append length bytes of src starting at offset to dst's current position."""
+    src_fd, dst_fd = src.fileno(), dst.fileno()
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while length > 0:
+                copied = os.copy_file_range(src_fd, dst_fd, length, offset)
+                if copied == 0:
+                    break
+                offset += copied
+                length -= copied
+            if length == 0:
+                return
+        except OSError:
+            pass
+    while length > 0:
+        block = os.pread(src_fd, min(length, 1 << 20), offset)
+        if not block:
+            raise OSError(f"Unexpected end of file while copying {src.name}")
+        os.write(dst_fd, block)
+        offset += len(block)
+        length -= len(block)
+
+
+class ConfigConflict(OSError):
+    """The config file was changed by someone else between load and save."""
 
 
 class KubeConfigManager:
-    def __init__(self, config_path: Optional[str] = None):
-        self.config_path = config_path or os.path.expanduser("~/.kube/config")
+    def __init__(self, config_path: Optional[str] = None, yaml_backend: Optional[str] = None,
+                 use_snapshot: bool = True, durability: Optional[str] = None, create: bool = True,
+                 shard_dir: Optional[str] = None):
+        # An explicit path is used alone; otherwise KUBECONFIG (or ~/.kube/config) applies.
+        # With shard_dir, the config is the index plus per-context shards in that directory.
+        if shard_dir:
+            self.config_paths = [os.path.join(shard_dir, INDEX_NAME)]
+        else:
+            self.config_paths = [config_path] if config_path else kubeconfig_paths()
+        # Terminal session overlays only hold current-context; new entries go to the shared files
+        self.session_dir = SESSION_DIR
+        self.config_path = default_kubeconfig_path(base_paths(self.config_paths, self.session_dir)
+                                                   or self.config_paths)
         self.config_dir = os.path.dirname(self.config_path)
         self.backup_path = f"{self.config_path}.backup"
-        self._ensure_config_exists()
+        self.yaml_backend = yaml_backend or DEFAULT_YAML_BACKEND
+        if self.yaml_backend not in YAML_BACKENDS:
+            raise ValueError(f"YAML backend '{self.yaml_backend}' is not available "
+                             f"(available: {', '.join(sorted(YAML_BACKENDS))})")
+        self._yaml_loader, self._yaml_dumper = YAML_BACKENDS[self.yaml_backend]
+        self.durability = durability or DEFAULT_DURABILITY
+        if self.durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Unknown durability '{self.durability}' "
+                             f"(expected one of: {', '.join(DURABILITY_LEVELS)})")
+        # Binary snapshot of the parsed config for fast cold starts
+        self.snapshot_path = (os.path.join(self.config_dir, f".{os.path.basename(self.config_path)}.kcm-cache")
+                              if use_snapshot else None)
+        # Parsed config cache, keyed on the file's (inode, size, mtime_ns)
+        self._cache_key = None
+        self._cache_model = None
+        self._cache_layout = None
+        # SHA-256 of the file content behind the cache, when known
+        self._cache_digest = None
+        # Contexts-only listing, kept separately from the full model
+        self._listing_key = None
+        self._listing = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.snapshot_hits = 0
+        # Per-save report (see save_model) and running totals
+        self.last_write: Optional[Dict] = None
+        self.write_stats = {'writes': 0, 'skipped': 0, 'bytes': 0, 'elapsed_ms': 0.0}
+        self._snapshot_pending = False
+        # Advisory lock serializing read-modify-write cycles across processes
+        self.lock_path = os.path.join(self.config_dir, f".{os.path.basename(self.config_path)}.kcm-lock")
+        self._thread_lock = threading.RLock()
+        self._lock_depth = 0
+        self.conflicts = 0
+        # Several KUBECONFIG files or shards: one manager per file behind a merged view
+        self._merged = None
+        if shard_dir:
+            self._merged = ShardedView(shard_dir, lambda path, create: KubeConfigManager(
+                path, yaml_backend, False, durability, create=create))
+        elif len(self.config_paths) > 1:
+            overlays = [path for path in self.config_paths if is_overlay(path, self.session_dir)]
+            layers = []
+            for path in self.config_paths:
+                layer = KubeConfigManager(path, yaml_backend, use_snapshot and path not in overlays, durability,
+                                          create=path == self.config_path)
+                if path in overlays:
+                    # No snapshot or lock files next to session overlays: they share the shared config's lock
+                    layer.lock_path = self.lock_path
+                layers.append(layer)
+            self._merged = MergedView(layers, self.config_paths.index(self.config_path), overlays)
+        if create:
+            self._ensure_config_exists()
 
     def _get_default_ncp_authenticator_path(self):
         """Return the default path for ncp-iam-authenticator, considering PyInstaller bundle."""
@@ -53,36 +199,32 @@ class KubeConfigManager:
 
     def add_nks_context(self, cluster_uuid, region, alias=None, authenticator_path=None, kubeconfig_path=None):
         """Add NKS context using ncp-iam-authenticator."""
+        staging_dir = None
         try:
             actual_authenticator_path = self.check_ncp_authenticator_exists(authenticator_path)
             
-            cmd = [
-                actual_authenticator_path,
-                "update-kubeconfig",
-                "--clusterUuid", cluster_uuid,
-                "--region", region
-            ]
-
-            if alias:
-                cmd.extend(["--alias", alias])
-            
             target_kubeconfig = kubeconfig_path or self.config_path
-            cmd.extend(["--kubeconfig", target_kubeconfig])
+            # Shards: let the authenticator write a scratch file, then merge it into a shard
+            if kubeconfig_path is None and isinstance(self._merged, ShardedView):
+                staging_dir = tempfile.mkdtemp(prefix='kcm-nks-')
+                target_kubeconfig = os.path.join(staging_dir, 'config')
+            cmd = update_kubeconfig_command(actual_authenticator_path, cluster_uuid, region, alias,
+                                            target_kubeconfig)
 
             os.makedirs(os.path.dirname(target_kubeconfig), exist_ok=True)
 
-            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-            stdout, stderr = process.communicate()
+            # Keep our own writers out while the authenticator rewrites the file
+            shared = os.path.abspath(target_kubeconfig) == os.path.abspath(self.config_path)
+            with self.locked() if shared else nullcontext():
+                process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                stdout, stderr = process.communicate()
 
             if process.returncode != 0:
-                error_message = f"ncp-iam-authenticator failed with error code {process.returncode}:\nSTDERR: {stderr.strip()}\nSTDOUT: {stdout.strip()}"
-                if "cluster not found" in stderr.lower():
-                     error_message += "\n\nPlease check if the Cluster UUID and Region are correct."
-                elif "access denied" in stderr.lower() or "unauthorized" in stderr.lower():
-                    error_message += "\n\nPlease check your NCP IAM credentials and permissions."
-                elif "no such file or directory" in stderr.lower() and actual_authenticator_path in stderr:
-                    error_message = f"ncp-iam-authenticator command failed. It seems the path '{actual_authenticator_path}' is incorrect or the tool is not installed properly.\nSTDERR: {stderr.strip()}"
-                raise Exception(error_message)
+                raise Exception(authenticator_error(actual_authenticator_path, process.returncode,
+                                                    stdout, stderr))
+
+            if staging_dir:
+                self._commit(upsert_document(self._read_kubeconfig_file(target_kubeconfig)))
 
             # update-kubeconfig command modifies the file directly, so we just need to reload
             # self.load_config() # Reload to reflect changes made by the authenticator - assuming load_config loads self.config_path
@@ -97,6 +239,238 @@ class KubeConfigManager:
             stderr_msg = stderr.strip() if 'stderr' in locals() and stderr else 'N/A'
             stdout_msg = stdout.strip() if 'stdout' in locals() and stdout else 'N/A'
             return False, f"Error adding NKS context: {str(e)}\nSTDOUT: {stdout_msg}\nSTDERR: {stderr_msg}"
+        finally:
+            if staging_dir:
+                shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def nks_update_command(self, cluster_uuid: str, region: str, alias: Optional[str], kubeconfig_path: str,
+                           authenticator_path: Optional[str] = None) -> List[str]:
+        """Return the authenticator command add_nks_context() runs, for running it elsewhere.
+
+        Point kubeconfig_path at a scratch file and pass it to
+        apply_nks_kubeconfig() afterwards. Raises FileNotFoundError or
+        PermissionError if the authenticator is missing.
+        """
+        authenticator = self.check_ncp_authenticator_exists(authenticator_path)
+        return update_kubeconfig_command(authenticator, cluster_uuid, region, alias, kubeconfig_path)
+
+    def apply_nks_kubeconfig(self, file_path: str) -> Tuple[bool, str]:
+        """Merge a kubeconfig written by the authenticator, replacing entries with the same names.
+
+        Like update-kubeconfig on the real file, this also switches to the
+        new context.
+        """
+        try:
+            self._commit(upsert_document(self._read_kubeconfig_file(file_path)))
+        except (ValueError, OSError, yaml.YAMLError) as e:
+            return False, f"Error adding NKS context: {e}"
+        return True, "NKS context added/updated successfully."
+
+    def add_nks_contexts(self, clusters: List[tuple], authenticator_path: Optional[str] = None,
+                         concurrency: int = NKS_CONCURRENCY, timeout: float = NKS_TIMEOUT,
+                         retries: int = NKS_RETRIES) -> Tuple[bool, List[Dict]]:
+        """Add NKS contexts for many (cluster_uuid, region[, alias]) tuples with one save.
+
+        The authenticator runs concurrently (at most concurrency at a time,
+        each with a timeout and retries), every run writing to its own
+        scratch kubeconfig as add_nks_context(kubeconfig_path=...) would.
+        The clusters that succeeded are then merged into the config in a
+        single commit; current-context is left alone. Returns (whether all
+        clusters were added, one result per cluster as described in
+        kube_config_nks.run_update_kubeconfig_batch()).
+        """
+        try:
+            clusters = normalize_clusters(clusters)
+            authenticator = self.check_ncp_authenticator_exists(authenticator_path)
+        except (ValueError, FileNotFoundError, PermissionError) as e:
+            return False, [{'cluster_uuid': None, 'region': None, 'alias': None, 'kubeconfig': None,
+                            'ok': False, 'message': str(e), 'attempts': 0, 'elapsed_ms': 0.0}]
+
+        results = self._provision_nks(authenticator, clusters, concurrency, timeout, retries)
+        return all(result['ok'] for result in results), results
+
+    def _provision_nks(self, authenticator: str, clusters: List[tuple], concurrency: int, timeout: float,
+                       retries: int, extra: Optional[Callable[[KubeConfigModel], None]] = None) -> List[Dict]:
+        """Run the authenticator for clusters and commit the outputs, plus extra, in one save.
+
+        Raises ValueError or OSError from the save only when extra fails;
+        otherwise a failed save marks the successful results as failed.
+        """
+        staging_dir = tempfile.mkdtemp(prefix='kcm-nks-')
+        try:
+            results = run_update_kubeconfig_batch(authenticator, clusters, staging_dir,
+                                                  concurrency, timeout, retries)
+            mutations = []
+            for result in results:
+                if not result['ok']:
+                    continue
+                try:
+                    document = self._read_kubeconfig_file(result['kubeconfig'])
+                except (OSError, ValueError, yaml.YAMLError) as e:
+                    result.update(ok=False, message=f"Cannot read the authenticator output: {e}")
+                    continue
+                mutations.append(upsert_document({section: document.get(section) for section in SECTIONS}))
+            if extra is not None:
+                mutations.append(extra)
+
+            if mutations:
+                def apply_all(model):
+                    for mutation in mutations:
+                        mutation(model)
+
+                try:
+                    self._commit(apply_all)
+                except (OSError, ValueError) as e:
+                    for result in results:
+                        if result['ok']:
+                            result.update(ok=False, message=f"Error saving kubeconfig: {e}")
+                    if extra is not None:
+                        raise
+            return results
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def sync_nks_region(self, region: str, prune: bool = False, lister: Optional[List[str]] = None,
+                        authenticator_path: Optional[str] = None, concurrency: int = NKS_CONCURRENCY,
+                        timeout: float = NKS_TIMEOUT, retries: int = NKS_RETRIES) -> Tuple[bool, Dict]:
+        """Bring the NKS contexts of region in line with the clusters the lister reports.
+
+        Clusters are matched to contexts by UUID (see kube_config_nks), so
+        only new clusters and clusters whose endpoint changed run the
+        authenticator, concurrently; changed clusters keep their context
+        name. With prune, NKS contexts of region whose cluster is no longer
+        listed are deleted in the same save. Returns (success, report) with
+        the 'new', 'changed', 'unchanged' and 'stale' entries of
+        plan_region_sync(), the 'pruned' context names and the authenticator
+        'results'; on failure report['error'] says why.
+        """
+        report = {'new': [], 'changed': [], 'unchanged': [], 'stale': [], 'pruned': [], 'results': []}
+        try:
+            clusters = list_region_clusters(region, lister, timeout)
+            model = self.load_model()
+            if model is None:
+                raise OSError("Failed to load kubeconfig.")
+            report.update(plan_region_sync(model, region, clusters))
+            work = ([(cluster['uuid'], region, None) for cluster in report['new']] +
+                    [(cluster['uuid'], region, cluster['context']) for cluster in report['changed']])
+            authenticator = self.check_ncp_authenticator_exists(authenticator_path) if work else None
+        except (ValueError, OSError) as e:
+            report['error'] = str(e)
+            return False, report
+
+        extra = None
+        if prune and report['stale']:
+            def extra(model):
+                # Decided again on the fresh model in case the file changed meanwhile
+                current = plan_region_sync(model, region, clusters)['stale']
+                for name in current:
+                    model.delete_context(name)
+                report['pruned'] = current
+
+        try:
+            report['results'] = self._provision_nks(authenticator, work, concurrency, timeout, retries, extra)
+        except (ValueError, OSError) as e:
+            report['error'] = f"Error saving kubeconfig: {e}"
+            report['pruned'] = []
+            return False, report
+        return all(result['ok'] for result in report['results']), report
+
+    def set_token_cache(self, context_names: List[str], enabled: bool) -> Tuple[bool, str]:
+        """Route the NKS users of the given contexts through the token cache, or back.
+
+        See kube_config_token_cache. Fails without writing anything if a
+        context does not exist or does not use ncp-iam-authenticator.
+        """
+        if enabled and getattr(sys, 'frozen', False):
+            # The wrapper is run with sys.executable, which is the app itself in a bundle
+            return False, "The token cache needs a Python installation and is not available in the packaged app."
+
+        def mutation(model):
+            for name in context_names:
+                entry = model.contexts.get(name)
+                if entry is None:
+                    raise ValueError(f"Context '{name}' not found.")
+                user_name = context_refs(entry)[1]
+                user = model.users.get(user_name)
+                if user is None or not is_nks_user(user):
+                    raise ValueError(f"Context '{name}' does not use ncp-iam-authenticator.")
+                changed = wrap_user(user) if enabled else unwrap_user(user)
+                if changed is not user:
+                    model.replace_entry('users', user_name, changed)
+
+        try:
+            self._commit(mutation)
+        except (ValueError, OSError) as e:
+            return False, str(e)
+        state = "enabled" if enabled else "disabled"
+        return True, f"Token cache {state} for {', '.join(context_names)}."
+
+    def get_token_cache_status(self) -> Dict[str, str]:
+        """Map each NKS context to 'cached' or 'direct' (not using the token cache)."""
+        model = self.load_model()
+        if model is None:
+            return {}
+        status = {}
+        for entry in model.contexts:
+            user = model.users.get(context_refs(entry)[1])
+            if user is not None and is_nks_user(user):
+                status[entry['name']] = 'cached' if wrapped_command(user['user']['exec']) else 'direct'
+        return status
+
+    def start_session(self, session_id: Optional[str] = None, context_name: Optional[str] = None,
+                      namespace: Optional[str] = None) -> Tuple[bool, str]:
+        """Create the overlay of a terminal session; return (success, KUBECONFIG value or message).
+
+        The session starts at context_name (default: the current context).
+        The returned KUBECONFIG value puts the overlay in front of the
+        shared files. Overlays of sessions that are gone are removed first.
+        """
+        self.collect_sessions()
+        session_id = session_id or current_session_id()
+        context_name = context_name or self.get_current_context()
+        if not context_name:
+            return False, "No current context to start the session with; name one."
+        success, message = self.set_session_context(context_name, namespace, session_id)
+        if not success:
+            return False, message
+        overlay = overlay_path(session_id, self.session_dir)
+        return True, kubeconfig_value(overlay, self.config_paths, self.session_dir)
+
+    def set_session_context(self, context_name: str, namespace: Optional[str] = None,
+                            session_id: Optional[str] = None) -> Tuple[bool, str]:
+        """Switch a session to context_name by rewriting only its overlay.
+
+        With namespace, the overlay also holds a copy of the context using
+        that namespace, for kubectl. This manager reads it as a namespace
+        override only: renames, deletes and other edits still go to the
+        shared files, and the copy follows them.
+        """
+        contexts, _ = self.get_context_listing()
+        entry = next((context for context in contexts if context.get('name') == context_name), None)
+        if entry is None:
+            return False, f"Context '{context_name}' not found"
+        document = {'apiVersion': 'v1', 'kind': 'Config', 'current-context': context_name}
+        if namespace:
+            document['contexts'] = [{'name': context_name,
+                                     'context': {**(entry.get('context') or {}), 'namespace': namespace}}]
+        path = overlay_path(session_id or current_session_id(), self.session_dir)
+        try:
+            write_overlay(path, self._dump_yaml(document))
+        except OSError as e:
+            return False, f"Error writing session overlay: {e}"
+        return True, f"Switched to context '{context_name}' in this session."
+
+    def end_session(self, session_id: Optional[str] = None) -> Tuple[bool, str]:
+        """Remove the overlay of a session; return (success, KUBECONFIG value without it or message)."""
+        try:
+            remove_overlay(overlay_path(session_id or current_session_id(), self.session_dir))
+        except OSError as e:
+            return False, f"Error removing session overlay: {e}"
+        return True, kubeconfig_value(None, self.config_paths, self.session_dir)
+
+    def collect_sessions(self) -> List[str]:
+        """Remove the overlays of terminal sessions that are gone; return their paths."""
+        return collect_sessions(self.session_dir)
 
     def rename_context(self, old_name: str, new_name: str) -> tuple[bool, str]:
         """Rename an existing context.
@@ -111,34 +485,20 @@ class KubeConfigManager:
         if not new_name.strip():
             return False, "New context name cannot be empty."
         
-        config = self.load_config()
-        if not config:
-            return False, "Failed to load kubeconfig."
-
-        # Check if new_name already exists
-        existing_context_names = [c['name'] for c in config.get('contexts', [])]
-        if new_name in existing_context_names:
-            return False, f"Context name '{new_name}' already exists."
-
-        context_found = False
-        for context_entry in config.get('contexts', []):
-            if context_entry.get('name') == old_name:
-                context_entry['name'] = new_name
-                context_found = True
-                break
-        
-        if not context_found:
-            return False, f"Context '{old_name}' not found."
-
-        # Update current-context if it matches old_name
-        if config.get('current-context') == old_name:
-            config['current-context'] = new_name
-        
-        if self.save_config(config):
-            return True, f"Context '{old_name}' renamed to '{new_name}' successfully."
-        else:
-            return False, "Failed to save updated kubeconfig."
+        try:
+            self._commit(lambda model: model.rename_context(old_name, new_name))
+        except (ValueError, OSError) as e:
+            return False, str(e)
+        return True, f"Context '{old_name}' renamed to '{new_name}' successfully."
     
+    def _load_yaml(self, stream) -> Optional[Dict]:
+        """Parse a YAML document with the active backend."""
+        return yaml.load(stream, Loader=self._yaml_loader)
+
+    def _dump_yaml(self, data: Dict, stream=None):
+        """Serialize a YAML document with the active backend."""
+        return yaml.dump(data, stream, Dumper=self._yaml_dumper, default_flow_style=False)
+
     def _ensure_config_exists(self):
         """Ensure the kube config directory and file exist."""
         os.makedirs(self.config_dir, exist_ok=True)
@@ -156,142 +516,726 @@ class KubeConfigManager:
             'current-context': ''
         }
         with open(self.config_path, 'w', encoding='utf-8') as f:
-            yaml.dump(empty_config, f, default_flow_style=False)
+            self._dump_yaml(empty_config, f)
     
-    def load_config(self) -> Dict:
-        """Load the kubeconfig file."""
+    def _stat_key(self) -> Optional[tuple]:
+        """Return the (inode, size, mtime_ns) cache key of the config file."""
+        return file_key(self.config_path)
+
+    def watch_paths(self) -> Tuple[List[str], List[str]]:
+        """Return the (files, directories) to watch for changes to the config.
+
+        Files are replaced by rename on every save, so watchers should follow
+        their directories too. Any entry added to or removed from one of the
+        returned directories (the shard directory) changes the config.
+        """
+        if isinstance(self._merged, ShardedView):
+            return self._merged._paths(), [self._merged.shard_dir]
+        return [os.path.abspath(path) for path in self.config_paths], []
+
+    def changed_on_disk(self) -> bool:
+        """Whether the config files differ from what this manager last read or wrote.
+
+        Saves update the cache keys, so the manager's own writes do not
+        count. Cheap: one stat per file.
+        """
+        if self._merged is not None:
+            return self._merged.changed_on_disk()
+        key = self._stat_key()
+        return key != self._cache_key and key != self._listing_key
+
+    def invalidate_cache(self):
+        """Drop the parsed config so the next load re-reads the file."""
+        self._cache_key = None
+        self._cache_model = None
+        self._cache_layout = None
+        self._cache_digest = None
+        self._listing_key = None
+        self._listing = None
+        if self._merged is not None:
+            self._merged.invalidate()
+
+    def get_cache_stats(self) -> Dict:
+        """Return hit/miss counters of the parsed config cache.
+
+        With several KUBECONFIG files the counters are summed over the
+        files, and merged_updates counts files re-merged into the view.
+        """
+        if self._merged is not None:
+            stats = [layer.get_cache_stats() for layer in self._merged.layers]
+            totals = {key: sum(layer[key] for layer in stats) for key in stats[0]}
+            return dict(totals, merged_updates=self._merged.layer_updates)
+        return {'hits': self.cache_hits, 'misses': self.cache_misses,
+                'snapshot_hits': self.snapshot_hits}
+
+    def get_write_stats(self) -> Dict:
+        """Return save totals and compare-and-swap conflicts, plus the report of the last save.
+
+        With several KUBECONFIG files, 'files' maps each path to its own stats.
+        """
+        if self._merged is not None:
+            files = {layer.config_path: layer.get_write_stats() for layer in self._merged.layers}
+            totals = {key: sum(stats[key] for stats in files.values())
+                      for key in ('writes', 'skipped', 'bytes', 'elapsed_ms', 'conflicts')}
+            return dict(totals, files=files)
+        return dict(self.write_stats, conflicts=self.conflicts, last=self.last_write)
+
+    def load_model(self) -> Optional[KubeConfigModel]:
+        """Load the kubeconfig file as an indexed KubeConfigModel.
+
+        The model is cached until the file changes on disk and is shared
+        with the cache: mutate a copy() of it and pass that to save_model().
+        Returns None if the file cannot be read or parsed.
+
+        With several KUBECONFIG files this is the merged view; see
+        kube_config_merge.
+        """
+        if self._merged is not None:
+            return self._merged.load()
+
+        key = self._stat_key()
+        if key is not None and key == self._cache_key:
+            self.cache_hits += 1
+            return self._cache_model
+
+        self.cache_misses += 1
         try:
-            with open(self.config_path, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f) or {}
+            with open(self.config_path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                data = f.read()
+            digest = hashlib.sha256(data).digest()
+
+            snapshot = self._read_snapshot(st, digest)
+            if snapshot is not None:
+                document, plain_layout = snapshot
+                model = KubeConfigModel(document)
+                layout = SourceLayout.from_plain(plain_layout, model) if plain_layout else None
+            else:
+                model, layout = self._parse_with_layout(data)
+                self._write_snapshot(st, digest, model, layout)
         except Exception as e:
             print(f"Error loading config: {e}")
+            self.invalidate_cache()
+            return None
+
+        self._cache_key = (st.st_ino, st.st_size, st.st_mtime_ns)
+        self._cache_model = model
+        self._cache_layout = layout
+        self._cache_digest = digest
+        return model
+
+    def _parse_with_layout(self, data: bytes) -> Tuple[KubeConfigModel, Optional[SourceLayout]]:
+        """Parse YAML into a model plus the source layout used for minimal-diff saves."""
+        text = data.decode('utf-8')
+        loader = self._yaml_loader(text)
+        try:
+            root = loader.get_single_node()
+            document = loader.construct_document(root) if root is not None else None
+        finally:
+            loader.dispose()
+
+        model = KubeConfigModel(document or {})
+        layout = extract_layout(text, root, model) if isinstance(document, dict) else None
+        return model, layout
+
+    def _read_snapshot(self, st: os.stat_result, digest: bytes) -> Optional[tuple]:
+        """Return (document, plain layout) from the binary snapshot if it matches the file.
+
+        The snapshot must have the current format version, the size and
+        mtime of the config file, and the SHA-256 of its content. A
+        truncated or corrupt payload is detected by its own checksum.
+        """
+        if not self.snapshot_path:
+            return None
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                blob = f.read()
+        except OSError:
+            return None
+        if len(blob) < SNAPSHOT_HEADER.size:
+            return None
+
+        (magic, version, marshal_version, size, mtime_ns,
+         source_digest, payload_digest) = SNAPSHOT_HEADER.unpack_from(blob)
+        if (magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION
+                or marshal_version != marshal.version):
+            return None
+        if size != st.st_size or mtime_ns != st.st_mtime_ns:
+            return None
+        if digest != source_digest:
+            return None
+
+        payload = memoryview(blob)[SNAPSHOT_HEADER.size:]
+        if hashlib.sha256(payload).digest() != payload_digest:
+            print(f"Ignoring corrupt config snapshot {self.snapshot_path}")
+            return None
+        try:
+            snapshot = marshal.loads(payload)
+        except (EOFError, ValueError, TypeError):
+            return None
+        if not isinstance(snapshot, tuple) or len(snapshot) != 2 or not isinstance(snapshot[0], dict):
+            return None
+        self.snapshot_hits += 1
+        return snapshot
+
+    def _write_snapshot(self, st: os.stat_result, digest: bytes, model: KubeConfigModel,
+                        layout: Optional[SourceLayout]):
+        """Store model and layout as the binary snapshot of a config file with stat st and SHA-256 digest."""
+        if not self.snapshot_path:
+            return
+        try:
+            payload = marshal.dumps((model.to_dict(), layout.to_plain(model) if layout else None))
+        except ValueError:
+            # e.g. timestamps, which marshal cannot store; keep parsing YAML
+            self._remove_snapshot()
+            return
+        header = SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, marshal.version, st.st_size, st.st_mtime_ns,
+            digest, hashlib.sha256(payload).digest())
+
+        # mkstemp creates the file 0600, which matters as it holds credentials
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.config_dir, prefix=os.path.basename(self.snapshot_path))
+        except OSError as e:
+            print(f"Error writing config snapshot: {e}")
+            return
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(header)
+                f.write(payload)
+            os.replace(temp_path, self.snapshot_path)
+        except OSError as e:
+            print(f"Error writing config snapshot: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _remove_snapshot(self):
+        if self.snapshot_path and os.path.exists(self.snapshot_path):
+            try:
+                os.remove(self.snapshot_path)
+            except OSError:
+                pass
+
+    def _schedule_snapshot_refresh(self):
+        """Refresh the snapshot from the cached model at interpreter exit."""
+        if self.snapshot_path and not self._snapshot_pending:
+            self._snapshot_pending = True
+            atexit.register(self.flush_snapshot)
+
+    def flush_snapshot(self):
+        """Write a deferred snapshot refresh now, if one is pending."""
+        if not self._snapshot_pending:
+            return
+        self._snapshot_pending = False
+        atexit.unregister(self.flush_snapshot)
+        model = self._cache_model
+        if model is None or self.snapshot_path is None:
+            return
+        try:
+            with open(self.config_path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                if (st.st_ino, st.st_size, st.st_mtime_ns) != self._cache_key or not st.st_size:
+                    return
+                if self._cache_digest is None:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        self._cache_digest = hashlib.sha256(mm).digest()
+            self._write_snapshot(st, self._cache_digest, model, self._cache_layout)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Error writing config snapshot: {e}")
+
+    def load_config(self) -> Dict:
+        """Load the kubeconfig file.
+
+        Returns a private copy of the document that the caller may modify
+        and hand back to save_config().
+        """
+        model = self.load_model()
+        if model is None:
             return {}
+        return copy.deepcopy(model.to_dict())
     
     def save_config(self, config: Dict) -> bool:
         """Save the kubeconfig file atomically to prevent data corruption."""
+        if self._merged is not None:
+            try:
+                self._commit(lambda model: assign_document(model, config))
+                return True
+            except (ValueError, OSError) as e:
+                print(f"Error saving config: {e}")
+                return False
+        return self.save_model(KubeConfigModel(config))
+
+    def _atomic_write(self, *chunks, precondition: Optional[Callable[[], None]] = None) -> Dict:
+        """Write chunks to the config path through a temp file and an atomic move.
+
+        A chunk is either bytes or a (file, offset, length) range to copy
+        from another open file, which is done in-kernel where possible.
+        The file (and directory) are fsynced as the durability setting asks.
+        precondition is called right before the move and may raise to abort it.
+        Returns the bytes written, of which copied, the fsync time and the
+        stat key of the new file (taken before the move, so another writer
+        replacing the file right after us cannot be mistaken for our write).
+        """
+        report = {'bytes': 0, 'copied': 0, 'sync_ms': 0.0}
         # Use mkstemp to create a temporary file securely in the same directory
+        fd, temp_path = tempfile.mkstemp(dir=self.config_dir, prefix=f"{os.path.basename(self.config_path)}.")
         try:
-            fd, temp_path = tempfile.mkstemp(dir=self.config_dir, prefix=f"{os.path.basename(self.config_path)}.")
-            
-            # Write the new config to the temporary file
-            with os.fdopen(fd, 'w') as f:
-                yaml.dump(config, f, default_flow_style=False)
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    if isinstance(chunk, tuple):
+                        f.flush()
+                        copy_file_range(chunk[0], f, chunk[1], chunk[2])
+                        report['copied'] += chunk[2]
+                        report['bytes'] += chunk[2]
+                    else:
+                        f.write(chunk)
+                        report['bytes'] += len(chunk)
+                if self.durability != DURABILITY_NONE:
+                    started = time.perf_counter()
+                    f.flush()
+                    os.fsync(f.fileno())
+                    report['sync_ms'] += (time.perf_counter() - started) * 1000
+                f.flush()
+                st = os.fstat(f.fileno())
+                report['key'] = (st.st_ino, st.st_size, st.st_mtime_ns)
             
+            if precondition is not None:
+                precondition()
             # Atomically replace the original file with the new one
             shutil.move(temp_path, self.config_path)
+        except BaseException:
+            # Clean up the temporary file if it still exists from a failed write
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        if self.durability == DURABILITY_DIRECTORY and os.name == 'posix':
+            # Make the rename itself survive a crash
+            started = time.perf_counter()
+            dir_fd = os.open(self.config_dir, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+            report['sync_ms'] += (time.perf_counter() - started) * 1000
+        return report
+
+    def save_model(self, model: KubeConfigModel, rewrite: bool = False, if_unchanged: bool = False) -> bool:
+        """Save a KubeConfigModel atomically and make it the cached model.
+
+        When the file is unchanged since it was loaded, only the keys and
+        list entries that differ from it are serialized; everything else,
+        comments included, is copied byte for byte. Pass rewrite=True to
+        re-serialize the whole document instead.
+
+        A save that would reproduce the file byte for byte does no I/O.
+        Each save is reported in last_write: bytes written (and copied),
+        elapsed and fsync milliseconds, or skipped=True.
+
+        With if_unchanged=True the save is a compare-and-swap: it raises
+        ConfigConflict instead of replacing a file whose stat and content
+        no longer match what the cached model was loaded from.
+
+        With several KUBECONFIG files, model must be a copy() of
+        load_model(); each change is written to the file owning the entry.
+        """
+        if self._merged is not None:
+            try:
+                self._merged.save(model)
+                return True
+            except ConfigConflict:
+                raise
+            except (ValueError, OSError) as e:
+                print(f"Error saving config: {e}")
+                return False
+
+        started = time.perf_counter()
+        precondition = self._unchanged_check() if if_unchanged else None
+        try:
+            if not rewrite and self._is_unchanged(model):
+                self._record_write(started, None)
+                return True
+
+            report = None
+            layout = None
+            key = self._cache_key
+            if not rewrite and self._cache_layout is not None:
+                layout, report = self._save_splice(model, precondition)
+            if layout is None:
+                data, layout = render_full(model, self._dump_yaml)
+                digest = hashlib.sha256(data).digest()
+                key, current_digest = self._file_state()
+                if digest != current_digest:
+                    report = self._atomic_write(data, precondition=precondition)
+                self._cache_digest = digest
+            elif report is not None:
+                self._cache_digest = None
+
+            # Keep the cache in step with the file; report is None if it already held this content
+            if report is not None:
+                key = report.pop('key')
+            self._cache_key = key
+            self._cache_model = model
+            self._cache_layout = layout
+            if report is not None:
+                # Re-marshalling the whole document would cost more than the write itself
+                self._schedule_snapshot_refresh()
+            self._record_write(started, report)
             return True
-            
+
+        except ConfigConflict:
+            self.conflicts += 1
+            self.invalidate_cache()
+            raise
         except Exception as e:
             print(f"Error saving config atomically: {e}")
-            # Clean up the temporary file if it still exists from a failed write
-            if 'temp_path' in locals() and os.path.exists(temp_path):
-                os.remove(temp_path)
+            self.invalidate_cache()
             return False
-    
+
+    def _is_unchanged(self, model: KubeConfigModel) -> bool:
+        """Whether model matches the cached model of a file nobody else has changed."""
+        cached = self._cache_model
+        if cached is None or self._cache_key is None or self._stat_key() != self._cache_key:
+            return False
+        if model is cached:
+            return True
+        # Entries are shared between copies, so this is mostly identity checks
+        document, original = model.to_dict(), cached.to_dict()
+        return list(document) == list(original) and document == original
+
+    def _file_state(self) -> Tuple[Optional[tuple], Optional[bytes]]:
+        """Return the stat key and SHA-256 of the config file, reusing the cached digest when valid."""
+        try:
+            with open(self.config_path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                key = (st.st_ino, st.st_size, st.st_mtime_ns)
+                if key == self._cache_key and self._cache_digest is not None:
+                    return key, self._cache_digest
+                return key, hashlib.sha256(f.read()).digest()
+        except OSError:
+            return None, None
+
+    def _unchanged_check(self) -> Callable[[], None]:
+        """Return a precondition asserting the file still is the one the cache was loaded from."""
+        key, digest = self._cache_key, self._cache_digest
+
+        def check():
+            current = self._stat_key()
+            if current is not None and current == key:
+                return
+            # Touched or rewritten with the same bytes is not a conflict
+            if current is not None and digest is not None and self._file_state()[1] == digest:
+                return
+            raise ConfigConflict(f"{self.config_path} was changed by another program")
+        return check
+
+    def _save_splice(self, model: KubeConfigModel,
+                     precondition: Optional[Callable[[], None]] = None) -> Tuple[Optional[SourceLayout], Optional[Dict]]:
+        """Write model by splicing it into the current file.
+
+        Returns (layout, write report); the report is None when the result
+        equals the file, and the layout is None if the file moved on.
+        """
+        with open(self.config_path, 'rb') as source:
+            st = os.fstat(source.fileno())
+            if not st.st_size or (st.st_ino, st.st_size, st.st_mtime_ns) != self._cache_key:
+                return None, None
+            with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                chunks, layout, _ = render_splice(mm, self._cache_layout, model, self._dump_yaml)
+            if chunks == [(0, st.st_size)]:
+                return layout, None
+            report = self._atomic_write(*[(source, chunk[0], chunk[1] - chunk[0]) if isinstance(chunk, tuple)
+                                          else chunk for chunk in chunks], precondition=precondition)
+        return layout, report
+
+    def _record_write(self, started: float, report: Optional[Dict]):
+        """Store the report of one save in last_write and add it to write_stats."""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if report is None:
+            report = {'bytes': 0, 'copied': 0, 'sync_ms': 0.0, 'skipped': True}
+            self.write_stats['skipped'] += 1
+        else:
+            report['skipped'] = False
+            self.write_stats['writes'] += 1
+            self.write_stats['bytes'] += report['bytes']
+        report['elapsed_ms'] = elapsed_ms
+        report['durability'] = self.durability
+        self.write_stats['elapsed_ms'] += elapsed_ms
+        self.last_write = report
+
     def get_contexts(self) -> List[Dict]:
-        """Get all contexts from the config."""
-        config = self.load_config()
-        return config.get('contexts', [])
+        """Get all contexts from the config.
+
+        The entries are shared with the cache and must not be modified.
+        """
+        model = self.load_model()
+        return model.contexts.to_list() if model is not None else []
     
+    def get_context_listing(self) -> Tuple[List[Dict], str]:
+        """Return (contexts, current_context) for display.
+
+        Uses the cached model when it is fresh. Otherwise only the contexts
+        section and current-context are built from the YAML event stream,
+        skipping the certificate and key payloads of clusters and users.
+        The entries must not be modified.
+        """
+        if self._merged is not None:
+            model = self.load_model()
+            if model is None:
+                return [], ''
+            return model.contexts.to_list(), model.current_context
+
+        key = self._stat_key()
+        if key is not None and key == self._cache_key:
+            self.cache_hits += 1
+            return self._cache_model.contexts.to_list(), self._cache_model.current_context
+        if key is not None and key == self._listing_key:
+            self.cache_hits += 1
+            return self._listing
+
+        self.cache_misses += 1
+        try:
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                listing = parse_context_listing(f, self._yaml_loader)
+        except ListingUnsupported:
+            model = self.load_model()
+            if model is None:
+                return [], ''
+            return model.contexts.to_list(), model.current_context
+        except Exception as e:
+            print(f"Error loading config: {e}")
+            return [], ''
+
+        self._listing_key = key
+        self._listing = listing
+        return listing
+
     def get_current_context(self) -> str:
-        """Get the current active context."""
-        config = self.load_config()
-        return config.get('current-context', '')
+        """Get the current active context.
+
+        Answered from the parsed config when it is loaded and unchanged;
+        otherwise the files are scanned for the current-context line
+        without parsing them (see kube_config_current).
+        """
+        if self._merged is None and self._cache_model is not None and self._stat_key() == self._cache_key:
+            return self._cache_model.current_context
+        return read_current_context(self.config_paths)
     
     def set_current_context(self, context_name: str):
-        """Set the current active context."""
-        config = self.load_config()
-        contexts = [ctx['name'] for ctx in config.get('contexts', [])]
-        
-        if context_name not in contexts:
-            raise ValueError(f"Context '{context_name}' not found")
-        
-        config['current-context'] = context_name
-        self.save_config(config)
+        """Set the current active context.
+
+        Only the current-context line is serialized; see save_model(). The
+        rest of the file is still copied into the temp file that replaces
+        it, so a switch costs about one copy of the file
+        (`python benchmark.py switch`); flat latency would need an
+        in-place write, which the atomic move rules out.
+        """
+        self._commit(lambda model: model.set_current_context(context_name))
+    
+    def _read_kubeconfig_file(self, file_path: str) -> Dict:
+        """Parse another kubeconfig file, raising ValueError if it is not one."""
+        with open(file_path, 'r', encoding='utf-8') as f:
+            new_config = self._load_yaml(f)
+        if not new_config or not isinstance(new_config, dict):
+            raise ValueError(f"'{file_path}' is not a valid kubeconfig file")
+        return new_config
     
     def add_context_from_file(self, file_path: str) -> bool:
         """Add context from another kubeconfig file."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                new_config = yaml.safe_load(f)
-            
-            if not new_config or not isinstance(new_config, dict):
-                return False
-            
-            current_config = self.load_config()
-            
-            # Merge clusters, contexts, and users
-            for section in ['clusters', 'contexts', 'users']:
-                if section in new_config:
-                    current_items = current_config.get(section, [])
-                    new_items = new_config[section]
-                    
-                    # Add new items that don't already exist
-                    existing_names = {item['name'] for item in current_items}
-                    for item in new_items:
-                        if item['name'] not in existing_names:
-                            current_items.append(item)
-                    
-                    current_config[section] = current_items
-            
-            self.save_config(current_config)
+            new_config = self._read_kubeconfig_file(file_path)
+            # Merge clusters, contexts, and users, keeping existing names
+            self._commit(lambda model: model.merge(new_config))
             return True
             
         except Exception as e:
             print(f"Error adding context from file: {e}")
             return False
     
+    def import_contexts(self, paths: List[str], workers: Optional[int] = None,
+                        mp_context=None) -> Tuple[bool, List[Dict]]:
+        """Import every kubeconfig under paths with a single save.
+
+        paths may name kubeconfig files, directories (searched recursively)
+        and tar or zip archives (read without extracting). Sources are
+        parsed in parallel (in a pool of mp_context), see kube_config_import.
+        Returns (success, one report per source); see merge_parsed() for
+        the report fields.
+        """
+        try:
+            parsed = parse_sources(paths, self._yaml_loader, workers, mp_context)
+            reports = []
+
+            def mutation(model):
+                # Re-run on a fresh model if the file changed meanwhile
+                reports[:] = merge_parsed(model, parsed)
+
+            self._commit(mutation)
+            return True, reports
+
+        except Exception as e:
+            print(f"Error importing contexts: {e}")
+            return False, []
+
     def delete_context(self, context_name: str) -> bool:
         """Delete a context and its associated cluster and user."""
         try:
-            config = self.load_config()
-            
-            # Find the context
-            contexts = config.get('contexts', [])
-            context_to_delete = None
-            
-            for ctx in contexts:
-                if ctx['name'] == context_name:
-                    context_to_delete = ctx
-                    break
-            
-            if not context_to_delete:
-                return False
-            
-            # Remove context
-            config['contexts'] = [ctx for ctx in contexts if ctx['name'] != context_name]
-            
-            # Get cluster and user names from the context
-            cluster_name = context_to_delete['context'].get('cluster')
-            user_name = context_to_delete['context'].get('user')
-            
-            # Remove cluster if it's not used by other contexts
-            if cluster_name:
-                other_clusters = set()
-                for ctx in config['contexts']:
-                    other_clusters.add(ctx['context'].get('cluster'))
-                
-                if cluster_name not in other_clusters:
-                    config['clusters'] = [c for c in config.get('clusters', []) 
-                                        if c['name'] != cluster_name]
-            
-            # Remove user if it's not used by other contexts
-            if user_name:
-                other_users = set()
-                for ctx in config['contexts']:
-                    other_users.add(ctx['context'].get('user'))
-                
-                if user_name not in other_users:
-                    config['users'] = [u for u in config.get('users', []) 
-                                     if u['name'] != user_name]
-            
-            # Clear current-context if it was the deleted one
-            if config.get('current-context') == context_name:
-                config['current-context'] = ''
-            
-            self.save_config(config)
+            # Drops the cluster and user too if no other context references them
+            self._commit(lambda model: model.delete_context(context_name))
             return True
             
         except Exception as e:
             print(f"Error deleting context: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    @contextmanager
+    def locked(self, timeout: float = LOCK_TIMEOUT) -> Iterator[None]:
+        """Hold the advisory lock on the config file; re-entrant.
+
+        Every KubeConfigManager, in any process, takes it around its
+        read-modify-write cycles. Other tools (kubectl, the authenticator)
+        do not, which is what the compare-and-swap in _commit() is for.
+        Raises OSError if the lock is not free within timeout seconds.
+        """
+        with self._thread_lock:
+            if self._lock_depth or fcntl is None:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+
+            fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                deadline = time.monotonic() + timeout
+                while True:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except BlockingIOError:
+                        if time.monotonic() >= deadline:
+                            raise OSError(f"Timed out waiting for the lock on {self.config_path}")
+                        time.sleep(0.005)
+                self._lock_depth = 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth = 0
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+            finally:
+                os.close(fd)
+
+    def _commit(self, mutation: Callable[[KubeConfigModel], None]) -> KubeConfigModel:
+        """Apply mutation to a copy of the current model and save the result.
+
+        The cycle runs under the advisory lock, and the save only replaces
+        the file if nobody else changed it since the load; otherwise the
+        mutation is re-applied to the fresh file, with backoff, up to
+        COMMIT_ATTEMPTS times. Raises ValueError if the mutation rejects
+        the change and OSError (ConfigConflict when retries ran out) if the
+        config cannot be loaded or saved. Nothing is written on failure.
+
+        With several KUBECONFIG files, each affected file gets its own such
+        commit; the files are not updated atomically as a group.
+        """
+        if self._merged is not None:
+            return self._merged.commit(mutation)
+
+        for attempt in range(COMMIT_ATTEMPTS):
+            if attempt:
+                time.sleep(COMMIT_BACKOFF * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+            with self.locked():
+                model = self.load_model()
+                if model is None:
+                    raise OSError("Failed to load kubeconfig.")
+
+                model = model.copy()
+                mutation(model)
+
+                try:
+                    saved = self.save_model(model, if_unchanged=True)
+                except ConfigConflict:
+                    continue
+                if not saved:
+                    raise OSError("Failed to save updated kubeconfig.")
+                return model
+        raise ConfigConflict(f"{self.config_path} kept changing; gave up after {COMMIT_ATTEMPTS} attempts")
+
+    @contextmanager
+    def batch(self) -> Iterator['KubeConfigTransaction']:
+        """Group several mutations into a single load and a single write.
+
+        Usage::
+
+            with manager.batch() as tx:
+                tx.rename_context('old', 'new')
+                tx.delete_context('stale')
+
+        The queued operations are applied in order to one snapshot of the
+        config when the block exits. If any of them fails (ValueError) or the
+        block raises, nothing is written.
+        """
+        tx = KubeConfigTransaction(self)
+        yield tx
+        tx.commit()
+
+
+class KubeConfigTransaction:
+    """Queued kubeconfig mutations committed with one serialize and one atomic write."""
+
+    def __init__(self, manager: KubeConfigManager):
+        self.manager = manager
+        self._operations: List[tuple] = []
+        self.committed = False
+
+    def __len__(self) -> int:
+        return len(self._operations)
+
+    def _queue(self, description: str, operation: Callable[[KubeConfigModel], None]):
+        if self.committed:
+            raise RuntimeError("Transaction has already been committed")
+        self._operations.append((description, operation))
+
+    def set_current_context(self, context_name: str):
+        self._queue(f"switch to '{context_name}'",
+                    lambda model: model.set_current_context(context_name))
+
+    def rename_context(self, old_name: str, new_name: str):
+        self._queue(f"rename '{old_name}' to '{new_name}'",
+                    lambda model: model.rename_context(old_name, new_name))
+
+    def delete_context(self, context_name: str):
+        self._queue(f"delete '{context_name}'",
+                    lambda model: model.delete_context(context_name))
+
+    def merge_config(self, config: Dict):
+        self._queue("merge kubeconfig", lambda model: model.merge(config))
+
+    def add_context_from_file(self, file_path: str):
+        def operation(model):
+            model.merge(self.manager._read_kubeconfig_file(file_path))
+        self._queue(f"import '{file_path}'", operation)
+
+    def commit(self) -> Optional[KubeConfigModel]:
+        """Apply all queued operations and write the config once.
+
+        Raises ValueError naming the first operation that failed; in that
+        case the config on disk is left untouched.
+        """
+        if self.committed:
+            raise RuntimeError("Transaction has already been committed")
+        self.committed = True
+        if not self._operations:
+            return None
+
+        def apply_all(model):
+            for description, operation in self._operations:
+                try:
+                    operation(model)
+                except (ValueError, OSError, yaml.YAMLError) as e:
+                    raise ValueError(f"Cannot {description}: {e}") from e
+
+        return self.manager._commit(apply_all)
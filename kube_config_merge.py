@@ -0,0 +1,351 @@
+"""Merged view of the kubeconfig files listed in KUBECONFIG.
+
+Follows kubectl's loading rules: files are read in order, the first file
+that defines a cluster, context or user name wins, and the first non-empty
+current-context (or other top-level value) wins. Changes are written back
+to the file that owns each entry; new entries go to the default file and
+current-context to the first file that sets one.
+
+Each file keeps its own KubeConfigManager with its own parse cache, so a
+change to one file re-parses only that file, and the merged model is
+patched for just the names that file contributes.
+
+Overlay files (terminal sessions, see kube_config_sessions) are read
+differently: they hold current-context and, for contexts, only a
+namespace override. A context in an overlay shows the entry of the file
+that owns it with the overlay's namespace; clusters, users and contexts
+are always written to the owning files, and the overlay's override
+follows renames and deletes.
+"""
+
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from kube_config_model import SECTIONS, KubeConfigModel
+
+# Contribution of a missing or not yet loaded file
+EMPTY_MODEL = KubeConfigModel()
+
+
+def file_key(path: str) -> Optional[tuple]:
+    """Return the (inode, size, mtime_ns) of path, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+def default_kubeconfig_path(paths: List[str]) -> str:
+    """Return the file kubectl writes new entries to: the first existing one, else the last."""
+    for path in paths:
+        if os.path.exists(path):
+            return path
+    return paths[-1]
+
+
+def assign_document(model: KubeConfigModel, document: Dict):
+    """Make model hold the entries and current-context of document, matching by name.
+
+    Unchanged entries keep their identity, so only real differences are
+    written back to the files.
+    """
+    for section in SECTIONS:
+        wanted = {}
+        for entry in document.get(section) or []:
+            if isinstance(entry, dict) and entry.get('name') is not None:
+                wanted.setdefault(entry['name'], entry)
+        entries = model.section(section)
+        for name in entries.names():
+            if name not in wanted:
+                model.remove_entry(section, name)
+        for name, entry in wanted.items():
+            if entries.get(name) != entry:
+                model.put_entry(section, entry)
+    model.current_context = document.get('current-context') or ''
+
+
+def with_namespace(entry: Dict, namespace: Optional[str]) -> Dict:
+    """Return a copy of a context entry using namespace (none if namespace is None)."""
+    body = dict(entry.get('context') or {})
+    if namespace is None:
+        body.pop('namespace', None)
+    else:
+        body['namespace'] = namespace
+    return {**entry, 'context': body}
+
+
+def context_namespace(entry: Dict) -> Optional[str]:
+    body = entry.get('context')
+    return body.get('namespace') if isinstance(body, dict) else None
+
+
+def upsert_document(document: Dict) -> Callable[[KubeConfigModel], None]:
+    """Return a mutation adding or replacing the entries of document, like update-kubeconfig."""
+    def mutation(model: KubeConfigModel):
+        for section in SECTIONS:
+            for entry in document.get(section) or []:
+                if isinstance(entry, dict) and entry.get('name') is not None:
+                    model.put_entry(section, entry)
+        if document.get('current-context') in model.contexts:
+            model.current_context = document['current-context']
+    return mutation
+
+
+class MergedView:
+    """Incrementally maintained first-file-wins merge of several kubeconfig files.
+
+    Per-file state is keyed on the file path, so subclasses may change the
+    set of files between loads (see _scan()).
+    """
+
+    def __init__(self, layers: List, default_index: int, overlays: Iterable[str] = ()):
+        # One single-file KubeConfigManager per KUBECONFIG entry, in order
+        self.layers = layers
+        self.default_path = layers[default_index].config_path
+        # Paths of the layers that only override current-context and namespaces
+        self.overlays = set(overlays)
+        # Context name -> (overlay path, overlay entry) whose namespace the merged entry uses
+        self.overrides: Dict[str, Tuple[str, Dict]] = {}
+        self.model: Optional[KubeConfigModel] = None
+        # Per file: the stat key and model last merged
+        self._keys: Dict[str, Optional[tuple]] = {}
+        self._models: Dict[str, KubeConfigModel] = {}
+        # section -> name -> path of the file whose entry is in the merged model
+        self.owners: Dict[str, Dict[str, str]] = {section: {} for section in SECTIONS}
+        self.layer_updates = 0
+
+    def invalidate(self):
+        """Forget the merged model and every file's parse cache."""
+        for layer in self.layers:
+            layer.invalidate_cache()
+        self.model = None
+        self._keys = {}
+        self._models = {}
+        self.owners = {section: {} for section in SECTIONS}
+        self.overrides = {}
+
+    def _scan(self) -> List:
+        """Return the current files in merge order; fixed for KUBECONFIG."""
+        return self.layers
+
+    def _paths(self) -> List[str]:
+        """Return the paths _scan() would return, without creating managers."""
+        return [layer.config_path for layer in self.layers]
+
+    def changed_on_disk(self) -> bool:
+        """Whether any file differs from what the merged model was built from."""
+        # One copy: the GUI may ask while another thread loads
+        keys = dict(self._keys)
+        paths = self._paths()
+        if self.model is None or set(paths) != set(keys):
+            return True
+        return any(file_key(path) != keys[path] for path in paths)
+
+    def layer(self, path: str):
+        """Return the manager of the file at path."""
+        for layer in self.layers:
+            if layer.config_path == path:
+                return layer
+        raise KeyError(path)
+
+    def load(self) -> Optional[KubeConfigModel]:
+        """Return the merged model, re-merging only the files that changed.
+
+        Returns None if a file exists but cannot be parsed, like kubectl,
+        which refuses to work with a broken KUBECONFIG entry.
+        """
+        self.layers = self._scan()
+        paths = {layer.config_path for layer in self.layers}
+        changed = [(self._models.pop(path), EMPTY_MODEL) for path in list(self._models)
+                   if path not in paths]
+        for path in [path for path in self._keys if path not in paths]:
+            del self._keys[path]
+
+        for layer in self.layers:
+            path = layer.config_path
+            key = layer._stat_key()
+            if path in self._models and key == self._keys[path]:
+                continue
+            if key is None:
+                model = EMPTY_MODEL
+            else:
+                model = layer.load_model()
+                if model is None:
+                    return None
+                key = layer._cache_key
+            old = self._models.get(path, EMPTY_MODEL)
+            self._keys[path] = key
+            self._models[path] = model
+            if model is not old:
+                changed.append((old, model))
+
+        if self.model is not None and not changed:
+            return self.model
+
+        merged = self.model.copy() if self.model is not None else KubeConfigModel()
+        for old, new in changed:
+            self.layer_updates += 1
+            for section in SECTIONS:
+                old_entries, new_entries = old.section(section), new.section(section)
+                for name in old_entries.names():
+                    if new_entries.get(name) != old_entries.get(name):
+                        self._resolve(merged, section, name)
+                for name in new_entries.names():
+                    if name not in old_entries:
+                        self._resolve(merged, section, name)
+
+        models = [self._models[layer.config_path] for layer in self.layers]
+        merged.current_context = next((model.current_context for model in models
+                                       if model.current_context), '')
+        extra = {}
+        for model in models:
+            for key, value in model.extra.items():
+                extra.setdefault(key, value)
+        merged.extra = extra
+        self.model = merged
+        return merged
+
+    def _resolve(self, merged: KubeConfigModel, section: str, name: str):
+        """Put the winning entry for name (or none) into the merged model."""
+        owners = self.owners[section]
+        override = None
+        for layer in self.layers:
+            path = layer.config_path
+            entry = self._models[path].section(section).get(name)
+            if entry is None:
+                continue
+            if path in self.overlays:
+                if section == 'contexts' and override is None:
+                    override = (path, entry)
+                continue
+            owners[name] = path
+            if override is not None:
+                self.overrides[name] = override
+                entry = with_namespace(entry, context_namespace(override[1]))
+            elif section == 'contexts':
+                self.overrides.pop(name, None)
+            if merged.section(section).get(name) is not entry:
+                merged.put_entry(section, entry)
+            return
+        owners.pop(name, None)
+        if section == 'contexts':
+            self.overrides.pop(name, None)
+        if name in merged.section(section):
+            merged.remove_entry(section, name)
+
+    def current_context_path(self) -> str:
+        """Return the file kubectl writes current-context to."""
+        for layer in self.layers:
+            if self._models[layer.config_path].current_context:
+                return layer.config_path
+        return self.default_path
+
+    def _plan(self, before: KubeConfigModel, model: KubeConfigModel) -> Tuple[Dict[str, List[tuple]], Dict]:
+        """Return the per-file operations turning before into model, plus the added entries.
+
+        Operations are those of apply_operations(); added maps each
+        section to the new entries, which have no owning file yet.
+        """
+        operations: Dict[str, List[tuple]] = {}
+        added = {section: [] for section in SECTIONS}
+        for section in SECTIONS:
+            old_entries, new_entries = before.section(section), model.section(section)
+            for entry_id, entry in old_entries.items():
+                new = new_entries.get_by_id(entry_id)
+                if new is entry:
+                    continue
+                name = entry['name']
+                owner = self.owners[section][name]
+                if section == 'contexts' and name in self.overrides:
+                    new = self._plan_override(operations, owner, name, new)
+                operations.setdefault(owner, []).append((section, name, new))
+            for entry_id, entry in new_entries.items():
+                if old_entries.get_by_id(entry_id) is None:
+                    added[section].append(entry)
+        if model.current_context != before.current_context:
+            operations.setdefault(self.current_context_path(), []).append(
+                ('current-context', None, model.current_context))
+        return operations, added
+
+    def _plan_override(self, operations: Dict[str, List[tuple]], owner: str, name: str,
+                       new: Optional[Dict]) -> Optional[Dict]:
+        """Make the overlay override of context name follow its new entry; return what the owner gets.
+
+        The owner keeps its own namespace unless the change set another one.
+        """
+        overlay, override = self.overrides[name]
+        namespace = context_namespace(override)
+        if new is not None:
+            operations.setdefault(overlay, []).append(('contexts', name, with_namespace(new, namespace)))
+            if context_namespace(new) == namespace:
+                new = with_namespace(new, context_namespace(self._models[owner].contexts.get(name)))
+        else:
+            operations.setdefault(overlay, []).append(('contexts', name, None))
+        return new
+
+    def save(self, model: KubeConfigModel) -> KubeConfigModel:
+        """Write the differences between the merged model and model to the owning files.
+
+        model must be a copy() of the merged model last returned by load()
+        (entry ids are how entries are matched, so renames go back to the
+        right file). New entries go to the default file. Each file is
+        updated through its own locked compare-and-swap commit.
+        """
+        before = self.model
+        if before is None:
+            raise OSError("Failed to load kubeconfig.")
+
+        operations, added = self._plan(before, model)
+        for section, entries in added.items():
+            operations.setdefault(self.default_path, []).extend(
+                (section, None, entry) for entry in entries)
+        for path, file_operations in operations.items():
+            self.layer(path)._commit(apply_operations(file_operations))
+        return self.load()
+
+    def commit(self, mutation: Callable[[KubeConfigModel], None]) -> KubeConfigModel:
+        """Apply mutation to a copy of the merged model and write the result back."""
+        model = self.load()
+        if model is None:
+            raise OSError("Failed to load kubeconfig.")
+        model = model.copy()
+        mutation(model)
+        return self.save(model)
+
+
+def apply_operations(operations: List[tuple]) -> Callable[[KubeConfigModel], None]:
+    """Return a mutation replaying merged-view changes on one file's model by name.
+
+    Operations are (section, old name or None to add, new entry or None
+    to remove). It is re-run on a fresh model if the file changes
+    underneath, so entries are looked up by name rather than id.
+
+    A cluster or user the merged model no longer references may still be
+    used by a context of this file that another file shadows, so they are
+    removed last, and only if none of this file's contexts points at them.
+    """
+    def mutation(model: KubeConfigModel):
+        orphans = []
+        for section, name, entry in operations:
+            if section == 'current-context':
+                # The context may live in another file, so no validation here
+                model.current_context = entry
+            elif name is None:
+                model.add_entry(section, entry)
+            elif entry is None:
+                if section in ('clusters', 'users'):
+                    orphans.append((section, name))
+                elif name in model.section(section):
+                    model.remove_entry(section, name)
+            elif name not in model.section(section):
+                model.put_entry(section, entry)
+            elif entry.get('name') != name and entry.get('name') in model.section(section):
+                raise ValueError(f"'{entry.get('name')}' already exists in {section}.")
+            else:
+                model.replace_entry(section, name, entry)
+        for section, name in orphans:
+            orphaned = model.is_cluster_orphaned(name) if section == 'clusters' else model.is_user_orphaned(name)
+            if orphaned and name in model.section(section):
+                model.remove_entry(section, name)
+    return mutation
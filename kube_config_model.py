@@ -0,0 +1,274 @@
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Named-list sections of a kubeconfig document, in kubectl's output order
+SECTIONS = ('clusters', 'contexts', 'users')
+
+
+class NamedEntries:
+    """Insertion-ordered entries of one kubeconfig section, indexed by name.
+
+    Entries are kept under a stable id so that lookup, rename and removal
+    are O(1) while the original order is preserved. Duplicate names are
+    kept in order; as with kubectl, the first entry with a name wins.
+    """
+
+    def __init__(self, entries: Optional[List[Dict]] = None):
+        self._entries: Dict[int, Dict] = {}
+        self._by_name: Dict[str, int] = {}
+        self._shadowed: Counter = Counter()
+        self._next_id = 0
+        for entry in entries or []:
+            self.append(entry)
+
+    def copy(self) -> 'NamedEntries':
+        """Return a copy sharing the (never mutated in place) entry dicts."""
+        clone = NamedEntries()
+        clone._entries = dict(self._entries)
+        clone._by_name = dict(self._by_name)
+        clone._shadowed = Counter(self._shadowed)
+        clone._next_id = self._next_id
+        return clone
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter(self._entries.values())
+
+    def __contains__(self, name) -> bool:
+        return name in self._by_name
+
+    def names(self) -> List[str]:
+        return list(self._by_name)
+
+    def get(self, name: str) -> Optional[Dict]:
+        entry_id = self._by_name.get(name)
+        return self._entries[entry_id] if entry_id is not None else None
+
+    def get_by_id(self, entry_id: int) -> Optional[Dict]:
+        return self._entries.get(entry_id)
+
+    def to_list(self) -> List[Dict]:
+        return list(self._entries.values())
+
+    def items(self) -> Iterator[Tuple[int, Dict]]:
+        """Iterate (entry id, entry) pairs in order; ids are stable across copies."""
+        return iter(self._entries.items())
+
+    def append(self, entry: Dict):
+        """Append an entry; a duplicate name is kept but shadowed."""
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = entry
+        name = entry.get('name') if isinstance(entry, dict) else None
+        if name is None:
+            return
+        if name in self._by_name:
+            self._shadowed[name] += 1
+        else:
+            self._by_name[name] = entry_id
+
+    def replace(self, name: str, entry: Dict):
+        """Replace the entry called name, keeping its position."""
+        entry_id = self._by_name[name]
+        self._entries[entry_id] = entry
+        new_name = entry.get('name')
+        if new_name != name:
+            del self._by_name[name]
+            self._by_name[new_name] = entry_id
+            self._reindex(name)
+
+    def remove(self, name: str) -> Dict:
+        """Remove and return the entry called name."""
+        entry_id = self._by_name.pop(name)
+        entry = self._entries.pop(entry_id)
+        self._reindex(name)
+        return entry
+
+    def _reindex(self, name: str):
+        """Let a shadowed duplicate of name take over after the first one went away."""
+        if not self._shadowed.get(name) or name in self._by_name:
+            return
+        for entry_id, entry in self._entries.items():
+            if isinstance(entry, dict) and entry.get('name') == name:
+                self._by_name[name] = entry_id
+                self._shadowed[name] -= 1
+                break
+
+
+def context_refs(entry: Dict) -> tuple:
+    """Return the (cluster, user) names a context entry points at."""
+    body = entry.get('context') if isinstance(entry, dict) else None
+    if not isinstance(body, dict):
+        return None, None
+    return body.get('cluster'), body.get('user')
+
+
+class KubeConfigModel:
+    """Indexed in-memory view of a kubeconfig document.
+
+    Clusters, contexts and users are held in NamedEntries maps, and the
+    number of contexts referencing each cluster and user is tracked so that
+    orphan detection does not need to scan the contexts. Entry dicts are
+    treated as immutable: operations that change an entry replace it with
+    a modified copy, which lets copies of the model share entries safely.
+    """
+
+    def __init__(self, document: Optional[Dict] = None):
+        document = document if isinstance(document, dict) else {}
+        # Remember the top-level key order and any keys we do not model
+        self._key_order = list(document)
+        self.extra = {k: v for k, v in document.items()
+                      if k not in SECTIONS and k != 'current-context'}
+        self.current_context = document.get('current-context') or ''
+        self.clusters = NamedEntries(document.get('clusters') or [])
+        self.contexts = NamedEntries(document.get('contexts') or [])
+        self.users = NamedEntries(document.get('users') or [])
+        self.cluster_refs: Counter = Counter()
+        self.user_refs: Counter = Counter()
+        for entry in self.contexts:
+            self._count_refs(entry, 1)
+
+    def copy(self) -> 'KubeConfigModel':
+        """Return an independent model sharing the entry dicts."""
+        clone = KubeConfigModel.__new__(KubeConfigModel)
+        clone._key_order = list(self._key_order)
+        clone.extra = dict(self.extra)
+        clone.current_context = self.current_context
+        clone.clusters = self.clusters.copy()
+        clone.contexts = self.contexts.copy()
+        clone.users = self.users.copy()
+        clone.cluster_refs = Counter(self.cluster_refs)
+        clone.user_refs = Counter(self.user_refs)
+        return clone
+
+    def to_dict(self) -> Dict:
+        """Build a kubeconfig document, keeping the original key order."""
+        values = dict(self.extra)
+        for section in SECTIONS:
+            entries = self.section(section)
+            if entries or section in self._key_order:
+                values[section] = entries.to_list()
+        if self.current_context or 'current-context' in self._key_order:
+            values['current-context'] = self.current_context
+        document = {k: values.pop(k) for k in self._key_order if k in values}
+        document.update(values)
+        return document
+
+    def section(self, name: str) -> NamedEntries:
+        """Return the NamedEntries for 'clusters', 'contexts' or 'users'."""
+        if name not in SECTIONS:
+            raise KeyError(name)
+        return getattr(self, name)
+
+    def _count_refs(self, entry: Dict, delta: int):
+        cluster, user = context_refs(entry)
+        if cluster:
+            self.cluster_refs[cluster] += delta
+            if self.cluster_refs[cluster] <= 0:
+                del self.cluster_refs[cluster]
+        if user:
+            self.user_refs[user] += delta
+            if self.user_refs[user] <= 0:
+                del self.user_refs[user]
+
+    def is_cluster_orphaned(self, name: str) -> bool:
+        return self.cluster_refs.get(name, 0) == 0
+
+    def is_user_orphaned(self, name: str) -> bool:
+        return self.user_refs.get(name, 0) == 0
+
+    def add_entry(self, section: str, entry: Dict) -> bool:
+        """Add an entry unless one with the same name exists; return whether it was added."""
+        entries = self.section(section)
+        if entry.get('name') in entries:
+            return False
+        entries.append(entry)
+        if section == 'contexts':
+            self._count_refs(entry, 1)
+        return True
+
+    def put_entry(self, section: str, entry: Dict):
+        """Add entry, or replace the entry with its name in place."""
+        entries = self.section(section)
+        name = entry.get('name')
+        if name in entries:
+            self.replace_entry(section, name, entry)
+        else:
+            entries.append(entry)
+            if section == 'contexts':
+                self._count_refs(entry, 1)
+
+    def replace_entry(self, section: str, name: str, entry: Dict):
+        """Replace the entry called name (which may rename it), keeping its position."""
+        entries = self.section(section)
+        if section == 'contexts':
+            self._count_refs(entries.get(name), -1)
+            self._count_refs(entry, 1)
+        entries.replace(name, entry)
+
+    def remove_entry(self, section: str, name: str) -> Dict:
+        """Remove and return the entry called name; no orphan cleanup."""
+        entry = self.section(section).remove(name)
+        if section == 'contexts':
+            self._count_refs(entry, -1)
+        return entry
+
+    def merge(self, document: Dict) -> Dict[str, List[str]]:
+        """Add clusters, contexts and users from another kubeconfig document.
+
+        Existing names are left untouched. Returns the added names per section.
+        """
+        added = {section: [] for section in SECTIONS}
+        for section in SECTIONS:
+            for entry in document.get(section) or []:
+                if self.add_entry(section, entry):
+                    added[section].append(entry['name'])
+        return added
+
+    def set_current_context(self, name: str):
+        if name not in self.contexts:
+            raise ValueError(f"Context '{name}' not found")
+        self.current_context = name
+
+    def rename_context(self, old_name: str, new_name: str):
+        if not new_name.strip():
+            raise ValueError("New context name cannot be empty.")
+        if new_name in self.contexts:
+            raise ValueError(f"Context name '{new_name}' already exists.")
+        entry = self.contexts.get(old_name)
+        if entry is None:
+            raise ValueError(f"Context '{old_name}' not found.")
+
+        renamed = dict(entry)
+        renamed['name'] = new_name
+        self.contexts.replace(old_name, renamed)
+        if self.current_context == old_name:
+            self.current_context = new_name
+
+    def delete_context(self, name: str) -> Dict:
+        """Delete a context plus its cluster and user once nothing else uses them.
+
+        Every entry called name goes, shadowed duplicates included, so the
+        name does not come back bound to another cluster or user. Returns
+        the first (the one that was in effect).
+        """
+        if name not in self.contexts:
+            raise ValueError(f"Context '{name}' not found.")
+        removed = []
+        while name in self.contexts:
+            entry = self.contexts.remove(name)
+            self._count_refs(entry, -1)
+            removed.append(entry)
+
+        for entry in removed:
+            cluster, user = context_refs(entry)
+            while cluster and self.is_cluster_orphaned(cluster) and cluster in self.clusters:
+                self.clusters.remove(cluster)
+            while user and self.is_user_orphaned(user) and user in self.users:
+                self.users.remove(user)
+
+        if self.current_context == name:
+            self.current_context = ''
+        return removed[0]
@@ -0,0 +1,227 @@
+"""Running ncp-iam-authenticator for Naver Cloud Kubernetes Service (NKS) clusters.
+
+update-kubeconfig is run for many clusters at once with asyncio
+subprocesses, each writing to its own scratch kubeconfig; the manager then
+merges the results into the real config with a single save (see
+KubeConfigManager.add_nks_contexts() and sync_nks_region()).
+
+Region sync asks a lister command for the clusters of a region. It must
+print JSON: a list of clusters, or an object with a 'clusters' list (the
+shape of the ncloud CLI), where each cluster has a 'uuid' and optionally a
+'name' and an 'endpoint'.
+"""
+
+import json
+import os
+import shlex
+import subprocess
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from kube_config_model import KubeConfigModel, context_refs
+from kube_config_token_cache import is_nks_user, wrapped_command
+
+# Authenticator runs in flight at once
+NKS_CONCURRENCY = 4
+# Seconds one authenticator run may take before it is killed
+NKS_TIMEOUT = 60.0
+# Extra attempts after a failed or timed-out run, with exponential backoff
+NKS_RETRIES = 2
+NKS_RETRY_BACKOFF = 1.0
+# Failures that another attempt will not fix
+PERMANENT_ERRORS = ('cluster not found', 'access denied', 'unauthorized')
+# Lists the clusters of {region}; override with the KCM_NKS_LISTER environment variable
+DEFAULT_CLUSTER_LISTER = ['ncloud', 'vnks', 'getClusters', '--regionCode', '{region}', '--output', 'json']
+
+
+def update_kubeconfig_command(authenticator: str, cluster_uuid: str, region: str,
+                              alias: Optional[str], kubeconfig: str) -> List[str]:
+    """Return the ncp-iam-authenticator command adding one cluster to kubeconfig."""
+    cmd = [authenticator, "update-kubeconfig", "--clusterUuid", cluster_uuid, "--region", region]
+    if alias:
+        cmd.extend(["--alias", alias])
+    cmd.extend(["--kubeconfig", kubeconfig])
+    return cmd
+
+
+def authenticator_error(authenticator: str, returncode: int, stdout: str, stderr: str) -> str:
+    """Return the message for a failed authenticator run, with a hint where one helps."""
+    message = (f"ncp-iam-authenticator failed with error code {returncode}:\n"
+               f"STDERR: {stderr.strip()}\nSTDOUT: {stdout.strip()}")
+    if "cluster not found" in stderr.lower():
+        message += "\n\nPlease check if the Cluster UUID and Region are correct."
+    elif "access denied" in stderr.lower() or "unauthorized" in stderr.lower():
+        message += "\n\nPlease check your NCP IAM credentials and permissions."
+    elif "no such file or directory" in stderr.lower() and authenticator in stderr:
+        message = (f"ncp-iam-authenticator command failed. It seems the path '{authenticator}' is "
+                   f"incorrect or the tool is not installed properly.\nSTDERR: {stderr.strip()}")
+    return message
+
+
+def normalize_clusters(clusters: Sequence[Sequence]) -> List[Tuple[str, str, Optional[str]]]:
+    """Turn (cluster_uuid, region[, alias]) items into 3-tuples, raising ValueError on bad ones."""
+    normalized = []
+    for item in clusters:
+        if len(item) not in (2, 3) or not item[0] or not item[1]:
+            raise ValueError(f"Expected (cluster_uuid, region[, alias]), got {item!r}")
+        normalized.append((item[0], item[1], item[2] if len(item) == 3 else None))
+    return normalized
+
+
+async def _run_update_kubeconfig(semaphore: 'asyncio.Semaphore', cmd: List[str], timeout: float,
+                                 retries: int, backoff: float) -> Dict:
+    """Run one update-kubeconfig command with a timeout and retries; return its result."""
+    import asyncio
+
+    result = {'returncode': None, 'stdout': '', 'stderr': '', 'attempts': 0}
+    started = time.perf_counter()
+    for attempt in range(retries + 1):
+        if attempt:
+            await asyncio.sleep(backoff * 2 ** (attempt - 1))
+        async with semaphore:
+            result['attempts'] += 1
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+            except OSError as e:
+                result.update(returncode=None, stdout='', stderr=str(e))
+                break
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                result.update(returncode=None, stdout='', stderr=f"timed out after {timeout:g} s")
+                continue
+        result.update(returncode=process.returncode, stdout=stdout.decode(errors='replace'),
+                      stderr=stderr.decode(errors='replace'))
+        if process.returncode == 0 or any(error in result['stderr'].lower() for error in PERMANENT_ERRORS):
+            break
+    result['elapsed_ms'] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def run_update_kubeconfig_batch(authenticator: str, clusters: List[Tuple[str, str, Optional[str]]],
+                                staging_dir: str, concurrency: int = NKS_CONCURRENCY,
+                                timeout: float = NKS_TIMEOUT, retries: int = NKS_RETRIES,
+                                backoff: float = NKS_RETRY_BACKOFF) -> List[Dict]:
+    """Run update-kubeconfig for every cluster concurrently; return one result per cluster.
+
+    Cluster i writes to staging_dir/config-i. Each result holds the
+    cluster_uuid, region and alias, the kubeconfig written, ok, a message,
+    the number of attempts and the elapsed milliseconds.
+    """
+    # Imported here: asyncio is a large import that only batch runs need
+    import asyncio
+
+    async def run_all():
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        return await asyncio.gather(*(
+            _run_update_kubeconfig(semaphore, update_kubeconfig_command(
+                authenticator, cluster_uuid, region, alias, os.path.join(staging_dir, f'config-{i}')),
+                timeout, retries, backoff)
+            for i, (cluster_uuid, region, alias) in enumerate(clusters)))
+
+    results = []
+    for i, ((cluster_uuid, region, alias), run) in enumerate(zip(clusters, asyncio.run(run_all()))):
+        ok = run['returncode'] == 0
+        if ok:
+            message = run['stdout'].strip()
+        elif run['returncode'] is None:
+            message = f"Error running ncp-iam-authenticator: {run['stderr']}"
+        else:
+            message = authenticator_error(authenticator, run['returncode'], run['stdout'], run['stderr'])
+        results.append({'cluster_uuid': cluster_uuid, 'region': region, 'alias': alias,
+                        'kubeconfig': os.path.join(staging_dir, f'config-{i}'), 'ok': ok,
+                        'message': message, 'attempts': run['attempts'],
+                        'elapsed_ms': run['elapsed_ms']})
+    return results
+
+
+def cluster_lister() -> List[str]:
+    """Return the configured lister command template."""
+    value = os.environ.get('KCM_NKS_LISTER')
+    return shlex.split(value) if value else list(DEFAULT_CLUSTER_LISTER)
+
+
+def list_region_clusters(region: str, lister: Optional[List[str]] = None,
+                         timeout: float = NKS_TIMEOUT) -> List[Dict]:
+    """Run the lister for region and return its clusters as dicts with 'uuid', 'name' and 'endpoint'.
+
+    Raises OSError if the lister cannot run or fails and ValueError if its
+    output is not a cluster list.
+    """
+    cmd = [arg.replace('{region}', region) for arg in (lister or cluster_lister())]
+    try:
+        process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                                 timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise OSError(f"Cluster lister timed out after {timeout:g} s: {' '.join(cmd)}")
+    if process.returncode != 0:
+        raise OSError(f"Cluster lister failed with error code {process.returncode}:\n"
+                      f"STDERR: {process.stderr.strip()}")
+    try:
+        listing = json.loads(process.stdout)
+    except ValueError as e:
+        raise ValueError(f"Cluster lister did not print JSON: {e}")
+    if isinstance(listing, dict):
+        listing = listing.get('clusters')
+    if not isinstance(listing, list):
+        raise ValueError("Cluster lister output has no cluster list")
+
+    clusters = []
+    for item in listing:
+        if not isinstance(item, dict) or not (item.get('uuid') or item.get('clusterUuid')):
+            raise ValueError(f"Cluster without a uuid in the lister output: {item!r}")
+        clusters.append({'uuid': item.get('uuid') or item.get('clusterUuid'), 'name': item.get('name'),
+                         'endpoint': item.get('endpoint')})
+    return clusters
+
+
+def nks_contexts(model: KubeConfigModel) -> Dict[str, Dict]:
+    """Map the cluster UUID of every NKS context to its context, region and server.
+
+    UUID and region come from the ncp-iam-authenticator arguments of the
+    context's user, so contexts that were renamed are still found.
+    """
+    found = {}
+    for entry in model.contexts:
+        cluster, user = context_refs(entry)
+        user_entry = model.users.get(user)
+        if user_entry is None or not is_nks_user(user_entry):
+            continue
+        exec_config = user_entry['user']['exec']
+        command = wrapped_command(exec_config) or [exec_config.get('command')] + list(exec_config.get('args') or [])
+        options = dict(zip(command[1:], command[2:]))
+        if not options.get('--clusterUuid'):
+            continue
+        cluster_entry = model.clusters.get(cluster) or {}
+        found.setdefault(options['--clusterUuid'], {
+            'context': entry['name'], 'region': options.get('--region'),
+            'server': (cluster_entry.get('cluster') or {}).get('server')})
+    return found
+
+
+def plan_region_sync(model: KubeConfigModel, region: str, clusters: List[Dict]) -> Dict[str, List]:
+    """Diff the listed clusters of region against the NKS contexts in model.
+
+    Returns the listed clusters that are 'new', 'changed' (endpoint no
+    longer matches the context's server) and 'unchanged', plus the 'stale'
+    context names: NKS contexts of region whose cluster is not listed.
+    """
+    existing = nks_contexts(model)
+    plan = {'new': [], 'changed': [], 'unchanged': [], 'stale': []}
+    listed = set()
+    for cluster in clusters:
+        listed.add(cluster['uuid'])
+        current = existing.get(cluster['uuid'])
+        if current is None:
+            plan['new'].append(cluster)
+        elif cluster.get('endpoint') and cluster['endpoint'].rstrip('/') != (current['server'] or '').rstrip('/'):
+            plan['changed'].append(dict(cluster, context=current['context']))
+        else:
+            plan['unchanged'].append(dict(cluster, context=current['context']))
+    for uuid, current in existing.items():
+        if uuid not in listed and (current['region'] or '').lower() == region.lower():
+            plan['stale'].append(current['context'])
+    return plan
@@ -0,0 +1,363 @@
+"""Fuzzy search over the contexts of a listing.
+
+ContextIndex keeps a trigram index over each context's name, cluster,
+user and namespace. It is updated by context name like the GUI's table
+model, so a reload re-indexes only the contexts that changed.
+
+Matches are ranked in tiers, each in listing order:
+
+1. the name equals the query,
+2. the name starts with it,
+3. the name contains it,
+4. the cluster, user or namespace contains it,
+5. most of the query's trigrams occur (typos),
+6. the query's characters occur in order in the name ('pyprd' finds
+   'payments-prod').
+
+Typing is incremental. Appending a character adds one trigram, so the
+rows holding every trigram of the longer query are the previous ones
+intersected with one posting list. The per-row trigram counts of the
+fuzzy tier are extended the same way. Backspace returns to the state kept
+for the shorter prefix. Queries of one or two characters have no trigram;
+they are found with str.find() over the joined names, stopping once
+enough results are in.
+
+RecentContexts is the most-recently-used list that results are ranked by
+first; it is kept next to the config file.
+"""
+
+import heapq
+import json
+import os
+import re
+import tempfile
+import threading
+from bisect import bisect_right
+from collections import Counter
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+# Share of the query's trigrams a row needs for a typo match
+FUZZY_MIN = 0.6
+# Rows holding all of a query's trigrams above which the joined strings are searched instead
+SCAN_MIN = 1000
+# Contexts remembered as recently used
+RECENT_MAX = 20
+
+
+def trigrams(text: str) -> Set[str]:
+    """Return the set of three-character substrings of text."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _normalize(query: str) -> str:
+    return ' '.join(query.lower().split())
+
+
+class _Blob:
+    """Strings joined by newlines, to search many of them with one str.find()."""
+
+    def __init__(self, rows: List[int], texts: List[str]):
+        self.rows = rows
+        # Each string is preceded by a newline, so '\n' + needle finds prefixes
+        self.starts = []
+        offset = 1
+        for row_id in rows:
+            self.starts.append(offset)
+            offset += len(texts[row_id]) + 1
+        self.text = '\n' + '\n'.join(texts[row_id] for row_id in rows)
+
+    def row_at(self, offset: int) -> int:
+        return self.rows[bisect_right(self.starts, offset) - 1]
+
+    def find(self, needle: str, prefix: bool = False) -> Iterator[int]:
+        """Yield the rows containing needle (starting with it if prefix), in order."""
+        text = self.text
+        if prefix:
+            needle = '\n' + needle
+        offset = text.find(needle)
+        last = None
+        while offset >= 0:
+            row_id = self.row_at(offset + 1 if prefix else offset)
+            if row_id != last:
+                last = row_id
+                yield row_id
+            offset = text.find(needle, offset + 1)
+
+    def search(self, pattern) -> Iterator[int]:
+        """Yield the rows a compiled regex matches in, in order."""
+        last = None
+        for match in pattern.finditer(self.text):
+            row_id = self.row_at(match.start())
+            if row_id != last:
+                last = row_id
+                yield row_id
+
+
+def _subsequence_pattern(query: str):
+    """Regex finding the characters of query in order within one line.
+
+    It starts at a literal, which the regex engine scans for quickly. Each
+    gap excludes the character after it, so each character can only match
+    its first occurrence after the previous one: nothing to backtrack into.
+    (No possessive quantifiers: they need Python 3.11.)
+    """
+    chars = [re.escape(char) for char in query.replace(' ', '')]
+    return re.compile(chars[0] + ''.join(f'[^\\n{char}]*{char}' for char in chars[1:]))
+
+
+class ContextIndex:
+    """Trigram index of contexts, keyed by context name. Safe to update from another thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # name -> row id; ids stay the same while a context exists
+        self._ids: Dict[str, int] = {}
+        # row id -> (name, cluster, user, namespace)
+        self._rows: Dict[int, tuple] = {}
+        # row id -> lowercased name, and all fields lowercased on one line
+        self._lower: List[str] = []
+        self._text: List[str] = []
+        self._free: List[int] = []
+        # lowercased name -> row id
+        self._by_lower: Dict[str, int] = {}
+        # row ids in listing order, and row id -> place in it
+        self._order: List[int] = []
+        self._position: List[int] = []
+        # trigram -> row ids whose text contains it
+        self._postings: Dict[str, Set[int]] = {}
+        # Lowercased names and texts joined in listing order
+        self._names = _Blob([], [])
+        self._texts = _Blob([], [])
+        # State of the last queries, for incremental typing:
+        # (query, trigrams, rows holding all of them, row id -> how many it holds)
+        self._prefixes: List[tuple] = []
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def fields(self, name: str) -> tuple:
+        """Return the (name, cluster, user, namespace) of an indexed context."""
+        with self._lock:
+            return self._rows[self._ids[name]]
+
+    def update(self, contexts: Iterable[Dict]):
+        """Re-index a listing; only contexts whose fields changed are touched."""
+        seen = {}
+        for context in contexts:
+            name = context.get('name')
+            if name is None or name in seen:
+                continue
+            body = context.get('context') or {}
+            seen[name] = (name, body.get('cluster', '') or '', body.get('user', '') or '',
+                          body.get('namespace', 'default') or 'default')
+
+        with self._lock:
+            for name in [name for name in self._ids if name not in seen]:
+                self._remove(self._ids.pop(name))
+            order = []
+            for name, row in seen.items():
+                row_id = self._ids.get(name)
+                if row_id is not None and self._rows[row_id] != row:
+                    self._remove(row_id)
+                    row_id = None
+                if row_id is None:
+                    row_id = self._add(row)
+                    self._ids[name] = row_id
+                order.append(row_id)
+            for position, row_id in enumerate(order):
+                self._position[row_id] = position
+            self._order = order
+            self._names = _Blob(order, self._lower)
+            self._texts = _Blob(order, self._text)
+            self._prefixes = []
+
+    def _add(self, row: tuple) -> int:
+        row_id = self._free.pop() if self._free else len(self._lower)
+        if row_id == len(self._lower):
+            self._lower.append('')
+            self._text.append('')
+            self._position.append(0)
+        text = ' '.join(row).lower()
+        self._lower[row_id] = row[0].lower()
+        self._text[row_id] = text
+        self._rows[row_id] = row
+        self._by_lower.setdefault(self._lower[row_id], row_id)
+        postings = self._postings
+        for gram in trigrams(text):
+            ids = postings.get(gram)
+            if ids is None:
+                postings[gram] = {row_id}
+            else:
+                ids.add(row_id)
+        return row_id
+
+    def _remove(self, row_id: int):
+        for gram in trigrams(self._text[row_id]):
+            ids = self._postings[gram]
+            ids.discard(row_id)
+            if not ids:
+                del self._postings[gram]
+        if self._by_lower.get(self._lower[row_id]) == row_id:
+            del self._by_lower[self._lower[row_id]]
+        self._lower[row_id] = ''
+        self._text[row_id] = ''
+        del self._rows[row_id]
+        self._free.append(row_id)
+
+    def _state(self, query: str) -> tuple:
+        """Return (trigrams, rows holding all of them, row id -> how many it holds) of query."""
+        # Longest earlier query this one extends
+        while self._prefixes and not query.startswith(self._prefixes[-1][0]):
+            self._prefixes.pop()
+        if self._prefixes and self._prefixes[-1][0] == query:
+            return self._prefixes[-1][1:]
+        if self._prefixes:
+            _, grams, rows, counts = self._prefixes[-1]
+            grams = set(grams)
+            counts = counts.copy()
+        else:
+            grams, rows, counts = set(), None, Counter()
+        for gram in trigrams(query) - grams:
+            posting = self._postings.get(gram, set())
+            rows = set(posting) if rows is None else rows & posting
+            counts.update(posting)
+            grams.add(gram)
+        state = (grams, rows if rows is not None else set(), counts)
+        self._prefixes.append((query,) + state)
+        return state
+
+    def _tiers(self, query: str, limit: Optional[int]) -> Iterator[int]:
+        """Yield matching row ids, best tier first; rows may repeat.
+
+        limit bounds how many typo matches are ranked; later tiers are
+        only computed if the caller keeps asking for rows.
+        """
+        exact = self._by_lower.get(query)
+        if exact is not None:
+            yield exact
+        if len(query) < 3:
+            yield from self._names.find(query, prefix=True)
+            yield from self._names.find(query)
+            yield from self._texts.find(query)
+            yield from self._names.search(_subsequence_pattern(query))
+            return
+
+        grams, rows, counts = self._state(query)
+        position = self._position
+        if len(rows) > SCAN_MIN:
+            # Common substring: the joined strings find the first hits fastest
+            yield from self._names.find(query, prefix=True)
+            yield from self._names.find(query)
+            yield from self._texts.find(query)
+        else:
+            lower = self._lower
+            found = sorted((row_id for row_id in rows if query in self._text[row_id]), key=position.__getitem__)
+            yield from (row_id for row_id in found if lower[row_id].startswith(query))
+            yield from (row_id for row_id in found if query in lower[row_id])
+            yield from found
+
+        needed = max(1, int(len(grams) * FUZZY_MIN + 0.999))
+        fuzzy = [row_id for row_id, count in counts.items() if count >= needed]
+
+        def key(row_id):
+            return -counts[row_id], position[row_id]
+        if limit is not None and limit < len(fuzzy):
+            yield from heapq.nsmallest(limit, fuzzy, key=key)
+        else:
+            yield from sorted(fuzzy, key=key)
+        yield from self._names.search(_subsequence_pattern(query))
+
+    def search(self, query: str, limit: Optional[int] = None, recent: Iterable[str] = ()) -> List[str]:
+        """Return the names matching query, best first.
+
+        Recently used contexts that match (most recent first in recent)
+        come before all others. An empty query returns every context.
+        """
+        return [row[0] for row in self.search_rows(query, limit, recent)]
+
+    def search_rows(self, query: str, limit: Optional[int] = None, recent: Iterable[str] = ()) -> List[tuple]:
+        """Like search(), but return the (name, cluster, user, namespace) of each match.
+
+        The rows are read under the same lock as the search, so they
+        cannot go missing in between as fields() can.
+        """
+        query = _normalize(query)
+        with self._lock:
+            recent_ids = [self._ids[name] for name in recent if name in self._ids]
+            if query:
+                pattern = _subsequence_pattern(query)
+                recent_ids = [row_id for row_id in recent_ids if self._matches(row_id, query, pattern)]
+                rows = self._tiers(query, limit)
+            else:
+                rows = iter(self._order)
+            results = []
+            taken = set()
+            for row_id in chain(recent_ids, rows):
+                if row_id in taken:
+                    continue
+                taken.add(row_id)
+                results.append(self._rows[row_id])
+                if limit is not None and len(results) >= limit:
+                    break
+            return results
+
+    def matches(self, query: str) -> Set[str]:
+        """Return the names of every context matching query (all of them for an empty query).
+
+        Same matches as search(), unranked, for filtering a list.
+        """
+        query = _normalize(query)
+        with self._lock:
+            if not query:
+                return set(self._ids)
+            if len(query) < 3:
+                text = self._text
+                found = {row_id for row_id in self._order if query in text[row_id]}
+            else:
+                grams, _, counts = self._state(query)
+                # Substring matches hold every trigram, so they are among these
+                needed = max(1, int(len(grams) * FUZZY_MIN + 0.999))
+                found = {row_id for row_id, count in counts.items() if count >= needed}
+            if len(query.replace(' ', '')) > 1:
+                found.update(self._names.search(_subsequence_pattern(query)))
+            rows = self._rows
+            return {rows[row_id][0] for row_id in found}
+
+    def _matches(self, row_id: int, query: str, pattern) -> bool:
+        if query in self._text[row_id] or pattern.search(self._lower[row_id]):
+            return True
+        if len(query) < 3:
+            return False
+        grams, _, counts = self._state(query)
+        return counts[row_id] >= max(1, int(len(grams) * FUZZY_MIN + 0.999))
+
+
+class RecentContexts:
+    """Most recently used context names, newest first, stored as JSON."""
+
+    def __init__(self, path: Optional[str], limit: int = RECENT_MAX):
+        self.path = path
+        self.limit = limit
+        self.names: List[str] = []
+        if path:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    names = json.load(f)
+                if isinstance(names, list):
+                    self.names = [name for name in names if isinstance(name, str)][:limit]
+            except (OSError, ValueError):
+                pass
+
+    def use(self, name: str):
+        """Move name to the front and store the list."""
+        self.names = [name] + [other for other in self.names if other != name][:self.limit - 1]
+        if not self.path:
+            return
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix='.kcm-recent-')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.names, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Could not save recent contexts: {e}")
@@ -0,0 +1,184 @@
+"""Per-terminal session overlays.
+
+kubectl merges the files listed in KUBECONFIG and takes current-context
+from the first file that sets one. A session overlay is a tiny kubeconfig
+holding only current-context (plus, to pin a namespace, a copy of that one
+context with the namespace changed). Put in front of the shared config,
+it gives a terminal its own context, and switching rewrites a few bytes
+instead of the shared file. Other terminals are not affected.
+
+Overlays live in SESSION_DIR, one per session id. The default id,
+pid-<shell pid>, ties an overlay to the shell that started it, so it is
+collected once that process is gone; other ids expire SESSION_MAX_AGE
+after their last switch. Overlays older than the last boot are always
+collected. A PyInstaller --onefile kcm runs as the child of a bootloader
+that exits with it, so there the shell is the bootloader's parent.
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Optional, Tuple
+from urllib.parse import quote
+
+SESSION_DIR = os.environ.get('KCM_SESSION_DIR') or os.path.expanduser("~/.kube/kcm-sessions")
+# Environment variable naming the session of a shell
+SESSION_ENV = 'KCM_SESSION'
+PID_PREFIX = 'pid-'
+OVERLAY_SUFFIX = '.yaml'
+# Seconds after its last switch that an overlay without a shell pid expires
+SESSION_MAX_AGE = 7 * 24 * 3600
+# Snapshot and lock files earlier versions left next to overlays (.<overlay><suffix>)
+SIDECAR_SUFFIXES = ('.kcm-cache', '.kcm-lock')
+
+
+def _process(pid: int) -> Optional[Tuple[int, str]]:
+    """Return the (parent pid, command name) of a process, or None if unknown."""
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            stat = f.read().decode('utf-8', 'replace')
+        # comm is in parentheses and may itself hold spaces and parentheses
+        close = stat.rindex(')')
+        return int(stat[close + 2:].split()[1]), stat[stat.index('(') + 1:close]
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        output = subprocess.run(['ps', '-o', 'ppid=,comm=', '-p', str(pid)], stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, timeout=5).stdout.decode('utf-8', 'replace')
+        ppid, command = output.strip().split(None, 1)
+        return int(ppid), os.path.basename(command)
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+
+
+def shell_pid() -> int:
+    """Return the pid of the shell that ran us, skipping a PyInstaller bootloader."""
+    ppid = os.getppid()
+    if getattr(sys, 'frozen', False):
+        parent = _process(ppid)
+        # /proc truncates command names to 15 characters
+        ours = os.path.basename(sys.executable)
+        if parent is not None and parent[0] > 1 and parent[1] and ours.startswith(parent[1][:15]):
+            return parent[0]
+    return ppid
+
+
+def current_session_id() -> str:
+    """Return the session of the calling shell: $KCM_SESSION, else pid-<shell pid>."""
+    return os.environ.get(SESSION_ENV) or f"{PID_PREFIX}{shell_pid()}"
+
+
+def overlay_path(session_id: str, directory: str = SESSION_DIR) -> str:
+    return os.path.join(directory, quote(session_id, safe='') + OVERLAY_SUFFIX)
+
+
+def is_overlay(path: str, directory: str = SESSION_DIR) -> bool:
+    return os.path.dirname(os.path.abspath(path)) == os.path.abspath(directory)
+
+
+def base_paths(paths: List[str], directory: str = SESSION_DIR) -> List[str]:
+    """Return paths without session overlays, i.e. the shared config files."""
+    return [path for path in paths if not is_overlay(path, directory)]
+
+
+def kubeconfig_value(overlay: Optional[str], paths: List[str], directory: str = SESSION_DIR) -> str:
+    """Return a KUBECONFIG value putting overlay (if any) in front of the shared files of paths."""
+    return os.pathsep.join(([overlay] if overlay else []) + base_paths(paths, directory))
+
+
+def write_overlay(path: str, text: str):
+    """Replace an overlay atomically. Not fsynced: a session does not outlive a crash."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.kcm-session-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, path)
+    except OSError:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def remove_overlay(path: str) -> bool:
+    """Delete an overlay and any sidecar files of it; return whether the overlay existed."""
+    directory, name = os.path.split(path)
+    for suffix in SIDECAR_SUFFIXES:
+        try:
+            os.unlink(os.path.join(directory, f".{name}{suffix}"))
+        except FileNotFoundError:
+            pass
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _boot_time() -> Optional[float]:
+    try:
+        with open('/proc/stat', 'r') as f:
+            for line in f:
+                if line.startswith('btime '):
+                    return float(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Someone else's process
+        return True
+    return True
+
+
+def session_alive(path: str, now: Optional[float] = None, boot: Optional[float] = None) -> bool:
+    """Whether the session of an overlay may still be in use."""
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return False
+    if boot is not None and mtime < boot:
+        return False
+    name = os.path.basename(path)[:-len(OVERLAY_SUFFIX)]
+    pid = name[len(PID_PREFIX):]
+    # os.kill() would terminate the process on Windows; rely on age there
+    if name.startswith(PID_PREFIX) and pid.isdigit() and os.name != 'nt':
+        return _pid_alive(int(pid))
+    return (time.time() if now is None else now) - mtime < SESSION_MAX_AGE
+
+
+def collect_sessions(directory: str = SESSION_DIR) -> List[str]:
+    """Delete the overlays of sessions that are gone; return their paths."""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    boot = _boot_time()
+    now = time.time()
+    removed = []
+    for name in names:
+        path = os.path.join(directory, name)
+        if name.endswith(OVERLAY_SUFFIX):
+            if not session_alive(path, now, boot) and remove_overlay(path):
+                removed.append(path)
+            continue
+        # Sidecars whose overlay is gone
+        for suffix in SIDECAR_SUFFIXES:
+            if name.startswith('.') and name.endswith(OVERLAY_SUFFIX + suffix) and \
+                    not os.path.exists(os.path.join(directory, name[1:-len(suffix)])):
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+    return removed
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""Sharded kubeconfig storage: one file per context under ~/.kube/config.d/.
+
+Each shard is a complete kubeconfig holding one context together with the
+cluster and user it refers to, so changing a context rewrites only its own
+file. A small index file holds current-context (and any top-level values
+such as preferences, plus clusters and users no context uses). The
+directory reads like a KUBECONFIG list with the index first, which is also
+what kubeconfig_value() returns for kubectl.
+
+Usage:
+    python kube_config_shards.py split [--config PATH] [--dir DIR]
+    python kube_config_shards.py join [--dir DIR] [--config PATH]
+    python kube_config_shards.py kubeconfig [--dir DIR]
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+from typing import Callable, Dict, List
+from urllib.parse import quote
+
+from kube_config_merge import MergedView, apply_operations
+from kube_config_model import SECTIONS, KubeConfigModel, context_refs
+
+DEFAULT_SHARD_DIR = os.path.expanduser("~/.kube/config.d")
+INDEX_NAME = 'index'
+SHARD_SUFFIX = '.yaml'
+# All shards share one advisory lock file
+LOCK_NAME = '.kcm-lock'
+
+
+def shard_paths(shard_dir: str) -> List[str]:
+    """Return the shard files in shard_dir, sorted by name (the merge order)."""
+    try:
+        names = [entry.name for entry in os.scandir(shard_dir)
+                 if entry.name.endswith(SHARD_SUFFIX) and not entry.name.startswith('.')
+                 and entry.is_file()]
+    except FileNotFoundError:
+        return []
+    return [os.path.join(shard_dir, name) for name in sorted(names)]
+
+
+def kubeconfig_value(shard_dir: str = DEFAULT_SHARD_DIR) -> str:
+    """Return the KUBECONFIG value that makes kubectl see the sharded config."""
+    return os.pathsep.join([os.path.join(shard_dir, INDEX_NAME)] + shard_paths(shard_dir))
+
+
+def shard_file_name(context_name: str) -> str:
+    """Return the file name of a context's shard; safe for paths and KUBECONFIG."""
+    return quote(context_name, safe='') + SHARD_SUFFIX
+
+
+def unique_shard_path(shard_dir: str, context_name: str) -> str:
+    """Return an unused shard path for context_name.
+
+    Names differing only in case share a file name on case-insensitive
+    file systems, hence the hashed fallback.
+    """
+    path = os.path.join(shard_dir, shard_file_name(context_name))
+    if os.path.exists(path):
+        digest = hashlib.sha1(context_name.encode('utf-8')).hexdigest()[:8]
+        path = os.path.join(shard_dir, f"{quote(context_name, safe='')}-{digest}{SHARD_SUFFIX}")
+    return path
+
+
+def shard_document(model: KubeConfigModel, context: Dict) -> Dict:
+    """Return the kubeconfig document of the shard for context."""
+    cluster, user = context_refs(context)
+    document = {'apiVersion': 'v1', 'kind': 'Config',
+                'clusters': [model.clusters.get(cluster)] if cluster in model.clusters else [],
+                'contexts': [context],
+                'users': [model.users.get(user)] if user in model.users else []}
+    return document
+
+
+class ShardedView(MergedView):
+    """Merged view of an index file followed by the shard files of a directory."""
+
+    def __init__(self, shard_dir: str, make_layer: Callable[[str, bool], object]):
+        self.shard_dir = shard_dir
+        self.index_path = os.path.join(shard_dir, INDEX_NAME)
+        # make_layer(path, create) returns the single-file manager of path
+        self._make_layer = make_layer
+        super().__init__([self._layer_for(self.index_path, True)], 0)
+
+    def _layer_for(self, path: str, create: bool):
+        layer = self._make_layer(path, create)
+        layer.lock_path = os.path.join(self.shard_dir, LOCK_NAME)
+        return layer
+
+    def _scan(self) -> List:
+        known = {layer.config_path: layer for layer in self.layers}
+        return [known[self.index_path]] + [known.get(path) or self._layer_for(path, False)
+                                           for path in shard_paths(self.shard_dir)]
+
+    def _paths(self) -> List[str]:
+        return [self.index_path] + shard_paths(self.shard_dir)
+
+    def save(self, model: KubeConfigModel) -> KubeConfigModel:
+        """Write the differences to the affected shards only.
+
+        New contexts get a shard of their own with copies of their cluster
+        and user; other new clusters and users go to the index. Shards
+        left without contexts are deleted and a shard whose context was
+        renamed is renamed with it.
+        """
+        before = self.model
+        if before is None:
+            raise OSError("Failed to load kubeconfig.")
+
+        operations, added = self._plan(before, model)
+        self._plan_copies(operations)
+        placed = {'clusters': set(), 'users': set()}
+        new_shards = []
+        for context in added['contexts']:
+            document = shard_document(model, context)
+            for section in placed:
+                placed[section].update(entry['name'] for entry in document[section])
+            new_shards.append((unique_shard_path(self.shard_dir, context['name']), document))
+        for section in placed:
+            for entry in added[section]:
+                if entry['name'] not in placed[section]:
+                    operations.setdefault(self.index_path, []).append((section, None, entry))
+
+        for path, file_operations in operations.items():
+            self.layer(path)._commit(apply_operations(file_operations))
+        for path, document in new_shards:
+            layer = self._layer_for(path, False)
+            if not layer.save_model(KubeConfigModel(document)):
+                raise OSError(f"Failed to write {path}")
+
+        self._tidy([path for path in operations if path != self.index_path], model)
+        return self.load()
+
+    def _plan_copies(self, operations: Dict[str, List[tuple]]):
+        """Repeat cluster and user changes on the copies other shards hold.
+
+        _plan() sends each change to the owner, the first file holding the
+        entry; a stale copy in a later shard would surface again once the
+        owner's shard is gone.
+        """
+        copies = []
+        for owner, file_operations in operations.items():
+            for section, name, entry in file_operations:
+                if section not in ('clusters', 'users') or name is None:
+                    continue
+                copies.extend((layer.config_path, (section, name, entry)) for layer in self.layers
+                              if layer.config_path != owner
+                              and name in self._models[layer.config_path].section(section))
+        for path, operation in copies:
+            operations.setdefault(path, []).append(operation)
+
+    def _tidy(self, paths: List[str], model: KubeConfigModel):
+        """Delete emptied shards and rename shards after their context."""
+        for path in paths:
+            shard = self.layer(path).load_model()
+            if shard is None:
+                continue
+            names = shard.contexts.names()
+            if not names:
+                if self._holds_only_copies(path, shard, model):
+                    os.remove(path)
+            elif len(names) == 1 and os.path.basename(path) != shard_file_name(names[0]):
+                target = unique_shard_path(self.shard_dir, names[0])
+                if not os.path.exists(target):
+                    os.rename(path, target)
+
+    def _holds_only_copies(self, path: str, shard: KubeConfigModel, model: KubeConfigModel) -> bool:
+        """Whether deleting the shard at path keeps every cluster and user still in use."""
+        for section, refs in (('clusters', model.cluster_refs), ('users', model.user_refs)):
+            for name in shard.section(section).names():
+                if refs.get(name) and not any(
+                        name in self._models[layer.config_path].section(section)
+                        for layer in self.layers if layer.config_path != path):
+                    return False
+        return True
+
+
+def split_config(config_path: str, shard_dir: str = DEFAULT_SHARD_DIR) -> int:
+    """Convert a monolithic kubeconfig into shard_dir; return the number of shards.
+
+    The source file is left as it is. Refuses to write into a directory
+    that already holds shards.
+    """
+    from kube_config_manager import KubeConfigManager
+
+    if shard_paths(shard_dir):
+        raise ValueError(f"'{shard_dir}' already contains shards")
+    model = KubeConfigManager(config_path, use_snapshot=False, create=False).load_model()
+    if model is None:
+        raise ValueError(f"'{config_path}' is not a valid kubeconfig file")
+    os.makedirs(shard_dir, exist_ok=True)
+
+    written = 0
+    used = {'clusters': set(), 'users': set()}
+    for context in model.contexts:
+        if context.get('name') is None:
+            continue
+        path = unique_shard_path(shard_dir, context['name'])
+        document = shard_document(model, context)
+        for section in used:
+            used[section].update(entry['name'] for entry in document[section])
+        if not KubeConfigManager(path, use_snapshot=False, create=False).save_model(KubeConfigModel(document)):
+            raise OSError(f"Failed to write {path}")
+        written += 1
+
+    index = dict(model.extra)
+    index.setdefault('apiVersion', 'v1')
+    index.setdefault('kind', 'Config')
+    for section in used:
+        index[section] = [entry for name, entry in
+                          ((entry.get('name'), entry) for entry in model.section(section))
+                          if name not in used[section]]
+    index['contexts'] = []
+    index['current-context'] = model.current_context
+    index_path = os.path.join(shard_dir, INDEX_NAME)
+    if not KubeConfigManager(index_path, use_snapshot=False, create=False).save_model(KubeConfigModel(index)):
+        raise OSError(f"Failed to write {index_path}")
+    return written
+
+
+def join_shards(shard_dir: str, config_path: str) -> int:
+    """Write the merged shards of shard_dir to config_path as one file; return the context count."""
+    from kube_config_manager import KubeConfigManager
+
+    if not os.path.exists(os.path.join(shard_dir, INDEX_NAME)):
+        raise ValueError(f"'{shard_dir}' is not a sharded kubeconfig directory")
+    model = KubeConfigManager(shard_dir=shard_dir).load_model()
+    if model is None:
+        raise ValueError(f"Failed to load the shards in '{shard_dir}'")
+    document = model.to_dict()
+    for section in SECTIONS:
+        document.setdefault(section, [])
+    if not KubeConfigManager(config_path, create=False).save_model(KubeConfigModel(document)):
+        raise OSError(f"Failed to write {config_path}")
+    return len(model.contexts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=['split', 'join', 'kubeconfig'])
+    parser.add_argument('--config', default=os.path.expanduser("~/.kube/config"),
+                        help='monolithic kubeconfig (default: %(default)s)')
+    parser.add_argument('--dir', default=DEFAULT_SHARD_DIR,
+                        help='shard directory (default: %(default)s)')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'split':
+            count = split_config(args.config, args.dir)
+            print(f"Wrote {count} shards to {args.dir}")
+            print(f"export KUBECONFIG={kubeconfig_value(args.dir)}")
+        elif args.command == 'join':
+            count = join_shards(args.dir, args.config)
+            print(f"Wrote {count} contexts to {args.config}")
+        else:
+            print(kubeconfig_value(args.dir))
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""Caching exec-credential wrapper for NKS users.
+
+kubectl runs a user's exec plugin for every command; for NKS that is
+ncp-iam-authenticator, which requests a fresh token each time. A wrapped
+user runs this script instead, with the original command after '--':
+
+    python kube_config_token_cache.py exec -- ncp-iam-authenticator token --clusterUuid ... --region ...
+
+The ExecCredential printed by the authenticator is kept on disk, keyed by
+cluster and region, until shortly before its expirationTimestamp.
+Concurrent kubectl processes serialize on a per-key lock so that only one
+of them asks for a new token.
+
+Usage:
+    python kube_config_token_cache.py enable CONTEXT... [--config PATH]
+    python kube_config_token_cache.py disable CONTEXT... [--config PATH]
+    python kube_config_token_cache.py status [--config PATH]
+    python kube_config_token_cache.py clear
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, concurrent misses may both fetch
+    fcntl = None
+
+TOKEN_CACHE_DIR = os.environ.get('KCM_TOKEN_CACHE_DIR') or os.path.expanduser("~/.kube/cache/kcm-tokens")
+# Tokens this close to expiry are fetched again
+EXPIRY_MARGIN = 60.0
+NKS_AUTHENTICATOR = 'ncp-iam-authenticator'
+WRAPPER_PATH = os.path.abspath(__file__)
+
+
+def cache_key(command: List[str]) -> str:
+    """Return the cache file stem for an exec command: region, cluster and a hash of the rest."""
+    options = dict(zip(command[1:], command[2:]))
+    cluster = options.get('--clusterUuid', 'unknown')
+    region = options.get('--region', 'unknown')
+    digest = hashlib.sha256('\0'.join(command[1:]).encode('utf-8')).hexdigest()[:12]
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', f"{region}-{cluster}-{digest}")
+
+
+def _expiry(credential: Dict) -> Optional[float]:
+    """Return the expirationTimestamp of an ExecCredential as a Unix time, if it has one."""
+    stamp = (credential.get('status') or {}).get('expirationTimestamp')
+    if not isinstance(stamp, str):
+        return None
+    try:
+        expires = datetime.fromisoformat(stamp.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if expires.tzinfo is None:
+        expires = expires.replace(tzinfo=timezone.utc)
+    return expires.timestamp()
+
+
+def read_cached(path: str) -> Optional[bytes]:
+    """Return the cached ExecCredential at path if it is still valid."""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        expires = _expiry(json.loads(data))
+    except (OSError, ValueError, AttributeError):
+        return None
+    if expires is None or expires - EXPIRY_MARGIN <= time.time():
+        return None
+    return data
+
+
+def _write_cached(path: str, data: bytes):
+    """Store a credential atomically, readable by the owner only."""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except OSError:
+        os.unlink(temp_path)
+        raise
+
+
+def exec_credential(command: List[str], cache_dir: str = TOKEN_CACHE_DIR) -> int:
+    """Print the ExecCredential for command, from the cache when valid; return the exit code."""
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    path = os.path.join(cache_dir, cache_key(command) + '.json')
+    data = read_cached(path)
+    if data is None:
+        lock_fd = os.open(path + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            # Another process may have fetched it while we waited
+            data = read_cached(path)
+            if data is None:
+                process = subprocess.run(command, stdout=subprocess.PIPE)
+                if process.returncode != 0:
+                    return process.returncode
+                data = process.stdout
+                try:
+                    cacheable = _expiry(json.loads(data)) is not None
+                except (ValueError, AttributeError):
+                    cacheable = False
+                if cacheable:
+                    _write_cached(path, data)
+        finally:
+            os.close(lock_fd)
+    sys.stdout.buffer.write(data)
+    sys.stdout.flush()
+    return 0
+
+
+def clear_cache(cache_dir: str = TOKEN_CACHE_DIR) -> int:
+    """Delete every cached credential; return how many were removed."""
+    removed = 0
+    try:
+        names = os.listdir(cache_dir)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        if name.endswith('.json'):
+            os.remove(os.path.join(cache_dir, name))
+            removed += 1
+    return removed
+
+
+def is_nks_user(entry: Dict) -> bool:
+    """Whether a user entry authenticates with ncp-iam-authenticator, wrapped or not."""
+    exec_config = (entry.get('user') or {}).get('exec') if isinstance(entry, dict) else None
+    if not isinstance(exec_config, dict):
+        return False
+    command = wrapped_command(exec_config) or [exec_config.get('command') or '']
+    return os.path.basename(command[0]).startswith(NKS_AUTHENTICATOR)
+
+
+def wrapped_command(exec_config: Dict) -> Optional[List[str]]:
+    """Return the original command of a wrapped exec config, or None if it is not wrapped."""
+    args = exec_config.get('args') or []
+    if (len(args) > 3 and os.path.basename(args[0]) == os.path.basename(WRAPPER_PATH)
+            and args[1:3] == ['exec', '--']):
+        return list(args[3:])
+    return None
+
+
+def wrap_user(entry: Dict, python: str = sys.executable) -> Dict:
+    """Return a copy of an NKS user entry whose exec plugin goes through the cache."""
+    exec_config = entry['user']['exec']
+    if wrapped_command(exec_config) is not None:
+        return entry
+    wrapped = dict(exec_config)
+    wrapped['command'] = python
+    wrapped['args'] = [WRAPPER_PATH, 'exec', '--', exec_config['command']] + list(exec_config.get('args') or [])
+    return {**entry, 'user': {**entry['user'], 'exec': wrapped}}
+
+
+def unwrap_user(entry: Dict) -> Dict:
+    """Return a copy of a wrapped user entry calling the original exec plugin again."""
+    exec_config = entry['user']['exec']
+    command = wrapped_command(exec_config)
+    if command is None:
+        return entry
+    unwrapped = dict(exec_config)
+    unwrapped['command'] = command[0]
+    unwrapped['args'] = command[1:]
+    return {**entry, 'user': {**entry['user'], 'exec': unwrapped}}
+
+
+def main():
+    if sys.argv[1:3] == ['exec', '--']:
+        # Hot path for kubectl: no argparse, no manager import
+        sys.exit(exec_credential(sys.argv[3:]) if len(sys.argv) > 3 else 2)
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=['enable', 'disable', 'status', 'clear'])
+    parser.add_argument('contexts', nargs='*', help='contexts to change (enable/disable)')
+    parser.add_argument('--config', help='kubeconfig file (default: KUBECONFIG or ~/.kube/config)')
+    args = parser.parse_args()
+
+    if args.command == 'clear':
+        print(f"Removed {clear_cache()} cached credentials")
+        return
+
+    from kube_config_manager import KubeConfigManager
+    manager = KubeConfigManager(args.config)
+    if args.command == 'status':
+        for name, state in manager.get_token_cache_status().items():
+            print(f"{name}: {state}")
+        return
+    if not args.contexts:
+        parser.error(f"{args.command} needs at least one context")
+    success, message = manager.set_token_cache(args.contexts, args.command == 'enable')
+    print(message, file=sys.stdout if success else sys.stderr)
+    if not success:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
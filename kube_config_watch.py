@@ -0,0 +1,199 @@
+"""Noticing changes other programs make to the kubeconfig.
+
+kubectl, cloud CLIs and editors write the config while the GUI is open.
+ConfigWatcher follows the directories of the config files with inotify
+(Linux), so files replaced by rename, as save_config() itself does, are
+seen as well as in-place writes. Without inotify the caller polls
+changed() every POLL_INTERVAL seconds instead.
+
+A save is a burst of events (temp file, rename, lock, snapshot), so
+callers wait for the burst to settle with a Debouncer and then ask
+changed(), which compares the files with what the manager last read or
+wrote: the application's own saves never trigger a reload.
+
+The PySide GUI uses QFileSystemWatcher for the same job
+(kube_context_pyside_watch.py); both share the Debouncer and the
+manager's watch_paths() and changed_on_disk().
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+from typing import Dict, List, Optional
+
+# Quiet time after the last event before a burst is handled, in seconds
+DEBOUNCE = 0.25
+# Longest a steady stream of events may delay handling
+MAX_DELAY = 2.0
+# Seconds between checks when inotify is not available
+POLL_INTERVAL = 1.0
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+# The watched directory itself went away, or events were lost
+LOST_MASK = IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED | IN_Q_OVERFLOW
+EVENT_HEADER = struct.Struct('iIII')
+
+
+def _load_libc():
+    if not hasattr(os, 'uname') or os.uname().sysname != 'Linux':
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+    except OSError:
+        return None
+    return libc if hasattr(libc, 'inotify_init1') and hasattr(libc, 'inotify_add_watch') else None
+
+
+_libc = _load_libc()
+
+
+class Debouncer:
+    """Collapses a burst of events into one action.
+
+    delay() is called for every event and returns how long to (re)arm a
+    single-shot timer for; reset() is called when the timer fires.
+    """
+
+    def __init__(self, quiet: float = DEBOUNCE, max_delay: float = MAX_DELAY):
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self._first = None
+
+    def delay(self, now: Optional[float] = None) -> float:
+        """Register an event; return the seconds until the burst should be handled."""
+        now = time.monotonic() if now is None else now
+        if self._first is None:
+            self._first = now
+        return max(0.0, min(self.quiet, self._first + self.max_delay - now))
+
+    def reset(self):
+        self._first = None
+
+
+class ConfigWatcher:
+    """Watches the files of a KubeConfigManager (or DaemonManager) with inotify, if available."""
+
+    def __init__(self, manager, use_inotify: bool = True):
+        self.manager = manager
+        self._fd = None
+        # watch descriptor -> directory
+        self._watches: Dict[int, str] = {}
+        self._files = set()
+        self._dirs = set()
+        if use_inotify and _libc is not None:
+            fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                self._fd = fd
+        self.refresh_watches()
+
+    def fileno(self) -> Optional[int]:
+        """Return the inotify descriptor to wait on, or None if the caller must poll."""
+        return self._fd
+
+    def changed(self) -> bool:
+        """Whether the config changed since the manager last read or wrote it."""
+        return self.manager.changed_on_disk()
+
+    def refresh_watches(self):
+        """Watch the directories of the current config files (shards come and go)."""
+        files, dirs = self.manager.watch_paths()
+        self._files = set(files)
+        self._dirs = set(dirs)
+        if self._fd is None:
+            return
+        watched = set(self._watches.values())
+        for directory in self._dirs | {os.path.dirname(path) for path in self._files}:
+            if directory in watched or not os.path.isdir(directory):
+                continue
+            wd = _libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+            if wd >= 0:
+                self._watches[wd] = directory
+
+    def read_events(self) -> bool:
+        """Drain pending inotify events; return whether any may concern the config."""
+        if self._fd is None:
+            return False
+        relevant = False
+        lost = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            offset = 0
+            while offset < len(data):
+                wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                if mask & LOST_MASK:
+                    lost = True
+                    if mask & IN_IGNORED:
+                        self._watches.pop(wd, None)
+                    continue
+                directory = self._watches.get(wd)
+                if directory is None:
+                    continue
+                if (directory in self._dirs and not name.startswith('.')) or \
+                        os.path.join(directory, name) in self._files:
+                    relevant = True
+        if lost:
+            self.refresh_watches()
+        return relevant or lost
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            self._watches = {}
+
+
+def wait_for_change(watcher: ConfigWatcher, timeout: Optional[float] = None) -> bool:
+    """Block until the config changes (debounced); return False on timeout."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    debouncer = Debouncer()
+    pending = None
+    while True:
+        now = time.monotonic()
+        if pending is not None and now >= pending:
+            debouncer.reset()
+            pending = None
+            if watcher.changed():
+                return True
+        if deadline is not None and now >= deadline:
+            return False
+        waits: List[float] = [POLL_INTERVAL if watcher.fileno() is None else 3600.0]
+        if pending is not None:
+            waits.append(pending - now)
+        if deadline is not None:
+            waits.append(deadline - now)
+        wait = max(0.0, min(waits))
+        if watcher.fileno() is None:
+            time.sleep(wait)
+            if watcher.changed():
+                return True
+        elif select.select([watcher.fileno()], [], [], wait)[0] and watcher.read_events():
+            pending = time.monotonic() + debouncer.delay()
@@ -0,0 +1,359 @@
+"""Minimal-diff kubeconfig writer.
+
+A SourceLayout records where every top-level key, and every entry of the
+clusters/contexts/users lists, sits in the file (as byte offsets). When a
+model is saved, entries and keys that did not change are copied byte for
+byte from the current file, and only added or modified pieces are
+serialized. Comments, key order and the formatting of untouched entries
+survive, and the written diff stays as small as the change. Serialized
+pieces get the line ending of the file (CRLF if its first line has one).
+"""
+
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from yaml.nodes import MappingNode, SequenceNode
+
+from kube_config_model import SECTIONS, KubeConfigModel
+
+# Text between the start of an item's line and the item itself: "- " bullets
+ITEM_PREFIX = re.compile(r'( *)- +\Z')
+
+
+class SectionLayout:
+    """Spans of the entries of one block-style named list."""
+
+    def __init__(self, items_start: int, indent: int):
+        # Offset of the first item's line; everything before it is the header
+        self.items_start = items_start
+        self.indent = indent
+        # entry id -> (start, end) and entry id -> entry dict it was written from
+        self.spans: Dict[int, Tuple[int, int]] = {}
+        self.entries: Dict[int, Dict] = {}
+        self.by_name: Dict[str, int] = {}
+
+    def add(self, entry_id: int, entry: Dict, start: int, end: int):
+        self.spans[entry_id] = (start, end)
+        self.entries[entry_id] = entry
+        name = entry.get('name') if isinstance(entry, dict) else None
+        if name is not None and name not in self.by_name:
+            self.by_name[name] = entry_id
+
+    def matches(self, entries) -> bool:
+        """Whether entries are exactly the (id, entry) pairs written, in order."""
+        if len(entries) != len(self.entries):
+            return False
+        return all(self.entries.get(entry_id) is entry for entry_id, entry in entries.items())
+
+    def shifted(self, delta: int) -> 'SectionLayout':
+        """Return this layout moved by delta bytes."""
+        section = SectionLayout(self.items_start + delta, self.indent)
+        section.spans = {entry_id: (start + delta, end + delta)
+                         for entry_id, (start, end) in self.spans.items()}
+        section.entries = self.entries
+        section.by_name = self.by_name
+        return section
+
+    def find(self, entry_id: int, entry: Dict) -> Optional[Tuple[int, int]]:
+        """Return the span of entry if it is unchanged since it was written."""
+        if self.entries.get(entry_id) is entry:
+            return self.spans[entry_id]
+        # Not the same object (e.g. from save_config()); fall back to name and equality
+        name = entry.get('name') if isinstance(entry, dict) else None
+        original_id = self.by_name.get(name)
+        if original_id is not None and self.entries[original_id] == entry:
+            return self.spans[original_id]
+        return None
+
+
+class SourceLayout:
+    """Byte spans of the top-level keys and named-list entries of a kubeconfig file."""
+
+    def __init__(self, prefix_end: int = 0, newline: str = '\n'):
+        # Leading comments / document marker before the first key
+        self.prefix_end = prefix_end
+        # Line ending of the file, used for everything serialized into it
+        self.newline = newline
+        # key -> (start, value_end, end); [value_end, end) holds trailing comments
+        self.keys: Dict[str, Tuple[int, int, int]] = {}
+        self.values: Dict[str, object] = {}
+        self.sections: Dict[str, SectionLayout] = {}
+
+    def to_plain(self, model: KubeConfigModel) -> Dict:
+        """Return a marshal-friendly form; entries are listed in model order."""
+        sections = {}
+        for key, section in self.sections.items():
+            spans = [section.spans.get(entry_id) for entry_id, _ in model.section(key).items()]
+            if None in spans:
+                continue
+            sections[key] = (section.items_start, section.indent, spans)
+        return {'prefix_end': self.prefix_end, 'newline': self.newline,
+                'keys': [(key,) + span for key, span in self.keys.items()],
+                'sections': sections}
+
+    @classmethod
+    def from_plain(cls, plain: Dict, model: KubeConfigModel) -> 'SourceLayout':
+        """Rebuild a layout stored by to_plain() and bind it to a freshly loaded model."""
+        layout = cls(plain['prefix_end'], plain['newline'])
+        document = model.to_dict()
+        for key, start, value_end, end in plain['keys']:
+            layout.keys[key] = (start, value_end, end)
+            layout.values[key] = document.get(key)
+        for key, (items_start, indent, spans) in plain['sections'].items():
+            entries = list(model.section(key).items())
+            if len(entries) != len(spans):
+                continue
+            section = SectionLayout(items_start, indent)
+            for (entry_id, entry), (start, end) in zip(entries, spans):
+                section.add(entry_id, entry, start, end)
+            layout.sections[key] = section
+        return layout
+
+
+def _line_start(text: str, index: int) -> int:
+    return text.rfind('\n', 0, index) + 1
+
+
+def _newline(text: str) -> str:
+    """Return the line ending of the first line of text."""
+    end = text.find('\n')
+    return '\r\n' if end > 0 and text[end - 1] == '\r' else '\n'
+
+
+def extract_layout(text: str, root, model: KubeConfigModel) -> Optional[SourceLayout]:
+    """Build the layout of text from its composed root node.
+
+    Returns None when the document is not a block mapping with all keys
+    at column 0, in which case saves fall back to a full rewrite.
+    """
+    if not isinstance(root, MappingNode) or root.flow_style is True:
+        return None
+    keys = []
+    for key_node, value_node in root.value:
+        if key_node.start_mark.column != 0 or not isinstance(key_node.value, str):
+            return None
+        keys.append((key_node.value, key_node.start_mark.index, value_node))
+    if not keys or len({key for key, _, _ in keys}) != len(keys):
+        return None
+
+    # Offsets found below are character offsets; collect them to convert to bytes
+    char_layout = SourceLayout(keys[0][1])
+    char_sections = {}
+    for position, (key, start, value_node) in enumerate(keys):
+        end = keys[position + 1][1] if position + 1 < len(keys) else len(text)
+        value_end = max(value_node.end_mark.index, start)
+        char_layout.keys[key] = (start, value_end, end)
+
+        if key in SECTIONS and isinstance(value_node, SequenceNode) \
+                and value_node.flow_style is not True and value_node.value:
+            item_starts = []
+            indent = None
+            for item in value_node.value:
+                item_start = _line_start(text, item.start_mark.index)
+                match = ITEM_PREFIX.match(text, item_start, item.start_mark.index)
+                if not match or (indent is not None and len(match.group(1)) != indent):
+                    item_starts = None
+                    break
+                indent = len(match.group(1))
+                item_starts.append(item_start)
+            if item_starts:
+                char_sections[key] = (indent, item_starts + [value_end])
+
+    # Map character offsets to byte offsets (identical for ASCII files)
+    encoded = text.encode('utf-8')
+    if len(encoded) == len(text):
+        to_bytes = int
+    else:
+        offsets = sorted({char_layout.prefix_end}
+                         | {offset for span in char_layout.keys.values() for offset in span}
+                         | {offset for _, starts in char_sections.values() for offset in starts})
+        mapping = {}
+        previous_char = previous_byte = 0
+        for offset in offsets:
+            previous_byte += len(text[previous_char:offset].encode('utf-8'))
+            previous_char = offset
+            mapping[offset] = previous_byte
+        to_bytes = mapping.__getitem__
+
+    layout = SourceLayout(to_bytes(char_layout.prefix_end), _newline(text))
+    document = model.to_dict()
+    for key, span in char_layout.keys.items():
+        layout.keys[key] = tuple(to_bytes(offset) for offset in span)
+        layout.values[key] = document.get(key)
+    for key, (indent, starts) in char_sections.items():
+        entries = list(model.section(key).items())
+        if len(entries) != len(starts) - 1:
+            continue
+        section = SectionLayout(to_bytes(starts[0]), indent)
+        for (entry_id, entry), start, end in zip(entries, starts, starts[1:]):
+            section.add(entry_id, entry, to_bytes(start), to_bytes(end))
+        layout.sections[key] = section
+    return layout
+
+
+class _Output:
+    """Output under construction: copied source ranges and new bytes."""
+
+    def __init__(self, source, newline: str = '\n'):
+        self.source = source
+        self.newline = newline
+        self.chunks: List = []
+        self.position = 0
+        self.copied = 0
+
+    def copy(self, start: int, end: int):
+        if end <= start:
+            return
+        last = self.chunks[-1] if self.chunks else None
+        if isinstance(last, tuple) and last[1] == start:
+            self.chunks[-1] = (last[0], end)
+        else:
+            self.chunks.append((start, end))
+        self.position += end - start
+        self.copied += end - start
+
+    def write(self, data: bytes):
+        if data:
+            self.chunks.append(data)
+            self.position += len(data)
+
+    def write_text(self, text: str):
+        """Write serialized text with the output's line ending."""
+        if self.newline != '\n':
+            text = text.replace('\n', self.newline)
+        self.write(text.encode('utf-8'))
+
+    def ends_with_newline(self) -> bool:
+        if not self.chunks:
+            return True
+        last = self.chunks[-1]
+        if isinstance(last, tuple):
+            return self.source[last[1] - 1:last[1]] == b'\n'
+        return last.endswith(b'\n')
+
+
+def _indent(text: str, indent: int) -> str:
+    if not indent:
+        return text
+    pad = ' ' * indent
+    return ''.join(pad + line if line.strip() else line for line in text.splitlines(True))
+
+
+def _emit_key(out: _Output, layout: SourceLayout, model: KubeConfigModel,
+              key: str, value, dump: Callable, indent: int = 0):
+    """Serialize one top-level key, recording its spans in layout."""
+    start = out.position
+    if key in SECTIONS and isinstance(value, list) and value:
+        out.write_text(f"{key}:\n")
+        section = SectionLayout(out.position, indent)
+        for entry_id, entry in model.section(key).items():
+            item_start = out.position
+            out.write_text(_indent(dump([entry]), indent))
+            section.add(entry_id, entry, item_start, out.position)
+        layout.sections[key] = section
+    else:
+        out.write_text(dump({key: value}))
+    layout.keys[key] = (start, out.position, out.position)
+    layout.values[key] = value
+
+
+def _unchanged(original, value) -> bool:
+    """Whether a top-level value still serializes to what was read."""
+    if original is value:
+        return True
+    if type(original) is not type(value):
+        return False
+    if isinstance(value, list):
+        return len(original) == len(value) and all(a is b or a == b for a, b in zip(original, value))
+    return original == value
+
+
+def render_full(model: KubeConfigModel, dump: Callable) -> Tuple[bytes, SourceLayout]:
+    """Serialize the whole model, sorting keys like yaml.dump, and return its layout."""
+    out = _Output(b'')
+    layout = SourceLayout()
+    document = model.to_dict()
+    for key in sorted(document):
+        _emit_key(out, layout, model, key, document[key], dump)
+    return b''.join(out.chunks), layout
+
+
+def render_splice(source, layout: SourceLayout, model: KubeConfigModel,
+                  dump: Callable) -> Tuple[List, SourceLayout, int]:
+    """Render model against the file it was loaded from.
+
+    Returns (chunks, new_layout, copied_bytes). Chunks are bytes to write
+    or (start, end) ranges to copy from source.
+    """
+    out = _Output(source, layout.newline)
+    new_layout = SourceLayout(layout.prefix_end, layout.newline)
+    document = model.to_dict()
+    out.copy(0, layout.prefix_end)
+
+    for key, (start, value_end, end) in layout.keys.items():
+        if key not in document:
+            continue
+        value = document[key]
+        section = layout.sections.get(key)
+        new_start = out.position
+
+        if section is not None and isinstance(value, list) and value:
+            if section.matches(model.section(key)):
+                # Untouched section: one copy, same spans moved along
+                out.copy(start, end)
+                new_layout.sections[key] = section.shifted(new_start - start)
+                new_layout.keys[key] = (new_start, new_start + value_end - start, out.position)
+                new_layout.values[key] = value
+                continue
+            # Header (key line and any comments), then entry by entry
+            out.copy(start, section.items_start)
+            new_section = SectionLayout(out.position, section.indent)
+            for entry_id, entry in model.section(key).items():
+                item_start = out.position
+                span = section.find(entry_id, entry)
+                if span is not None:
+                    out.copy(*span)
+                else:
+                    # The newline (if any) belongs to this item so spans stay contiguous
+                    if not out.ends_with_newline():
+                        out.write_text('\n')
+                    out.write_text(_indent(dump([entry]), section.indent))
+                new_section.add(entry_id, entry, item_start, out.position)
+            new_layout.sections[key] = new_section
+            new_value_end = out.position
+            out.copy(value_end, end)
+            new_layout.keys[key] = (new_start, new_value_end, out.position)
+            new_layout.values[key] = value
+            continue
+
+        if _unchanged(layout.values.get(key), value):
+            out.copy(start, end)
+            new_layout.keys[key] = (new_start, new_start + value_end - start, out.position)
+            new_layout.values[key] = value
+            continue
+
+        # Changed: re-serialize the key in place of its old value
+        first_chunk = len(out.chunks)
+        _emit_key(out, new_layout, model, key, value, dump)
+        gap_start = value_end
+        if end > value_end:
+            if sum(chunk.count(b'\n') for chunk in out.chunks[first_chunk:]) == 1:
+                # Single line: keep any trailing comment and line ending of the old value
+                out.chunks[-1] = out.chunks[-1][:-len(out.newline)]
+                out.position -= len(out.newline)
+            else:
+                # Multi-line: drop the rest of the old value's line
+                newline = source.find(b'\n', value_end, end)
+                gap_start = end if newline < 0 else newline + 1
+        new_value_end = out.position
+        out.copy(gap_start, end)
+        new_layout.keys[key] = (new_start, new_value_end, out.position)
+
+    for key, value in document.items():
+        if key in layout.keys:
+            continue
+        if not out.ends_with_newline():
+            out.write_text('\n')
+        _emit_key(out, new_layout, model, key, value, dump)
+
+    return out.chunks, new_layout, out.copied
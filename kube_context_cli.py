@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Command-line front-end (kcm) for scripts and terminals.
+
+Usage:
+    kcm list [--json]
+    kcm current [--json]
+    kcm switch NAME
+    kcm rename OLD NEW
+    kcm delete NAME [NAME ...]
+    kcm import PATH [PATH ...] [--workers N]
+    kcm nks-add CLUSTER_UUID REGION [--alias NAME] [--authenticator PATH]
+    eval "$(kcm session start [CONTEXT] [--namespace NS])"
+    kcm session switch CONTEXT [--namespace NS]
+    eval "$(kcm session end)"
+    kcm session gc
+    kcm daemon [--socket PATH]
+
+`session start` gives the calling shell its own current context: it
+prints the exports that put a session overlay (see kube_config_sessions)
+in front of the shared config. Switching in that shell, with
+`session switch` or plain `switch`, then only rewrites the overlay.
+
+Every command also takes --config PATH and --json. With --json the result,
+or {"ok": false, "error": ...}, is the only thing written to stdout.
+
+`daemon` keeps the parsed config in memory and serves it on a Unix socket
+(see kube_config_daemon). While it runs, list, switch, rename, delete and
+import are sent to it and never load YAML here; --direct, or a daemon
+serving other files, makes them work on the files themselves.
+
+run.py hands its arguments to main() when the first one is a command, so
+the GUI entry point doubles as the CLI. Nothing here imports Qt, and
+kube_config_manager is only imported once the arguments are parsed:
+--help and usage errors return without loading YAML at all, and
+`current` reads the current-context line without parsing the file (see
+kube_config_current), fast enough for a shell prompt.
+"""
+
+import argparse
+import json
+import os
+import shlex
+import sys
+from contextlib import redirect_stdout
+from typing import Dict, List, Tuple
+
+from kube_config_current import read_current_context
+
+COMMANDS = ('list', 'current', 'switch', 'rename', 'delete', 'import', 'nks-add', 'session', 'daemon')
+# Commands that do without a KubeConfigManager (and its imports)
+LIGHT_COMMANDS = ('current',)
+# Commands sent to the daemon when it is running
+DAEMON_COMMANDS = ('list', 'switch', 'rename', 'delete', 'import')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--config', help='kubeconfig file (default: KUBECONFIG or ~/.kube/config)')
+    common.add_argument('--json', action='store_true', help='print the result as JSON')
+    common.add_argument('--direct', action='store_true', help='work on the files even if the daemon is running')
+
+    parser = argparse.ArgumentParser(prog='kcm', description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True, metavar='command')
+    commands.add_parser('list', parents=[common], help='list contexts')
+    commands.add_parser('current', parents=[common], help='print the current context')
+    command = commands.add_parser('switch', parents=[common], help='switch the current context')
+    command.add_argument('name')
+    command = commands.add_parser('rename', parents=[common], help='rename a context')
+    command.add_argument('old_name')
+    command.add_argument('new_name')
+    command = commands.add_parser('delete', parents=[common],
+                                  help='delete contexts and the clusters and users only they use')
+    command.add_argument('names', nargs='+', metavar='name')
+    command = commands.add_parser('import', parents=[common],
+                                  help='import kubeconfig files, directories and tar/zip archives')
+    command.add_argument('paths', nargs='+', metavar='path')
+    command.add_argument('--workers', type=int, help='parser processes (default: one per CPU)')
+    command = commands.add_parser('nks-add', parents=[common], help='add an NKS cluster with ncp-iam-authenticator')
+    command.add_argument('cluster_uuid')
+    command.add_argument('region')
+    command.add_argument('--alias', help='context name (default: the authenticator\'s)')
+    command.add_argument('--authenticator', help='ncp-iam-authenticator path')
+    command = commands.add_parser('session', help='give this terminal its own current context')
+    actions = command.add_subparsers(dest='action', required=True, metavar='action')
+    session = argparse.ArgumentParser(add_help=False, parents=[common])
+    session.add_argument('--id', dest='session_id', help='session id (default: $KCM_SESSION, else the shell\'s pid)')
+    action = actions.add_parser('start', parents=[session], help='print the exports that start a session')
+    action.add_argument('name', nargs='?', help='context to start at (default: the current one)')
+    action.add_argument('--namespace', help='namespace to use for the context in this session')
+    action = actions.add_parser('switch', parents=[session], help='switch the context of this session')
+    action.add_argument('name')
+    action.add_argument('--namespace', help='namespace to use for the context in this session')
+    actions.add_parser('end', parents=[session], help='print the exports that end this session')
+    actions.add_parser('gc', parents=[common], help='remove the overlays of sessions that are gone')
+    command = commands.add_parser('daemon', parents=[common], help='serve the config from memory until stopped')
+    command.add_argument('--socket', help='socket path (default: $KCM_DAEMON_SOCKET)')
+    return parser
+
+
+def run_list(manager, args) -> Tuple[Dict, str]:
+    contexts, current = manager.get_context_listing()
+    rows = []
+    for context in contexts:
+        body = context.get('context') or {}
+        rows.append({'name': context.get('name'), 'cluster': body.get('cluster', '') or '',
+                     'user': body.get('user', '') or '',
+                     'namespace': body.get('namespace', 'default') or 'default',
+                     'current': context.get('name') == current})
+    return {'ok': True, 'current': current, 'contexts': rows}, format_table(rows)
+
+
+def format_table(rows: List[Dict]) -> str:
+    """Lay rows out in aligned columns, like kubectl config get-contexts."""
+    columns = ('name', 'cluster', 'user', 'namespace')
+    widths = [max([len(column)] + [len(str(row[column])) for row in rows]) for column in columns]
+    lines = ['CURRENT   ' + '   '.join(column.upper().ljust(width) for column, width in zip(columns, widths))]
+    for row in rows:
+        lines.append(('*' if row['current'] else ' ').ljust(10) +
+                     '   '.join(str(row[column]).ljust(width) for column, width in zip(columns, widths)))
+    return '\n'.join(line.rstrip() for line in lines)
+
+
+def run_current(manager, args) -> Tuple[Dict, str]:
+    # Scans the files for the current-context line; YAML is only loaded for unusual files
+    current = read_current_context([args.config] if args.config else None)
+    if not current:
+        raise ValueError("current-context is not set")
+    return {'ok': True, 'current': current}, current
+
+
+def run_switch(manager, args) -> Tuple[Dict, str]:
+    manager.set_current_context(args.name)
+    return {'ok': True, 'current': args.name}, f"Switched to context '{args.name}'."
+
+
+def run_rename(manager, args) -> Tuple[Dict, str]:
+    success, message = manager.rename_context(args.old_name, args.new_name)
+    if not success:
+        raise ValueError(message)
+    return {'ok': True, 'old_name': args.old_name, 'new_name': args.new_name}, message
+
+
+def run_delete(manager, args) -> Tuple[Dict, str]:
+    # One load and one write for all names; nothing is deleted if any is missing
+    with manager.batch() as tx:
+        for name in args.names:
+            tx.delete_context(name)
+    return {'ok': True, 'deleted': args.names}, '\n'.join(f"Deleted context '{name}'." for name in args.names)
+
+
+def run_import(manager, args) -> Tuple[Dict, str]:
+    success, reports = manager.import_contexts(args.paths, args.workers)
+    if not success:
+        raise ValueError("Import failed; nothing was written")
+    lines = []
+    for report in reports:
+        if report['error']:
+            lines.append(f"{report['source']}: {report['error']}")
+        else:
+            lines.append(f"{report['source']}: {len(report['added']['contexts'])} contexts added, "
+                         f"{len(report['skipped']['contexts'])} already present, "
+                         f"{sum(len(names) for names in report['conflicts'].values())} conflicts")
+    return {'ok': all(report['error'] is None for report in reports), 'reports': reports}, '\n'.join(lines)
+
+
+def run_nks_add(manager, args) -> Tuple[Dict, str]:
+    success, message = manager.add_nks_context(args.cluster_uuid, args.region, args.alias, args.authenticator)
+    if not success:
+        raise ValueError(message)
+    return {'ok': True, 'context': args.alias or args.cluster_uuid, 'message': message}, message
+
+
+def run_session(manager, args) -> Tuple[Dict, str]:
+    from kube_config_sessions import SESSION_ENV, current_session_id
+
+    session_id = getattr(args, 'session_id', None) or current_session_id()
+    if args.action == 'gc':
+        removed = manager.collect_sessions()
+        return {'ok': True, 'removed': removed}, f"Removed {len(removed)} session overlays."
+    if args.action == 'switch':
+        success, message = manager.set_session_context(args.name, args.namespace, session_id)
+        if not success:
+            raise ValueError(message)
+        return {'ok': True, 'session': session_id, 'current': args.name, 'namespace': args.namespace}, message
+    if args.action == 'start':
+        success, value = manager.start_session(session_id, args.name, args.namespace)
+        exports = [f"export KUBECONFIG={shlex.quote(value)}", f"export {SESSION_ENV}={shlex.quote(session_id)}"]
+    else:
+        success, value = manager.end_session(session_id)
+        exports = [f"export KUBECONFIG={shlex.quote(value)}", f"unset {SESSION_ENV}"]
+    if not success:
+        raise ValueError(value)
+    # Shell code for eval
+    return {'ok': True, 'session': session_id, 'kubeconfig': value}, '\n'.join(exports)
+
+
+def run_daemon(manager, args) -> Tuple[Dict, str]:
+    from kube_config_daemon import serve
+
+    # Runs in the foreground until stopped
+    serve(manager, args.socket)
+    return {'ok': True}, ''
+
+
+# command -> handler(manager, args) returning (JSON result, text output)
+HANDLERS = {'list': run_list, 'current': run_current, 'switch': run_switch, 'rename': run_rename,
+            'delete': run_delete, 'import': run_import, 'nks-add': run_nks_add, 'session': run_session,
+            'daemon': run_daemon}
+
+
+def open_manager(args):
+    """Return the daemon's DaemonManager for commands it serves, if it is running, else a KubeConfigManager."""
+    def direct():
+        from kube_config_manager import KubeConfigManager
+        return KubeConfigManager(args.config, create=args.command != 'list')
+
+    if args.command in DAEMON_COMMANDS and not args.direct:
+        from kube_config_daemon import DaemonManager, connect
+        client = connect([args.config] if args.config else None)
+        if client is not None:
+            return DaemonManager(client, direct)
+    return direct()
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        # The manager reports some problems with print(); keep stdout for results
+        with redirect_stdout(sys.stderr):
+            if args.config:
+                args.config = os.path.abspath(args.config)
+            manager = open_manager(args) if args.command not in LIGHT_COMMANDS else None
+            result, text = HANDLERS[args.command](manager, args)
+    except (ValueError, OSError) as e:
+        if args.json:
+            print(json.dumps({'ok': False, 'error': str(e)}))
+        else:
+            print(f"Error: {e}", file=sys.stderr)
+        return 1
+    if args.json:
+        print(json.dumps(result, indent=2))
+    elif text:
+        print(text)
+    return 0 if result['ok'] else 1
+
+
+if __name__ == "__main__":
+    # The kcm binary is frozen too; see run.py. Imported here to keep startup light
+    import multiprocessing
+    multiprocessing.freeze_support()
+    sys.exit(main())
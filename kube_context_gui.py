@@ -3,7 +3,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import os
+from kube_config_daemon import through_daemon
 from kube_config_manager import KubeConfigManager
+from kube_config_watch import POLL_INTERVAL, ConfigWatcher, Debouncer
 
 
 class KubeContextGUI:
@@ -15,6 +17,10 @@ class KubeContextGUI:
         
         # Initialize the config manager
         self.config_manager = KubeConfigManager()
+        # Listing, switch and delete go through the daemon while it runs
+        self.config_store = through_daemon(self.config_manager)
+        # Context name -> (mark, values) of the rows in the treeview
+        self.context_rows = {}
         
         # Configure style
         self.setup_styles()
@@ -24,6 +30,38 @@ class KubeContextGUI:
         
         # Load initial data
         self.root.after(100, self.refresh_contexts)
+        self.start_watching()
+    
+    def start_watching(self):
+        """Reload the list when other programs change the config."""
+        self.config_watcher = ConfigWatcher(self.config_store)
+        self.watch_debouncer = Debouncer()
+        self.watch_timer = None
+        fd = self.config_watcher.fileno()
+        if fd is not None and hasattr(self.root.tk, 'createfilehandler'):
+            self.root.tk.createfilehandler(fd, tk.READABLE, self.on_watch_event)
+        else:
+            self.root.after(int(POLL_INTERVAL * 1000), self.poll_config)
+    
+    def on_watch_event(self, fd, mask):
+        """Collect inotify events; the check runs once the burst settles."""
+        if self.config_watcher.read_events():
+            if self.watch_timer is not None:
+                self.root.after_cancel(self.watch_timer)
+            self.watch_timer = self.root.after(int(self.watch_debouncer.delay() * 1000),
+                                               self.check_config_changed)
+    
+    def check_config_changed(self):
+        """Refresh if the config differs from what we last read or wrote (our own saves do not)."""
+        self.watch_timer = None
+        self.watch_debouncer.reset()
+        if self.config_watcher.changed():
+            self.status_var.set("Config changed on disk, reloading...")
+            self.refresh_contexts()
+    
+    def poll_config(self):
+        self.check_config_changed()
+        self.root.after(int(POLL_INTERVAL * 1000), self.poll_config)
     
     def setup_styles(self):
         """Setup custom styles for the application."""
@@ -196,7 +234,7 @@ class KubeContextGUI:
         status_label.grid(row=0, column=0, sticky=tk.W)
         
         # Config file path
-        config_path = self.config_manager.config_path
+        config_path = os.pathsep.join(self.config_manager.config_paths)
         path_label = ttk.Label(status_frame, text=f"Config: {config_path}",
                               font=('Arial', 9),
                               foreground='#888888')
@@ -208,16 +246,11 @@ class KubeContextGUI:
             print("DEBUG: Starting refresh_contexts()")
             self.status_var.set("Loading contexts...")
             
-            # Clear existing items
-            for item in self.context_tree.get_children():
-                self.context_tree.delete(item)
-            
             # Get contexts
             print(f"DEBUG: Config path: {self.config_manager.config_path}")
             print(f"DEBUG: Config file exists: {os.path.exists(self.config_manager.config_path)}")
             
-            contexts = self.config_manager.get_contexts()
-            current_context = self.config_manager.get_current_context()
+            contexts, current_context = self.config_store.get_context_listing()
             
             print(f"DEBUG: Found {len(contexts)} contexts")
             print(f"DEBUG: Current context: {current_context}")
@@ -228,22 +261,7 @@ class KubeContextGUI:
             else:
                 self.current_context_var.set("None")
             
-            # Populate treeview
-            for context in contexts:
-                name = context['name']
-                cluster = context['context'].get('cluster', '')
-                user = context['context'].get('user', '')
-                namespace = context['context'].get('namespace', 'default')
-                
-                print(f"DEBUG: Adding context: {name}")
-                
-                # Mark current context with indicator
-                if name == current_context:
-                    self.context_tree.insert('', 'end', text='★',
-                                           values=(name, cluster, user, namespace))
-                else:
-                    self.context_tree.insert('', 'end', text='',
-                                           values=(name, cluster, user, namespace))
+            self.update_context_rows(contexts, current_context)
             
             self.status_var.set(f"Loaded {len(contexts)} contexts")
             print("DEBUG: refresh_contexts() completed successfully")
@@ -259,6 +277,41 @@ class KubeContextGUI:
             messagebox.showerror("Error", f"Failed to load contexts:\n{str(e)}")
             self.status_var.set("Error loading contexts")
     
+    def update_context_rows(self, contexts, current_context):
+        """Bring the treeview in line with a listing, touching only the rows that changed.
+        
+        Rows are keyed by context name (their item id), so the selection and
+        scroll position survive a refresh.
+        """
+        rows = {}
+        for context in contexts:
+            name = context['name']
+            if name in rows:
+                continue
+            body = context.get('context') or {}
+            # Mark current context with indicator
+            rows[name] = ('★' if name == current_context else '',
+                          (name, body.get('cluster', ''), body.get('user', ''),
+                           body.get('namespace', 'default')))
+        
+        gone = [name for name in self.context_rows if name not in rows]
+        if gone:
+            self.context_tree.delete(*gone)
+        for name, (mark, values) in rows.items():
+            old = self.context_rows.get(name)
+            if old is None:
+                print(f"DEBUG: Adding context: {name}")
+                self.context_tree.insert('', 'end', iid=name, text=mark, values=values)
+            elif old != (mark, values):
+                self.context_tree.item(name, text=mark, values=values)
+        
+        # Follow the file order
+        order = list(rows)
+        if list(self.context_tree.get_children()) != order:
+            for index, name in enumerate(order):
+                self.context_tree.move(name, '', index)
+        self.context_rows = rows
+    
     def on_context_select(self, event):
         """Handle context selection."""
         selection = self.context_tree.selection()
@@ -281,10 +334,10 @@ class KubeContextGUI:
             return
         
         try:
-            item = selection[0]
-            context_name = self.context_tree.item(item, 'values')[0]
+            # Rows are keyed by context name
+            context_name = selection[0]
             
-            self.config_manager.set_current_context(context_name)
+            self.config_store.set_current_context(context_name)
             self.refresh_contexts()
             
             messagebox.showinfo("Success", f"Switched to context: {context_name}")
@@ -325,8 +378,7 @@ class KubeContextGUI:
             messagebox.showwarning("Warning", "Please select a context to delete.")
             return
         
-        item = selection[0]
-        context_name = self.context_tree.item(item, 'values')[0]
+        context_name = selection[0]
         
         # Confirm deletion
         result = messagebox.askyesno("Confirm Deletion", 
@@ -335,7 +387,7 @@ class KubeContextGUI:
         
         if result:
             try:
-                success = self.config_manager.delete_context(context_name)
+                success = self.config_store.delete_context(context_name)
                 
                 if success:
                     self.refresh_contexts()
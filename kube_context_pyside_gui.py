@@ -9,8 +9,8 @@ from PySide6.QtWidgets import (
     QGridLayout,
     QLabel,
     QPushButton,
-    QTreeWidget,
-    QTreeWidgetItem,
+    QTableView,
+    QAbstractItemView,
     QGroupBox,
     QMessageBox,
     QFileDialog,
@@ -23,9 +23,17 @@ from PySide6.QtWidgets import (
     QDialogButtonBox
 )
 from PySide6.QtCore import Qt, QSize, QTimer
-from PySide6.QtGui import QFont
+from PySide6.QtGui import QFont, QKeySequence, QShortcut
 
+from kube_config_import import summarize
+from kube_config_daemon import through_daemon
 from kube_config_manager import KubeConfigManager
+from kube_config_search import ContextIndex, RecentContexts
+from kube_context_pyside_nks import NksAddJob, NksProgressDialog
+from kube_context_pyside_palette import QuickSwitchDialog
+from kube_context_pyside_table import NAME_ROLE, ContextSortProxy, ContextTableModel
+from kube_context_pyside_watch import ConfigFileWatcher
+from kube_context_pyside_workers import ConfigWorker
 
 class KubeContextGUI(QMainWindow):
     def __init__(self):
@@ -36,6 +44,23 @@ class KubeContextGUI(QMainWindow):
 
         # Initialize the config manager
         self.config_manager = KubeConfigManager()
+        # Listing, switch, rename, delete and import go through the daemon while it runs
+        self.config_store = through_daemon(self.config_manager)
+        # Config reads and writes run here, off the GUI thread
+        self.worker = ConfigWorker(self)
+        self.worker.busy_changed.connect(self.on_worker_busy)
+        # Original text of buttons showing a busy state
+        self.busy_buttons = {}
+        # NKS adds still running, and how many of the finished ones succeeded
+        self.nks_jobs = set()
+        self.nks_added = 0
+        # Reloads the list when other programs change the config
+        self.config_watcher = ConfigFileWatcher(self.config_store, self.worker, self)
+        self.config_watcher.changed.connect(self.on_config_changed)
+        # Search index, updated with every listing read, and recently used contexts
+        self.search_index = ContextIndex()
+        self.recent_contexts = RecentContexts(os.path.join(
+            self.config_manager.config_dir, f".{os.path.basename(self.config_manager.config_path)}.kcm-recent"))
 
         # Create main UI
         self.create_widgets()
@@ -43,12 +68,16 @@ class KubeContextGUI(QMainWindow):
         # Connect signals to slots
         self.refresh_btn.clicked.connect(self.refresh_contexts)
         self.import_btn.clicked.connect(self.import_context)
+        self.import_dir_btn.clicked.connect(self.import_folder)
         self.add_nks_btn.clicked.connect(self.add_nks_context_dialog) # Connect new button
         self.rename_btn.clicked.connect(self.rename_context_dialog) # Connect new button
         self.delete_btn.clicked.connect(self.delete_context)
         self.switch_btn.clicked.connect(self.switch_context)
-        self.context_tree.itemSelectionChanged.connect(self.on_context_select)
-        self.context_tree.itemDoubleClicked.connect(self.switch_context)
+        self.context_tree.selectionModel().selectionChanged.connect(self.on_context_select)
+        self.context_tree.doubleClicked.connect(self.switch_context)
+        self.search_edit.textChanged.connect(lambda: self.search_timer.start())
+        QShortcut(QKeySequence("Ctrl+K"), self, self.open_quick_switch)
+        QShortcut(QKeySequence.Find, self, self.search_edit.setFocus)
 
         # Load initial data
         self.refresh_contexts()
@@ -92,13 +121,38 @@ class KubeContextGUI(QMainWindow):
         """Create the context list panel."""
         context_groupbox = QGroupBox("Contexts")
         layout = QVBoxLayout(context_groupbox)
+
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Filter contexts (Ctrl+F), quick switch with Ctrl+K")
+        self.search_edit.setClearButtonEnabled(True)
+        layout.addWidget(self.search_edit)
+        # Filtering re-checks every row of the table, so wait for a pause in typing
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.apply_search)
         
-        # Create treeview for contexts
-        self.context_tree = QTreeWidget()
-        self.context_tree.setColumnCount(4)
-        self.context_tree.setHeaderLabels(['Context Name', 'Cluster', 'User', 'Namespace'])
-        self.context_tree.header().setSectionResizeMode(QHeaderView.ResizeToContents)
-        self.context_tree.header().setStretchLastSection(False)
+        # Create table view for contexts; refreshes update the model in place
+        self.context_model = ContextTableModel(self)
+        self.context_proxy = ContextSortProxy(self)
+        self.context_proxy.setSourceModel(self.context_model)
+        self.context_tree = QTableView()
+        self.context_tree.setModel(self.context_proxy)
+        self.context_tree.setShowGrid(False)
+        self.context_tree.setWordWrap(False)
+        # Uniform row heights: no per-row size queries, whatever the row count
+        self.context_tree.verticalHeader().hide()
+        self.context_tree.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.context_tree.verticalHeader().setDefaultSectionSize(self.fontMetrics().height() + 8)
+        self.context_tree.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.context_tree.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.context_tree.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        # Unsorted (file order) until a header is clicked
+        self.context_tree.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.context_tree.setSortingEnabled(True)
+        self.context_tree.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.context_tree.horizontalHeader().setStretchLastSection(True)
+        self.context_tree.horizontalHeader().resizeSection(0, 220)
 
         layout.addWidget(self.context_tree)
         parent_layout.addWidget(context_groupbox)
@@ -118,7 +172,8 @@ class KubeContextGUI(QMainWindow):
 
         # Action buttons
         self.switch_btn = QPushButton("Switch to Selected Context")
-        self.import_btn = QPushButton("Import Context from File")
+        self.import_btn = QPushButton("Import Contexts from Files")
+        self.import_dir_btn = QPushButton("Import Contexts from Folder")
         self.add_nks_btn = QPushButton("Add NKS Context") # New button
         self.rename_btn = QPushButton("Rename Selected Context") # New button
         self.delete_btn = QPushButton("Delete Selected Context")
@@ -126,6 +181,7 @@ class KubeContextGUI(QMainWindow):
 
         layout.addWidget(self.switch_btn)
         layout.addWidget(self.import_btn)
+        layout.addWidget(self.import_dir_btn)
         layout.addWidget(self.add_nks_btn) # Add new button to layout
         layout.addWidget(self.rename_btn)
         layout.addWidget(self.delete_btn)
@@ -141,99 +197,157 @@ class KubeContextGUI(QMainWindow):
         self.status_bar.showMessage("Ready")
 
     def refresh_contexts(self):
-        """Refresh the context list."""
-        try:
-            self.status_bar.showMessage("Loading contexts...")
-            self.context_tree.clear()
-
-            contexts = self.config_manager.get_contexts()
-            current_context = self.config_manager.get_current_context()
-
-            if current_context:
-                self.current_context_label.setText(f"Current: {current_context}")
-            else:
-                self.current_context_label.setText("Current: None")
-
-            for context in contexts:
-                name = context['name']
-                cluster = context['context'].get('cluster', '')
-                user = context['context'].get('user', '')
-                namespace = context['context'].get('namespace', 'default')
-                
-                item = QTreeWidgetItem([name, cluster, user, namespace])
-                if name == current_context:
-                    font = item.font(0)
-                    font.setBold(True)
-                    item.setFont(0, font)
-                    item.setText(0, f"★ {name}") # Add star indicator
-                
-                self.context_tree.addTopLevelItem(item)
-
-            self.status_bar.showMessage(f"Loaded {len(contexts)} contexts")
-
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load contexts:\n{str(e)}")
-            self.status_bar.showMessage("Error loading contexts")
+        """Reload the context list in the background; a newer refresh replaces a pending one."""
+        self.status_bar.showMessage("Loading contexts...")
+        self.worker.read('listing', self.load_listing, self.show_contexts, self.on_refresh_error)
+
+    def load_listing(self):
+        """Read the listing and bring the search index up to date (runs on the worker)."""
+        listing = self.config_store.get_context_listing()
+        self.search_index.update(listing[0])
+        return listing
+
+    def show_contexts(self, listing):
+        """Fill the context list from a (contexts, current context) listing."""
+        contexts, current_context = listing
+
+        if current_context:
+            self.current_context_label.setText(f"Current: {current_context}")
+        else:
+            self.current_context_label.setText("Current: None")
+
+        self.context_model.set_listing(contexts, current_context)
+        if self.search_edit.text().strip():
+            self.apply_search()
+        self.status_bar.showMessage(f"Loaded {len(contexts)} contexts")
+
+    def apply_search(self):
+        """Show only the contexts matching the search box."""
+        text = self.search_edit.text().strip()
+        self.context_proxy.set_filter_names(self.search_index.matches(text) if text else None)
+
+    def open_quick_switch(self):
+        """Ctrl+K: pick a context by typing and switch to it."""
+        dialog = QuickSwitchDialog(self.search_index, self.recent_contexts.names, self)
+        if dialog.exec() == QDialog.Accepted:
+            self.switch_to(dialog.selected_name())
+
+    def on_refresh_error(self, message):
+        QMessageBox.critical(self, "Error", f"Failed to load contexts:\n{message}")
+        self.status_bar.showMessage("Error loading contexts")
+
+    def on_config_changed(self):
+        """Pick up a change another program made to the config, without dialogs."""
+        self.status_bar.showMessage("Config changed on disk, reloading...")
+        self.worker.read('listing', self.load_listing, self.show_contexts,
+                         lambda message: self.status_bar.showMessage(f"Could not reload the config: {message}"))
+
+    def run_write(self, button, busy_text, fn, on_result, on_error):
+        """Run a config write in the background, showing button as busy until the queue drains."""
+        if button is not None and button not in self.busy_buttons:
+            self.busy_buttons[button] = button.text()
+            button.setText(busy_text)
+        self.worker.write(fn, on_result, on_error)
+
+    def on_worker_busy(self, busy):
+        """Disable the buttons that write while background work is queued."""
+        for button in (self.switch_btn, self.import_btn, self.import_dir_btn, self.rename_btn,
+                       self.delete_btn):
+            button.setEnabled(not busy)
+        if busy:
+            self.setCursor(Qt.BusyCursor)
+            return
+        self.unsetCursor()
+        for button, text in self.busy_buttons.items():
+            button.setText(text)
+        self.busy_buttons = {}
+        self.on_context_select()
 
     def on_context_select(self):
         """Handle context selection to enable/disable buttons."""
-        is_selected = bool(self.context_tree.selectedItems())
+        is_selected = bool(self.selected_context_name()) and not self.worker.is_busy()
         self.switch_btn.setEnabled(is_selected)
         self.delete_btn.setEnabled(is_selected)
 
+    def selected_context_name(self):
+        """Return the name of the selected context, or None."""
+        rows = self.context_tree.selectionModel().selectedRows()
+        return rows[0].data(NAME_ROLE) if rows else None
+
     def switch_context(self):
         """Switch to the selected context."""
-        selected_items = self.context_tree.selectedItems()
-        if not selected_items:
+        context_name = self.selected_context_name()
+        if not context_name:
             QMessageBox.warning(self, "Warning", "Please select a context to switch to.")
             return
-        
-        try:
-            # The name might have a star, so we get the original name from the data
-            context_name = selected_items[0].text(0).replace('★ ', '')
-            self.config_manager.set_current_context(context_name)
+        self.switch_to(context_name)
+
+    def switch_to(self, context_name):
+        """Make context_name the current context in the background."""
+        def switched(_):
+            self.recent_contexts.use(context_name)
             self.refresh_contexts()
             QTimer.singleShot(10, lambda: QMessageBox.information(self, "Success", f"Switched to context: {context_name}"))
             self.status_bar.showMessage(f"Switched to context: {context_name}")
-        except Exception as e:
-            QTimer.singleShot(10, lambda: QMessageBox.critical(self, "Error", f"Failed to switch context:\n{str(e)}"))
+
+        def failed(message):
+            QTimer.singleShot(10, lambda: QMessageBox.critical(self, "Error", f"Failed to switch context:\n{message}"))
             self.status_bar.showMessage("Error switching context")
 
+        self.status_bar.showMessage(f"Switching to context: {context_name}...")
+        self.run_write(self.switch_btn, "Switching...",
+                       lambda: self.config_store.set_current_context(context_name), switched, failed)
+
     def import_context(self):
-        """Import context from a file."""
-        file_path, _ = QFileDialog.getOpenFileName(
-            self, "Select Kubeconfig File", "", "YAML files (*.yaml *.yml);;All files (*.*)"
+        """Import contexts from kubeconfig files or tar/zip archives."""
+        file_paths, _ = QFileDialog.getOpenFileNames(
+            self, "Select Kubeconfig Files or Archives", "",
+            "Kubeconfig files (*.yaml *.yml *.tar *.tar.gz *.tgz *.zip);;All files (*.*)"
         )
-        if file_path:
-            try:
-                self.status_bar.showMessage("Importing context...")
-                success = self.config_manager.add_context_from_file(file_path)
-                if success:
-                    self.refresh_contexts()
-                    QTimer.singleShot(10, lambda: QMessageBox.information(self, "Success", "Context imported successfully!"))
-                    self.status_bar.showMessage("Context imported successfully")
-                else:
-                    QTimer.singleShot(10, lambda: QMessageBox.critical(self, "Error", "Failed to import context from file."))
-                    self.status_bar.showMessage("Failed to import context")
-            except Exception as e:
-                QTimer.singleShot(10, lambda: QMessageBox.critical(self, "Error", f"Failed to import context:\n{str(e)}"))
-                self.status_bar.showMessage("Error importing context")
+        if file_paths:
+            self.import_paths(file_paths)
+
+    def import_folder(self):
+        """Import every kubeconfig file in a folder."""
+        folder = QFileDialog.getExistingDirectory(self, "Select Folder with Kubeconfig Files")
+        if folder:
+            self.import_paths([folder])
+
+    def import_paths(self, paths):
+        """Import the given files, folders and archives with one save and show the report."""
+        def imported(result):
+            success, reports = result
+            if success:
+                self.refresh_contexts()
+                added = sum(len(report['added']['contexts']) for report in reports)
+                summary = summarize(reports)
+                QTimer.singleShot(10, lambda: QMessageBox.information(
+                    self, "Import Finished", f"Imported {added} contexts.\n\n{summary}"))
+                self.status_bar.showMessage(f"Imported {added} contexts")
+            else:
+                QTimer.singleShot(10, lambda: QMessageBox.critical(self, "Error", "Failed to import contexts."))
+                self.status_bar.showMessage("Failed to import contexts")
+
+        def failed(message):
+            QTimer.singleShot(10, lambda: QMessageBox.critical(self, "Error", f"Failed to import contexts:\n{message}"))
+            self.status_bar.showMessage("Error importing contexts")
+
+        self.status_bar.showMessage("Importing contexts...")
+        self.run_write(self.import_btn, "Importing...",
+                       lambda: self.config_store.import_contexts(paths), imported, failed)
 
     def delete_context(self):
         """Delete the selected context."""
-        selected_items = self.context_tree.selectedItems()
-        if not selected_items:
+        context_name = self.selected_context_name()
+        if not context_name:
             QMessageBox.warning(self, "Warning", "Please select a context to delete.")
             return
-
-        context_name = selected_items[0].text(0).replace('★ ', '')
         reply = QMessageBox.question(self, 'Confirm Deletion',
             f"Are you sure you want to delete context '{context_name}'?\n\nThis will also remove associated cluster and user if they are not used by other contexts.",
             QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
 
         if reply == QMessageBox.Yes:
-            try:
-                success = self.config_manager.delete_context(context_name)
+            def deleted(success):
                 if success:
                     self.refresh_contexts()
                     QTimer.singleShot(10, lambda: QMessageBox.information(self, "Success", f"Context '{context_name}' deleted successfully!"))
@@ -241,10 +355,14 @@ class KubeContextGUI(QMainWindow):
                 else:
                     QTimer.singleShot(10, lambda: QMessageBox.critical(self, "Error", f"Failed to delete context '{context_name}'."))
                     self.status_bar.showMessage("Error deleting context")
-            except Exception as e:
-                QTimer.singleShot(10, lambda: QMessageBox.critical(self, "Error", f"Failed to delete context:\n{str(e)}"))
+
+            def failed(message):
+                QTimer.singleShot(10, lambda: QMessageBox.critical(self, "Error", f"Failed to delete context:\n{message}"))
                 self.status_bar.showMessage("Error deleting context")
 
+            self.run_write(self.delete_btn, "Deleting...",
+                           lambda: self.config_store.delete_context(context_name), deleted, failed)
+
     def add_nks_context_dialog(self):
         """Show a dialog to get NKS cluster info and add context."""
         # Using a custom dialog for better layout
@@ -277,33 +395,35 @@ class KubeContextGUI(QMainWindow):
                 QMessageBox.warning(self, "Input Error", "Cluster UUID and Region are required.")
                 return
 
-            try:
-                self.status_bar.showMessage(f"Adding NKS context for {cluster_uuid}...")
-                # Use the default authenticator path logic within KubeConfigManager
-                success, message = self.config_manager.add_nks_context(
-                    cluster_uuid, region, alias=alias
-                )
-                
-                if success:
-                    self.refresh_contexts()
-                    QTimer.singleShot(10, lambda: QMessageBox.information(self, "Success", message))
-                    self.status_bar.showMessage(f"NKS context for {cluster_uuid} added/updated.")
-                else:
-                    QTimer.singleShot(10, lambda: QMessageBox.critical(self, "Error", f"Failed to add NKS context:\n{message}"))
-                    self.status_bar.showMessage("Error adding NKS context.")
-            except Exception as e:
-                QTimer.singleShot(10, lambda: QMessageBox.critical(self, "Error", f"An unexpected error occurred:\n{str(e)}"))
-                self.status_bar.showMessage("Unexpected error adding NKS context.")
+            # Runs in the background; several adds may be in flight at once
+            job = NksAddJob(self.config_manager, cluster_uuid, region, alias, worker=self.worker)
+            progress = NksProgressDialog(job, self)
+            job.finished.connect(lambda success, message: self.on_nks_job_finished(job, success))
+            self.nks_jobs.add(job)
+            progress.show()
+            job.start()
+            self.status_bar.showMessage(f"Adding {len(self.nks_jobs)} NKS context(s)...")
+
+    def on_nks_job_finished(self, job, success):
+        """Refresh the list once the last running NKS add has finished."""
+        self.nks_jobs.discard(job)
+        if success:
+            self.nks_added += 1
+        if self.nks_jobs:
+            self.status_bar.showMessage(f"Adding {len(self.nks_jobs)} NKS context(s)...")
+            return
+        if self.nks_added:
+            self.refresh_contexts()
+        self.status_bar.showMessage(f"Finished adding NKS contexts ({self.nks_added} succeeded).")
+        self.nks_added = 0
 
     def rename_context_dialog(self):
         """Show a dialog to get a new name for the selected context and rename it."""
-        selected_items = self.context_tree.selectedItems()
-        if not selected_items:
+        old_name = self.selected_context_name()
+        if not old_name:
             QMessageBox.warning(self, "No Context Selected", "Please select a context to rename.")
             return
 
-        old_name = selected_items[0].text(0).replace('★ ', '') # Remove current context indicator
-
         new_name, ok = QInputDialog.getText(self, "Rename Context", 
                                             f"Enter new name for '{old_name}':", 
                                             QLineEdit.Normal, old_name)
@@ -314,10 +434,8 @@ class KubeContextGUI(QMainWindow):
                 QMessageBox.information(self, "No Change", "The new name is the same as the old name.")
                 return
             
-            try:
-                self.status_bar.showMessage(f"Renaming context '{old_name}' to '{new_name}'...")
-                success, message = self.config_manager.rename_context(old_name, new_name)
-                
+            def renamed(result):
+                success, message = result
                 if success:
                     self.refresh_contexts()
                     QTimer.singleShot(10, lambda: QMessageBox.information(self, "Success", message))
@@ -325,12 +443,22 @@ class KubeContextGUI(QMainWindow):
                 else:
                     QTimer.singleShot(10, lambda: QMessageBox.critical(self, "Error", f"Failed to rename context:\n{message}"))
                     self.status_bar.showMessage(f"Error renaming context '{old_name}'.")
-            except Exception as e:
-                QTimer.singleShot(10, lambda: QMessageBox.critical(self, "Error", f"An unexpected error occurred while renaming:\n{str(e)}"))
+
+            def failed(message):
+                QTimer.singleShot(10, lambda: QMessageBox.critical(self, "Error", f"An unexpected error occurred while renaming:\n{message}"))
                 self.status_bar.showMessage("Unexpected error renaming context.")
+
+            self.status_bar.showMessage(f"Renaming context '{old_name}' to '{new_name}'...")
+            self.run_write(self.rename_btn, "Renaming...",
+                           lambda: self.config_store.rename_context(old_name, new_name), renamed, failed)
         elif ok and not new_name.strip():
             QMessageBox.warning(self, "Invalid Name", "New context name cannot be empty.")
 
+    def closeEvent(self, event):
+        """Let queued writes finish before the window goes away."""
+        self.worker.wait()
+        super().closeEvent(event)
+
 def main():
     """Main function to run the application."""
     app = QApplication(sys.argv)
@@ -0,0 +1,167 @@
+"""Non-blocking NKS context adds for the PySide GUI.
+
+The authenticator runs in a QProcess writing to a scratch kubeconfig, so
+the event loop keeps running; its output streams into a progress dialog
+that can cancel it. The result is merged into the real config when the
+process exits (KubeConfigManager.apply_nks_kubeconfig()).
+"""
+
+import os
+import shutil
+import tempfile
+
+from PySide6.QtCore import QObject, QProcess, Qt, QTimer, Signal
+from PySide6.QtGui import QTextCursor
+from PySide6.QtWidgets import QDialog, QDialogButtonBox, QLabel, QPlainTextEdit, QVBoxLayout
+
+from kube_config_nks import NKS_TIMEOUT, authenticator_error
+
+
+class NksAddJob(QObject):
+    """One ncp-iam-authenticator update-kubeconfig run with cancel and timeout."""
+
+    output = Signal(str)
+    # success, message
+    finished = Signal(bool, str)
+
+    def __init__(self, config_manager, cluster_uuid, region, alias=None, timeout=NKS_TIMEOUT, worker=None,
+                 parent=None):
+        super().__init__(parent)
+        self.config_manager = config_manager
+        self.cluster_uuid = cluster_uuid
+        self.region = region
+        self.alias = alias
+        self.timeout = timeout
+        # ConfigWorker to merge the result on, if the GUI uses one
+        self.worker = worker
+        self.process = None
+        self._staging_dir = None
+        self._stdout = []
+        self._stderr = []
+        # Why the process was stopped, if we stopped it
+        self._stop_reason = None
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(lambda: self._stop(f"Timed out after {self.timeout:g} s."))
+
+    @property
+    def label(self):
+        return self.alias or self.cluster_uuid
+
+    def is_running(self):
+        return self._staging_dir is not None
+
+    def start(self):
+        """Start the authenticator; failures to start are reported through finished."""
+        self._staging_dir = tempfile.mkdtemp(prefix='kcm-nks-')
+        self._kubeconfig = os.path.join(self._staging_dir, 'config')
+        try:
+            cmd = self.config_manager.nks_update_command(self.cluster_uuid, self.region, self.alias,
+                                                         self._kubeconfig)
+        except (FileNotFoundError, PermissionError) as e:
+            # Report after the caller had a chance to connect to finished
+            QTimer.singleShot(0, lambda: self._finish(False, str(e)))
+            return
+
+        self.process = QProcess(self)
+        self.process.setProgram(cmd[0])
+        self.process.setArguments(cmd[1:])
+        self.process.readyReadStandardOutput.connect(self._read_stdout)
+        self.process.readyReadStandardError.connect(self._read_stderr)
+        self.process.errorOccurred.connect(self._on_error)
+        self.process.finished.connect(self._on_finished)
+        self.output.emit(' '.join(cmd) + '\n')
+        self.process.start()
+        self._timer.start(int(self.timeout * 1000))
+
+    def cancel(self):
+        self._stop("Cancelled.")
+
+    def _stop(self, reason):
+        if self.process is not None and self.process.state() != QProcess.NotRunning:
+            self._stop_reason = reason
+            self.process.kill()
+
+    def _read_stdout(self):
+        text = bytes(self.process.readAllStandardOutput()).decode(errors='replace')
+        self._stdout.append(text)
+        self.output.emit(text)
+
+    def _read_stderr(self):
+        text = bytes(self.process.readAllStandardError()).decode(errors='replace')
+        self._stderr.append(text)
+        self.output.emit(text)
+
+    def _on_error(self, error):
+        if error == QProcess.FailedToStart:
+            self._finish(False, f"Could not start ncp-iam-authenticator: {self.process.errorString()}")
+
+    def _on_finished(self, exit_code, exit_status):
+        if self._stop_reason:
+            self._finish(False, self._stop_reason)
+        elif exit_status != QProcess.NormalExit or exit_code != 0:
+            self._finish(False, authenticator_error(self.process.program(), exit_code,
+                                                    ''.join(self._stdout), ''.join(self._stderr)))
+        elif self.worker is not None:
+            self.worker.write(lambda: self.config_manager.apply_nks_kubeconfig(self._kubeconfig),
+                              lambda result: self._merged(*result),
+                              lambda message: self._finish(False, message))
+        else:
+            self._merged(*self.config_manager.apply_nks_kubeconfig(self._kubeconfig))
+
+    def _merged(self, success, message):
+        if success:
+            message = f"NKS context '{self.label}' added/updated successfully."
+        self._finish(success, message)
+
+    def _finish(self, success, message):
+        if not self.is_running():
+            return
+        self._timer.stop()
+        shutil.rmtree(self._staging_dir, ignore_errors=True)
+        self._staging_dir = None
+        self.finished.emit(success, message)
+
+
+class NksProgressDialog(QDialog):
+    """Shows the output of an NksAddJob and lets the user cancel it."""
+
+    def __init__(self, job, parent=None):
+        super().__init__(parent)
+        self.job = job
+        # The dialog owns the job; both go away when the finished dialog is closed
+        job.setParent(self)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.setWindowTitle(f"Adding NKS Context: {job.label}")
+        self.resize(560, 320)
+        layout = QVBoxLayout(self)
+
+        self.status_label = QLabel(f"Running ncp-iam-authenticator for {job.cluster_uuid} ({job.region})...")
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+
+        self.log = QPlainTextEdit(self)
+        self.log.setReadOnly(True)
+        layout.addWidget(self.log)
+
+        self.buttons = QDialogButtonBox(QDialogButtonBox.Cancel, parent=self)
+        self.buttons.rejected.connect(self.reject)
+        layout.addWidget(self.buttons)
+
+        job.output.connect(self.append_output)
+        job.finished.connect(self.on_finished)
+
+    def append_output(self, text):
+        self.log.moveCursor(QTextCursor.End)
+        self.log.insertPlainText(text)
+
+    def on_finished(self, success, message):
+        self.status_label.setText(message if success else f"Failed: {message}")
+        self.buttons.setStandardButtons(QDialogButtonBox.Close)
+
+    def reject(self):
+        # Cancel while running, close once finished
+        if self.job.is_running():
+            self.job.cancel()
+        else:
+            super().reject()
@@ -0,0 +1,81 @@
+"""Quick-switch palette (Ctrl+K) for the PySide GUI.
+
+Every keystroke asks the ContextIndex for the best PALETTE_LIMIT matches,
+recently used contexts first; Enter switches to the highlighted one.
+"""
+
+from PySide6.QtCore import QEvent, Qt
+from PySide6.QtWidgets import QApplication, QDialog, QLabel, QLineEdit, QListWidget, QListWidgetItem, QVBoxLayout
+
+# Matches listed at once
+PALETTE_LIMIT = 50
+
+
+class QuickSwitchDialog(QDialog):
+    """Type to find a context, Enter to pick it; selected_name() is the choice."""
+
+    def __init__(self, index, recent=(), parent=None):
+        super().__init__(parent)
+        self.index = index
+        # Recently used context names, newest first
+        self.recent = list(recent)
+        self.setWindowTitle("Switch Context")
+        self.resize(560, 380)
+        layout = QVBoxLayout(self)
+
+        self.input = QLineEdit(self)
+        self.input.setPlaceholderText("Search contexts, clusters, users and namespaces")
+        self.input.installEventFilter(self)
+        layout.addWidget(self.input)
+
+        self.results = QListWidget(self)
+        self.results.setUniformItemSizes(True)
+        layout.addWidget(self.results)
+
+        self.hint = QLabel(self)
+        layout.addWidget(self.hint)
+
+        self.input.textChanged.connect(self.update_results)
+        self.input.returnPressed.connect(self.accept)
+        self.results.itemActivated.connect(self.accept)
+        self.update_results('')
+
+    def update_results(self, text):
+        # Rows, not names: the worker thread may re-index between two calls
+        rows = self.index.search_rows(text, PALETTE_LIMIT, self.recent)
+        recent = set(self.recent)
+        self.results.clear()
+        for name, cluster, user, namespace in rows:
+            item = QListWidgetItem(f"{name}    {cluster} · {namespace}")
+            item.setData(Qt.UserRole, name)
+            item.setToolTip(f"Cluster: {cluster}\nUser: {user}\nNamespace: {namespace}")
+            if name in recent:
+                font = item.font()
+                font.setBold(True)
+                item.setFont(font)
+            self.results.addItem(item)
+        if rows:
+            self.results.setCurrentRow(0)
+        if not rows:
+            self.hint.setText("No matching contexts")
+        elif len(rows) == PALETTE_LIMIT:
+            self.hint.setText(f"First {PALETTE_LIMIT} matches; keep typing to narrow down")
+        else:
+            self.hint.setText(f"{len(rows)} matches")
+
+    def selected_name(self):
+        """Return the highlighted context name, or None."""
+        item = self.results.currentItem()
+        return item.data(Qt.UserRole) if item is not None else None
+
+    def accept(self):
+        if self.selected_name() is not None:
+            super().accept()
+
+    def eventFilter(self, obj, event):
+        # Arrow keys in the search field move through the results
+        if obj is self.input and event.type() == QEvent.KeyPress and event.key() in (
+                Qt.Key_Up, Qt.Key_Down, Qt.Key_PageUp, Qt.Key_PageDown):
+            QApplication.sendEvent(self.results, event)
+            return True
+        return super().eventFilter(obj, event)
@@ -0,0 +1,161 @@
+"""Table model of the contexts for the PySide GUI.
+
+A refresh hands the model a new listing and the model works out what
+changed by context name: rows that went away are removed, new rows are
+inserted, changed rows get dataChanged, and a reorder is a layout change
+that keeps persistent indexes. Views therefore keep their selection and
+scroll position, and nothing is rebuilt when nothing changed.
+"""
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, QSortFilterProxyModel, Qt
+from PySide6.QtGui import QFont
+
+COLUMNS = ('Context Name', 'Cluster', 'User', 'Namespace')
+# Context name of a row, in every column
+NAME_ROLE = Qt.UserRole
+# Column value without decoration, for sorting
+SORT_ROLE = Qt.UserRole + 1
+CURRENT_MARK = '★ '
+
+
+def context_row(context):
+    """Return the (name, cluster, user, namespace) row of a context entry."""
+    body = context.get('context') or {}
+    return (context['name'], body.get('cluster', '') or '', body.get('user', '') or '',
+            body.get('namespace', 'default') or 'default')
+
+
+class ContextTableModel(QAbstractTableModel):
+    """Contexts of a listing, one row each, updated incrementally by name."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+        # name -> row number
+        self._index = {}
+        self.current_context = ''
+        self._bold = QFont()
+        self._bold.setBold(True)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            if index.column() == 0 and row[0] == self.current_context:
+                return CURRENT_MARK + row[0]
+            return row[index.column()]
+        if role == SORT_ROLE:
+            return row[index.column()]
+        if role == NAME_ROLE:
+            return row[0]
+        if role == Qt.FontRole and row[0] == self.current_context:
+            return self._bold
+        return None
+
+    def row_of(self, name):
+        """Return the row number of the context called name, or -1."""
+        return self._index.get(name, -1)
+
+    def name_at(self, row):
+        return self._rows[row][0]
+
+    def set_listing(self, contexts, current_context):
+        """Update the model to a (contexts, current context) listing with minimal notifications."""
+        new_rows = []
+        seen = set()
+        for context in contexts:
+            if context.get('name') is None or context['name'] in seen:
+                continue
+            seen.add(context['name'])
+            new_rows.append(context_row(context))
+        wanted = {row[0]: row for row in new_rows}
+
+        # Remove, bottom up so the row numbers of pending ranges stay valid
+        gone = [i for i, row in enumerate(self._rows) if row[0] not in wanted]
+        for first, last in reversed(_ranges(gone)):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._rows[first:last + 1]
+            self.endRemoveRows()
+        self._reindex()
+
+        # Change in place
+        old_current = self.current_context
+        self.current_context = current_context
+        last_column = len(COLUMNS) - 1
+        for i, row in enumerate(self._rows):
+            new = wanted[row[0]]
+            if new != row or (old_current != current_context and row[0] in (old_current, current_context)):
+                self._rows[i] = new
+                self.dataChanged.emit(self.index(i, 0), self.index(i, last_column))
+
+        # Append the new names
+        added = [row for row in new_rows if row[0] not in self._index]
+        if added:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(added) - 1)
+            self._rows.extend(added)
+            self.endInsertRows()
+            self._reindex()
+
+        # Follow the file order, moving persistent indexes (selection) along
+        if [row[0] for row in self._rows] != [row[0] for row in new_rows]:
+            self.layoutAboutToBeChanged.emit()
+            old_rows = self._rows
+            self._rows = new_rows
+            self._reindex()
+            old_indexes = self.persistentIndexList()
+            new_indexes = [self.index(self._index[old_rows[index.row()][0]], index.column())
+                           for index in old_indexes]
+            self.changePersistentIndexList(old_indexes, new_indexes)
+            self.layoutChanged.emit()
+
+    def _reindex(self):
+        self._index = {row[0]: i for i, row in enumerate(self._rows)}
+
+
+def _ranges(numbers):
+    """Group sorted numbers into (first, last) runs."""
+    runs = []
+    for number in numbers:
+        if runs and runs[-1][1] == number - 1:
+            runs[-1][1] = number
+        else:
+            runs.append([number, number])
+    return [tuple(run) for run in runs]
+
+
+class ContextSortProxy(QSortFilterProxyModel):
+    """Sorts on the undecorated values, case-insensitively; unsorted keeps the file order.
+
+    Shows only the contexts named in a filter set, if one is given (the
+    search box fills it from a ContextIndex).
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSortRole(SORT_ROLE)
+        self.setSortCaseSensitivity(Qt.CaseInsensitive)
+        self.setDynamicSortFilter(True)
+        self._names = None
+
+    def set_filter_names(self, names):
+        """Show only the contexts in names, or all of them for None."""
+        if names is None and self._names is None:
+            return
+        self._names = names
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        return self._names is None or self.sourceModel().name_at(source_row) in self._names
@@ -0,0 +1,56 @@
+"""Live reload of the kubeconfig for the PySide GUI.
+
+QFileSystemWatcher follows the config files and their directories: a file
+replaced by rename drops out of the watcher, so it is added again after
+every event, and the directory catches the rename itself. Events are
+debounced (kube_config_watch.Debouncer); once a burst settles and no
+write of our own is queued, changed is emitted if the files differ from
+what the manager last read or wrote.
+"""
+
+import os
+
+from PySide6.QtCore import QFileSystemWatcher, QObject, QTimer, Signal
+
+from kube_config_watch import DEBOUNCE, Debouncer
+
+
+class ConfigFileWatcher(QObject):
+    """Emits changed once per burst of outside changes to the config files."""
+
+    changed = Signal()
+
+    def __init__(self, config_manager, worker=None, parent=None):
+        super().__init__(parent)
+        self.config_manager = config_manager
+        # ConfigWorker whose queued writes must land before we compare
+        self.worker = worker
+        self.debouncer = Debouncer()
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._settle)
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self._on_event)
+        self.watcher.directoryChanged.connect(self._on_event)
+        self._rewatch()
+
+    def _rewatch(self):
+        files, dirs = self.config_manager.watch_paths()
+        wanted = set(files) | set(dirs) | {os.path.dirname(path) for path in files}
+        watched = set(self.watcher.files()) | set(self.watcher.directories())
+        missing = sorted(path for path in wanted - watched if os.path.exists(path))
+        if missing:
+            self.watcher.addPaths(missing)
+
+    def _on_event(self, path):
+        self._rewatch()
+        self.timer.start(int(self.debouncer.delay() * 1000))
+
+    def _settle(self):
+        if self.worker is not None and self.worker.is_busy():
+            # A save of ours may still be in flight; look again when it is done
+            self.timer.start(int(DEBOUNCE * 1000))
+            return
+        self.debouncer.reset()
+        if self.config_manager.changed_on_disk():
+            self.changed.emit()
@@ -0,0 +1,106 @@
+"""Background config I/O for the PySide GUI.
+
+Every parse and write of the kubeconfig runs on a QThreadPool instead of
+the GUI thread, and results come back through queued signals. The pool
+has a single thread: KubeConfigManager's caches are not meant to be used
+from several threads at once, and one thread also keeps writes in the
+order they were requested. Reads are keyed, and a newer read with the same
+key supersedes an older one: a read that has not started yet is dropped,
+and the result of one already running is discarded.
+"""
+
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+class TaskSignals(QObject):
+    # Returned value of the task function
+    result = Signal(object)
+    # Message of the exception the task function raised
+    error = Signal(str)
+    done = Signal()
+
+
+class Task(QRunnable):
+    """Runs a function on the pool and reports through its signals."""
+
+    def __init__(self, fn):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.fn = fn
+        self.signals = TaskSignals()
+
+    def run(self):
+        try:
+            value = self.fn()
+        except Exception as e:
+            self.signals.error.emit(str(e))
+        else:
+            self.signals.result.emit(value)
+        self.signals.done.emit()
+
+
+class ConfigWorker(QObject):
+    """Queue of kubeconfig reads and writes run off the GUI thread."""
+
+    # True while any task is queued or running
+    busy_changed = Signal(bool)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)
+        self._pending = set()
+        # key -> the latest read task with that key
+        self._latest = {}
+
+    def is_busy(self):
+        return bool(self._pending)
+
+    def read(self, key, fn, on_result=None, on_error=None):
+        """Run fn in the background unless a newer read with key arrives first."""
+        previous = self._latest.get(key)
+        if previous is not None and self.pool.tryTake(previous):
+            self._forget(previous)
+        task = Task(fn)
+        self._latest[key] = task
+        self._connect(task, on_result, on_error, key)
+        self._submit(task)
+        return task
+
+    def write(self, fn, on_result=None, on_error=None):
+        """Run fn in the background after every task queued before it."""
+        task = Task(fn)
+        self._connect(task, on_result, on_error)
+        self._submit(task)
+        return task
+
+    def wait(self, msecs=-1):
+        """Block until the queue is empty (used on shutdown)."""
+        return self.pool.waitForDone(msecs)
+
+    def _connect(self, task, on_result, on_error, key=None):
+        def superseded():
+            return key is not None and self._latest.get(key) is not task
+
+        if on_result is not None:
+            task.signals.result.connect(lambda value: None if superseded() else on_result(value))
+        if on_error is not None:
+            task.signals.error.connect(lambda message: None if superseded() else on_error(message))
+        task.signals.done.connect(lambda: self._forget(task))
+
+    def _submit(self, task):
+        was_busy = self.is_busy()
+        self._pending.add(task)
+        self.pool.start(task)
+        if not was_busy:
+            self.busy_changed.emit(True)
+
+    def _forget(self, task):
+        if task not in self._pending:
+            return
+        self._pending.discard(task)
+        for key, latest in list(self._latest.items()):
+            if latest is task:
+                del self._latest[key]
+        if not self.is_busy():
+            self.busy_changed.emit(False)
@@ -6,7 +6,23 @@ import os
 # Add current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from kube_context_pyside_gui import main
+from kube_context_cli import COMMANDS
+
+
+def wants_cli(argv):
+    """Whether to run the command-line interface instead of the GUI (never loads Qt)."""
+    if os.path.splitext(os.path.basename(argv[0]))[0] == 'kcm':
+        return True
+    return len(argv) > 1 and argv[1] in COMMANDS + ('-h', '--help')
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # Import workers of a frozen app re-run this script; let them be workers, not another GUI
+    import multiprocessing
+    multiprocessing.freeze_support()
+    if wants_cli(sys.argv):
+        from kube_context_cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
+
+    from kube_context_pyside_gui import main
+    main()
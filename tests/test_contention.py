@@ -0,0 +1,67 @@
+"""Several processes and a lock-ignoring tool updating one kubeconfig lose no writes."""
+
+import multiprocessing
+import time
+
+import yaml
+
+from kube_config_manager import ConfigConflict, KubeConfigManager
+
+PROCESSES = 4
+OPS = 20
+
+
+def contention_worker(path: str, worker: int, ops: int) -> list:
+    """Add ops contexts, rename every other one and return the names of updates that gave up."""
+    manager = KubeConfigManager(path, durability='none')
+    gave_up = []
+    for i in range(ops):
+        name = f'w{worker}-{i}'
+        try:
+            with manager.batch() as tx:
+                tx.merge_config({'clusters': [{'name': name, 'cluster': {'server': f'https://{name}'}}],
+                                 'contexts': [{'name': name, 'context': {'cluster': name, 'user': name}}],
+                                 'users': [{'name': name, 'user': {'token': name}}]})
+        except ConfigConflict:
+            gave_up.append(name)
+            continue
+        if i % 2 and not manager.rename_context(name, f'{name}-renamed')[0]:
+            gave_up.append(name)
+    return gave_up
+
+
+def foreign_writer(path: str, stop):
+    """Touch the file the way another tool would: appended comments, no lock."""
+    while not stop.is_set():
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('# touched by another tool\n')
+        time.sleep(0.05)
+
+
+def test_concurrent_writers_lose_nothing(tmp_path):
+    path = str(tmp_path / 'config')
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump({'apiVersion': 'v1', 'kind': 'Config', 'current-context': 'base',
+                        'clusters': [{'name': 'base', 'cluster': {'server': 'https://base'}}],
+                        'contexts': [{'name': 'base', 'context': {'cluster': 'base', 'user': 'base'}}],
+                        'users': [{'name': 'base', 'user': {'token': 'base'}}]}, f)
+
+    stop = multiprocessing.Event()
+    toucher = multiprocessing.Process(target=foreign_writer, args=(path, stop))
+    toucher.start()
+    try:
+        with multiprocessing.Pool(PROCESSES) as pool:
+            results = pool.starmap(contention_worker, [(path, worker, OPS) for worker in range(PROCESSES)])
+    finally:
+        stop.set()
+        toucher.join()
+
+    assert [name for gave_up in results for name in gave_up] == []
+    expected = {f'w{worker}-{i}-renamed' if i % 2 else f'w{worker}-{i}'
+                for worker in range(PROCESSES) for i in range(OPS)} | {'base'}
+    manager = KubeConfigManager(path, use_snapshot=False)
+    assert {context['name'] for context in manager.get_contexts()} == expected
+    config = manager.load_config()
+    names = {f'w{worker}-{i}' for worker in range(PROCESSES) for i in range(OPS)} | {'base'}
+    assert {cluster['name'] for cluster in config['clusters']} == names
+    assert {user['name'] for user in config['users']} == names
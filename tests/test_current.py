@@ -0,0 +1,51 @@
+"""Reading current-context without a full parse (kube_config_current)."""
+
+import os
+
+import yaml
+
+from kube_config_current import kubeconfig_paths, read_current_context, scan_current_context
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_kubeconfig.yaml')
+
+
+def test_sample_config():
+    with open(SAMPLE, 'rb') as f:
+        data = f.read()
+    assert scan_current_context(data) == yaml.safe_load(data)['current-context'] == 'docker-desktop'
+    assert read_current_context([SAMPLE]) == 'docker-desktop'
+
+
+def test_kubeconfig_paths_like_kubectl():
+    assert kubeconfig_paths(os.pathsep.join(['/a', '', '/b', '/a'])) == ['/a', '/b']
+    assert kubeconfig_paths('') == [os.path.expanduser('~/.kube/config')]
+
+
+def test_first_file_that_sets_it_wins(tmp_path):
+    first = tmp_path / 'first'
+    second = tmp_path / 'second'
+    first.write_text('apiVersion: v1\ncontexts: []\n')
+    second.write_text("current-context: 'prod' # set by kubectl\n")
+    assert read_current_context([str(tmp_path / 'missing'), str(first), str(second)]) == 'prod'
+
+
+def test_multi_line_quoted_and_flow_values_go_to_the_parser():
+    # PyYAML continues these values on unindented lines, so the first key line is not a key
+    for document in (b'foo: "abc\ncurrent-context: evil"\ncurrent-context: real\n',
+                     b"foo: 'abc\ncurrent-context: evil'\ncurrent-context: real\n",
+                     b"foo: 'it''s\ncurrent-context: evil'\ncurrent-context: real\n",
+                     b'foo: [a,\ncurrent-context: evil]\ncurrent-context: real\n',
+                     b'foo: {a: b,\ncurrent-context: evil}\ncurrent-context: real\n',
+                     b'foo: abc\ncurrent-context: evil"\n'):
+        assert scan_current_context(document) is None, document
+
+
+def test_quotes_closed_on_their_line_are_scanned(tmp_path):
+    document = ('foo: "a \\" b" # unbalanced " in a comment\n'
+                'bar: [\'x\', "y]", {z: \'it\'\'s\'}]\n'
+                "token: it's\n"
+                'current-context: "real"\n')
+    assert scan_current_context(document.encode()) == yaml.safe_load(document)['current-context'] == 'real'
+    path = tmp_path / 'config'
+    path.write_text('foo: "abc\ncurrent-context: evil"\ncurrent-context: real\n')
+    assert read_current_context([str(path)]) == 'real'
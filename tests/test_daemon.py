@@ -0,0 +1,113 @@
+"""Clients of the daemon tell outside changes from their own writes."""
+
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+from kube_config_daemon import DaemonManager, connect, serve, through_daemon
+from kube_config_manager import KubeConfigManager
+from kube_config_model import KubeConfigModel
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sample_kubeconfig.yaml')
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    path = str(tmp_path / 'config')
+    shutil.copy(SAMPLE, path)
+    socket_path = str(tmp_path / 'kcm.sock')
+    thread = threading.Thread(target=serve, args=(KubeConfigManager(path), socket_path), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 5
+    while not os.path.exists(socket_path):
+        assert time.monotonic() < deadline, "the daemon did not start"
+        time.sleep(0.01)
+    yield path, socket_path
+    client = connect([path], socket_path)
+    client.request('shutdown')
+    client.close()
+    thread.join(5)
+
+
+def test_own_writes_are_not_changes(daemon):
+    path, socket_path = daemon
+    manager = KubeConfigManager(path)
+    store = through_daemon(manager, socket_path)
+    assert isinstance(store, DaemonManager)
+    assert store.watch_paths() == manager.watch_paths()
+
+    # Nothing seen yet
+    assert store.changed_on_disk()
+    assert store.get_context_listing()[1] == 'docker-desktop'
+    assert not store.changed_on_disk()
+    store.set_current_context('minikube')
+    assert not store.changed_on_disk()
+    assert store.rename_context('minikube', 'mk')[0]
+    assert not store.changed_on_disk()
+    # The GUI's own manager never had to parse the file
+    assert manager.get_cache_stats()['misses'] == 0
+
+
+def test_other_clients_and_programs_are_changes(daemon):
+    path, socket_path = daemon
+    store = through_daemon(KubeConfigManager(path), socket_path)
+    store.get_context_listing()
+
+    through_daemon(KubeConfigManager(path), socket_path).set_current_context('minikube')
+    assert store.changed_on_disk()
+    assert store.get_context_listing()[1] == 'minikube'
+    assert not store.changed_on_disk()
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('# touched by another tool\n')
+    assert store.changed_on_disk()
+
+
+def test_malformed_commits_leave_the_writer_running(daemon, monkeypatch):
+    path, socket_path = daemon
+    client = connect([path], socket_path)
+    with pytest.raises(ValueError):
+        client.request('commit', operations=[['rename_context', {'old_name': 'minikube', 'new_name': 5}]])
+
+    # A request that passes validation but breaks inside the model fails alone
+    def broken(model, old_name, new_name):
+        raise AttributeError("broken")
+    monkeypatch.setattr(KubeConfigModel, 'rename_context', broken)
+    with pytest.raises(ValueError, match='broken'):
+        client.request('commit', operations=[['rename_context', {'old_name': 'minikube', 'new_name': 'mk'}]])
+    client.close()
+
+    store = through_daemon(KubeConfigManager(path), socket_path)
+    store.set_current_context('minikube')
+    assert store.get_current_context() == 'minikube'
+    assert KubeConfigManager(path).get_current_context() == 'minikube'
+
+
+def test_import_through_the_daemon_spawns_its_workers(daemon, tmp_path, monkeypatch):
+    import concurrent.futures
+
+    import kube_config_import
+
+    path, socket_path = daemon
+    folder = tmp_path / 'imports'
+    folder.mkdir()
+    for i in range(kube_config_import.PARALLEL_MIN_SOURCES):
+        (folder / f'c{i}.yaml').write_text(
+            f"clusters: [{{name: c{i}, cluster: {{server: 'https://c{i}'}}}}]\n"
+            f"contexts: [{{name: c{i}, context: {{cluster: c{i}, user: u{i}}}}}]\n"
+            f"users: [{{name: u{i}, user: {{token: t{i}}}}}]\n")
+    methods = []
+
+    class Recording(concurrent.futures.ProcessPoolExecutor):
+        def __init__(self, *args, mp_context=None, **kwargs):
+            methods.append(mp_context.get_start_method() if mp_context is not None else None)
+            super().__init__(*args, mp_context=mp_context, **kwargs)
+    monkeypatch.setattr(concurrent.futures, 'ProcessPoolExecutor', Recording)
+
+    store = through_daemon(KubeConfigManager(path), socket_path)
+    success, reports = store.import_contexts([str(folder)], workers=2)
+    assert success and sum(len(report['added']) for report in reports) == 3 * len(reports)
+    assert methods == ['spawn']
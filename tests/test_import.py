@@ -0,0 +1,82 @@
+"""Bulk import from a directory, a tar and a zip (kube_config_import)."""
+
+import io
+import tarfile
+import zipfile
+
+import yaml
+
+from kube_config_manager import KubeConfigManager
+
+
+def kubeconfig(context, cluster, user, server='https://example'):
+    return {'apiVersion': 'v1', 'kind': 'Config',
+            'clusters': [{'name': cluster, 'cluster': {'server': server}}],
+            'contexts': [{'name': context, 'context': {'cluster': cluster, 'user': user}}],
+            'users': [{'name': user, 'user': {'token': user}}]}
+
+
+def names(report, kind):
+    return {section: entries for section, entries in report[kind].items() if entries}
+
+
+def test_import_directory_tar_and_zip_in_one_save(tmp_path):
+    path = tmp_path / 'config'
+    path.write_text(yaml.safe_dump(dict(kubeconfig('base', 'shared', 'base', 'https://base'),
+                                        **{'current-context': 'base'})), encoding='utf-8')
+    manager = KubeConfigManager(str(path), use_snapshot=False)
+
+    folder = tmp_path / 'dir'
+    (folder / 'nested').mkdir(parents=True)
+    (folder / 'nested' / 'a.yaml').write_text(yaml.safe_dump(kubeconfig('dir-ctx', 'dir-c', 'dir-u')))
+    (folder / 'notes.txt').write_text('just some notes\n')
+    (folder / '.hidden.yaml').write_text(yaml.safe_dump(kubeconfig('hidden', 'h', 'h')))
+
+    # Same cluster name, different server: the context is added and uses the existing cluster
+    tar_path = tmp_path / 'configs.tar.gz'
+    data = yaml.safe_dump(kubeconfig('tar-ctx', 'shared', 'base', 'https://elsewhere')).encode()
+    with tarfile.open(tar_path, 'w:gz') as archive:
+        info = tarfile.TarInfo('team/t.yaml')
+        info.size = len(data)
+        archive.addfile(info, io.BytesIO(data))
+
+    zip_path = tmp_path / 'configs.zip'
+    with zipfile.ZipFile(zip_path, 'w') as archive:
+        archive.writestr('z.yaml', yaml.safe_dump(kubeconfig('zip-ctx', 'zip-c', 'zip-u')))
+        archive.writestr('again.yaml', yaml.safe_dump(kubeconfig('dir-ctx', 'dir-c', 'dir-u')))
+
+    success, reports = manager.import_contexts([str(folder), str(tar_path), str(zip_path)])
+    assert success
+    assert manager.get_write_stats()['writes'] == 1
+
+    by_source = {report['source']: report for report in reports}
+    assert list(by_source) == [str(folder / 'notes.txt'), str(folder / 'nested' / 'a.yaml'),
+                               f'{tar_path}:team/t.yaml', f'{zip_path}:z.yaml', f'{zip_path}:again.yaml']
+    notes, directory, tar, zipped, again = reports
+    assert names(directory, 'added') == {'clusters': ['dir-c'], 'contexts': ['dir-ctx'], 'users': ['dir-u']}
+    assert notes['error'] == 'not a kubeconfig file' and not names(notes, 'added')
+    assert names(tar, 'added') == {'contexts': ['tar-ctx']}
+    assert names(tar, 'skipped') == {'users': ['base']}
+    assert names(tar, 'conflicts') == {'clusters': ['shared']}
+    assert names(zipped, 'added') == {'clusters': ['zip-c'], 'contexts': ['zip-ctx'], 'users': ['zip-u']}
+    assert names(again, 'skipped') == {'clusters': ['dir-c'], 'contexts': ['dir-ctx'], 'users': ['dir-u']}
+    assert not names(again, 'added') and not names(again, 'conflicts')
+
+    config = yaml.safe_load(path.read_text(encoding='utf-8'))
+    assert [context['name'] for context in config['contexts']] == ['base', 'dir-ctx', 'tar-ctx', 'zip-ctx']
+    assert config['clusters'][0] == {'name': 'shared', 'cluster': {'server': 'https://base'}}
+    assert [cluster['name'] for cluster in config['clusters']] == ['shared', 'dir-c', 'zip-c']
+    assert config['current-context'] == 'base'
+
+
+def test_parallel_and_serial_parsing_agree(tmp_path):
+    folder = tmp_path / 'many'
+    folder.mkdir()
+    for i in range(12):
+        (folder / f'c{i:02d}.yaml').write_text(yaml.safe_dump(kubeconfig(f'c{i}', f'c{i}', f'u{i}')))
+    results = []
+    for workers in (1, 2):
+        path = tmp_path / f'config-{workers}'
+        path.write_text(yaml.safe_dump(kubeconfig('base', 'base', 'base')), encoding='utf-8')
+        results.append(KubeConfigManager(str(path), use_snapshot=False).import_contexts([str(folder)], workers))
+    assert results[0] == results[1] and results[0][0]
@@ -0,0 +1,77 @@
+"""Multi-file KUBECONFIG: first file wins, changes go back to the owning file."""
+
+import os
+
+import pytest
+import yaml
+
+from kube_config_manager import KubeConfigManager
+
+
+def entry(section, name, **body):
+    key = {'clusters': 'cluster', 'contexts': 'context', 'users': 'user'}[section]
+    return {'name': name, key: body}
+
+
+def write(path, clusters=(), contexts=(), users=(), current=''):
+    document = {'apiVersion': 'v1', 'kind': 'Config', 'current-context': current,
+                'clusters': [entry('clusters', name, server=f'https://{name}') for name in clusters],
+                'contexts': [entry('contexts', name, cluster=cluster, user=user)
+                             for name, cluster, user in contexts],
+                'users': [entry('users', name, token=name) for name in users]}
+    path.write_text(yaml.safe_dump(document))
+
+
+def names(path, section):
+    return [item['name'] for item in yaml.safe_load(path.read_text()).get(section) or []]
+
+
+@pytest.fixture
+def two_files(tmp_path, monkeypatch):
+    a, b = tmp_path / 'a', tmp_path / 'b'
+    write(a, ['c-new'], [('prod', 'c-new', 'u-new')], ['u-new'], current='prod')
+    write(b, ['cb'], [('other', 'cb', 'ub'), ('prod', 'cb', 'ub')], ['ub'])
+    monkeypatch.setenv('KUBECONFIG', os.pathsep.join([str(a), str(b)]))
+    return a, b
+
+
+def test_first_file_wins(two_files):
+    contexts, current = KubeConfigManager(use_snapshot=False).get_context_listing()
+    assert current == 'prod'
+    assert {context['name']: context['context']['cluster'] for context in contexts} == \
+        {'prod': 'c-new', 'other': 'cb'}
+
+
+def test_delete_keeps_entries_a_shadowed_context_uses(two_files):
+    a, b = two_files
+    assert KubeConfigManager(use_snapshot=False).delete_context('other')
+    assert names(b, 'contexts') == ['prod']
+    assert names(b, 'clusters') == ['cb']
+    assert names(b, 'users') == ['ub']
+    assert names(a, 'clusters') == ['c-new']
+
+
+def test_delete_removes_entries_nothing_in_the_file_uses(two_files):
+    a, b = two_files
+    manager = KubeConfigManager(use_snapshot=False)
+    with manager.batch() as tx:
+        tx.delete_context('other')
+        tx.delete_context('prod')
+    # b's prod is visible now that a's is gone
+    assert names(a, 'contexts') == [] and names(a, 'clusters') == [] and names(a, 'users') == []
+    assert names(b, 'contexts') == ['prod']
+    assert manager.delete_context('prod')
+    assert names(b, 'contexts') == [] and names(b, 'clusters') == [] and names(b, 'users') == []
+
+
+def test_batch_import_of_malformed_yaml_is_rejected(two_files, tmp_path):
+    a, b = two_files
+    before = a.read_bytes(), b.read_bytes()
+    broken = tmp_path / 'broken'
+    broken.write_text('contexts: [unclosed\n')
+    manager = KubeConfigManager(use_snapshot=False)
+    with pytest.raises(ValueError, match="Cannot import '.*broken'"):
+        with manager.batch() as tx:
+            tx.delete_context('other')
+            tx.add_context_from_file(str(broken))
+    assert (a.read_bytes(), b.read_bytes()) == before
@@ -0,0 +1,47 @@
+"""KubeConfigModel indexing and edits (kube_config_model)."""
+
+import pytest
+import yaml
+
+from kube_config_manager import KubeConfigManager
+from kube_config_model import KubeConfigModel
+
+
+def duplicated():
+    return {
+        'current-context': 'x',
+        'clusters': [{'name': 'c1', 'cluster': {}}, {'name': 'c2', 'cluster': {}}, {'name': 'shared', 'cluster': {}}],
+        'contexts': [{'name': 'x', 'context': {'cluster': 'c1', 'user': 'u1'}},
+                     {'name': 'y', 'context': {'cluster': 'shared', 'user': 'u2'}},
+                     {'name': 'x', 'context': {'cluster': 'c2', 'user': 'u2'}}],
+        'users': [{'name': 'u1', 'user': {}}, {'name': 'u2', 'user': {}}],
+    }
+
+
+def test_first_duplicate_wins():
+    model = KubeConfigModel(duplicated())
+    assert model.contexts.get('x')['context']['cluster'] == 'c1'
+    assert model.cluster_refs['c2'] == 1
+
+
+def test_delete_removes_every_entry_with_the_name():
+    model = KubeConfigModel(duplicated())
+    assert model.delete_context('x')['context']['cluster'] == 'c1'
+    assert model.contexts.names() == ['y']
+    assert model.current_context == ''
+    # c1, c2 and u1 are no longer used; u2 still is, by y
+    assert model.clusters.names() == ['shared']
+    assert model.users.names() == ['u2']
+    assert dict(model.cluster_refs) == {'shared': 1} and dict(model.user_refs) == {'u2': 1}
+    with pytest.raises(ValueError):
+        model.delete_context('x')
+
+
+def test_manager_delete_with_duplicates(tmp_path):
+    path = tmp_path / 'config'
+    path.write_text(yaml.safe_dump(duplicated()), encoding='utf-8')
+    manager = KubeConfigManager(str(path), use_snapshot=False)
+    assert manager.delete_context('x')
+    document = yaml.safe_load(path.read_text(encoding='utf-8'))
+    assert [context['name'] for context in document['contexts']] == ['y']
+    assert [user['name'] for user in document['users']] == ['u2']
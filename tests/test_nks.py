@@ -0,0 +1,129 @@
+"""NKS provisioning and region sync, with the fake authenticator from benchmark.py and a stub lister."""
+
+import json
+import sys
+
+import pytest
+import yaml
+
+import kube_config_manager
+from benchmark import write_fake_authenticator
+from kube_config_manager import KubeConfigManager
+from kube_config_nks import list_region_clusters, plan_region_sync
+
+
+@pytest.fixture
+def authenticator(tmp_path):
+    directory = tmp_path / 'bin'
+    directory.mkdir()
+    return write_fake_authenticator(str(directory), 0)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    path = tmp_path / 'config'
+    path.write_text(yaml.safe_dump({
+        'apiVersion': 'v1', 'kind': 'Config', 'current-context': 'local',
+        'clusters': [{'name': 'local', 'cluster': {'server': 'https://127.0.0.1:6443'}}],
+        'contexts': [{'name': 'local', 'context': {'cluster': 'local', 'user': 'local'}}],
+        'users': [{'name': 'local', 'user': {'token': 'local'}}]}), encoding='utf-8')
+    return KubeConfigManager(str(path), use_snapshot=False)
+
+
+def test_batch_adds_what_succeeded_in_one_save(manager, authenticator):
+    clusters = [('c1', 'KR'), ('missing-1', 'KR'), ('flaky-1', 'KR', 'flaky-alias')]
+    success, results = manager.add_nks_contexts(clusters, authenticator, concurrency=3)
+
+    assert not success
+    by_uuid = {result['cluster_uuid']: result for result in results}
+    assert by_uuid['c1']['ok'] and by_uuid['c1']['attempts'] == 1
+    assert not by_uuid['missing-1']['ok'] and 'not found' in by_uuid['missing-1']['message']
+    assert by_uuid['flaky-1']['ok'] and by_uuid['flaky-1']['attempts'] == 2
+
+    assert manager.get_write_stats()['writes'] == 1
+    config = manager.load_config()
+    assert [context['name'] for context in config['contexts']] == ['local', 'nks_kr_c1', 'flaky-alias']
+    assert [user['name'] for user in config['users']] == ['local', 'nks_kr_c1', 'flaky-alias']
+    assert config['current-context'] == 'local'
+
+
+def test_single_add_switches_to_the_new_context(manager, authenticator):
+    success, message = manager.add_nks_context('c2', 'KR', authenticator_path=authenticator)
+    assert success, message
+    assert manager.get_current_context() == 'nks_kr_c2'
+
+
+def stub_lister(clusters, returncode=0):
+    """A lister command printing clusters as JSON, in place of the ncloud CLI."""
+    script = f"import sys; print({json.dumps({'clusters': clusters})!r}); sys.exit({returncode})"
+    return [sys.executable, '-c', script, '{region}']
+
+
+def server(uuid):
+    # What the fake authenticator writes
+    return f'https://{uuid}.kr.vnks.ntruss.com'
+
+
+def test_list_region_clusters_with_a_stub():
+    listing = [{'uuid': 'a', 'name': 'one', 'endpoint': server('a')}, {'clusterUuid': 'b', 'name': 'two'}]
+    assert list_region_clusters('KR', stub_lister(listing)) == [
+        {'uuid': 'a', 'name': 'one', 'endpoint': server('a')}, {'uuid': 'b', 'name': 'two', 'endpoint': None}]
+    with pytest.raises(OSError):
+        list_region_clusters('KR', stub_lister([], returncode=3))
+    with pytest.raises(ValueError):
+        list_region_clusters('KR', stub_lister([{'name': 'no uuid'}]))
+    with pytest.raises(ValueError):
+        list_region_clusters('KR', [sys.executable, '-c', 'print("not json")'])
+
+
+@pytest.fixture
+def synced(manager, authenticator):
+    """A config with KR clusters same, moved and gone, and SG cluster elsewhere."""
+    assert manager.add_nks_contexts([('same', 'KR'), ('moved', 'KR'), ('gone', 'KR'), ('elsewhere', 'SG')],
+                                    authenticator)[0]
+    return manager
+
+
+def test_plan_region_sync_classifies_clusters(synced):
+    listing = [{'uuid': 'same', 'endpoint': server('same') + '/'}, {'uuid': 'moved', 'endpoint': 'https://new'},
+               {'uuid': 'fresh', 'endpoint': server('fresh')}]
+    plan = plan_region_sync(synced.load_model(), 'kr', listing)
+    assert [cluster['uuid'] for cluster in plan['new']] == ['fresh']
+    assert [(cluster['uuid'], cluster['context']) for cluster in plan['changed']] == [('moved', 'nks_kr_moved')]
+    assert [(cluster['uuid'], cluster['context']) for cluster in plan['unchanged']] == [('same', 'nks_kr_same')]
+    # The SG cluster is not listed either, but belongs to another region
+    assert plan['stale'] == ['nks_kr_gone']
+
+
+def test_sync_region_prunes_in_one_save(synced, authenticator, monkeypatch):
+    listing = [{'uuid': 'same', 'endpoint': server('same')}, {'uuid': 'moved', 'endpoint': 'https://new'},
+               {'uuid': 'fresh', 'endpoint': server('fresh')}]
+    # Another tool renames the stale context while the authenticator runs; pruning must follow it
+    run_batch = kube_config_manager.run_update_kubeconfig_batch
+
+    def run_and_rename(*args, **kwargs):
+        results = run_batch(*args, **kwargs)
+        assert KubeConfigManager(synced.config_path, use_snapshot=False).rename_context('nks_kr_gone', 'old-kr')[0]
+        return results
+    monkeypatch.setattr(kube_config_manager, 'run_update_kubeconfig_batch', run_and_rename)
+
+    writes = synced.get_write_stats()['writes']
+    success, report = synced.sync_nks_region('KR', prune=True, lister=stub_lister(listing),
+                                             authenticator_path=authenticator)
+    assert success, report
+    assert synced.get_write_stats()['writes'] == writes + 1
+    assert [cluster['uuid'] for cluster in report['new']] == ['fresh']
+    assert [cluster['uuid'] for cluster in report['changed']] == ['moved']
+    assert [cluster['uuid'] for cluster in report['unchanged']] == ['same']
+    assert report['stale'] == ['nks_kr_gone']
+    assert report['pruned'] == ['old-kr']
+    assert sorted(result['cluster_uuid'] for result in report['results']) == ['fresh', 'moved']
+    assert sorted(context['name'] for context in synced.get_contexts()) == [
+        'local', 'nks_kr_fresh', 'nks_kr_moved', 'nks_kr_same', 'nks_sg_elsewhere']
+
+
+def test_sync_region_without_prune_keeps_stale_contexts(synced, authenticator):
+    success, report = synced.sync_nks_region('KR', lister=stub_lister([]), authenticator_path=authenticator)
+    assert success
+    assert sorted(report['stale']) == ['nks_kr_gone', 'nks_kr_moved', 'nks_kr_same'] and report['pruned'] == []
+    assert len(synced.get_contexts()) == 5
@@ -0,0 +1,73 @@
+"""ContextIndex ranking and filtering."""
+
+import threading
+
+from kube_config_search import ContextIndex, _subsequence_pattern
+
+
+def context(name, cluster='', user='', namespace=''):
+    return {'name': name, 'context': {'cluster': cluster or name, 'user': user or name, 'namespace': namespace}}
+
+
+def make_index():
+    index = ContextIndex()
+    index.update([context('payments-prod', 'prod-eu'), context('payments-dev', 'dev-eu'),
+                  context('search-prod', 'prod-us', namespace='payments'), context('minikube')])
+    return index
+
+
+def test_subsequence_pattern_compiles_on_every_supported_python():
+    pattern = _subsequence_pattern('pyprd')
+    assert pattern.search('payments-prod')
+    assert not pattern.search('payments-dev')
+    assert _subsequence_pattern('a]^-\\').pattern
+
+
+def test_multi_character_search_ranks_tiers():
+    index = make_index()
+    assert index.search('pay') == ['payments-prod', 'payments-dev', 'search-prod']
+    assert index.search('payments-dev')[0] == 'payments-dev'
+    assert index.search('pyprd') == ['payments-prod']
+    assert index.search('mi') == ['minikube']
+
+
+def test_search_with_typo_and_recent():
+    index = make_index()
+    assert index.search('payments-prad')[:2] == ['payments-prod', 'payments-dev']
+    assert index.search('pay', recent=['payments-dev'])[0] == 'payments-dev'
+
+
+def test_matches_filters_unranked():
+    index = make_index()
+    assert index.matches('prod') == {'payments-prod', 'search-prod'}
+    assert index.matches('') == {'payments-prod', 'payments-dev', 'search-prod', 'minikube'}
+
+
+def test_update_reindexes_changed_contexts():
+    index = make_index()
+    index.update([context('payments-prod', 'prod-ap'), context('minikube')])
+    assert index.search('pay') == ['payments-prod']
+    assert index.fields('payments-prod')[1] == 'prod-ap'
+
+
+def test_search_rows_stay_consistent_while_reindexing():
+    index = make_index()
+    assert index.search_rows('search') == [('search-prod', 'prod-us', 'search-prod', 'payments')]
+
+    listings = [[context(f'ctx-{i}', 'a') for i in range(200)], [context(f'ctx-{i}', 'b') for i in range(0, 200, 2)]]
+    stop = threading.Event()
+
+    def reindex():
+        while not stop.is_set():
+            for listing in listings:
+                index.update(listing)
+
+    thread = threading.Thread(target=reindex)
+    thread.start()
+    try:
+        for _ in range(200):
+            for name, cluster, user, namespace in index.search_rows('ctx', 50):
+                assert (cluster, user, namespace) == ('a' if cluster == 'a' else 'b', name, 'default')
+    finally:
+        stop.set()
+        thread.join()
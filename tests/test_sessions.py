@@ -0,0 +1,129 @@
+"""Per-terminal session overlays (kube_config_sessions)."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+import yaml
+
+import kube_config_manager
+from kube_config_manager import KubeConfigManager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def contexts_of(path):
+    document = yaml.safe_load(open(path)) or {}
+    return {entry['name']: (entry.get('context') or {}).get('namespace') for entry in document.get('contexts') or []}
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    """A shared config with contexts x and y, and a session started at x in namespace web."""
+    shared = tmp_path / 'config'
+    shared.write_text(yaml.safe_dump({
+        'apiVersion': 'v1', 'kind': 'Config', 'current-context': 'y',
+        'clusters': [{'name': 'c', 'cluster': {'server': 'https://c'}}],
+        'contexts': [{'name': 'x', 'context': {'cluster': 'c', 'user': 'u', 'namespace': 'default'}},
+                     {'name': 'y', 'context': {'cluster': 'c', 'user': 'u'}}],
+        'users': [{'name': 'u', 'user': {'token': 't'}}]}))
+    monkeypatch.setattr(kube_config_manager, 'SESSION_DIR', str(tmp_path / 'sessions'))
+    monkeypatch.delenv('KUBECONFIG', raising=False)
+    success, value = KubeConfigManager(str(shared)).start_session('s1', 'x', 'web')
+    assert success
+    monkeypatch.setenv('KUBECONFIG', value)
+    overlay = value.split(os.pathsep)[0]
+    return shared, overlay
+
+
+def listing(manager):
+    contexts, current = manager.get_context_listing()
+    return {context['name']: context['context'].get('namespace') for context in contexts}, current
+
+
+def test_session_overrides_namespace_and_current(session):
+    shared, overlay = session
+    assert listing(KubeConfigManager()) == ({'x': 'web', 'y': None}, 'x')
+    assert contexts_of(shared) == {'x': 'default', 'y': None}
+    assert yaml.safe_load(open(shared))['current-context'] == 'y'
+
+
+def test_rename_in_session_renames_shared_context(session):
+    shared, overlay = session
+    manager = KubeConfigManager()
+    assert manager.rename_context('x', 'z')[0]
+    assert contexts_of(shared) == {'z': 'default', 'y': None}
+    assert contexts_of(overlay) == {'z': 'web'}
+    assert yaml.safe_load(open(overlay))['current-context'] == 'z'
+    assert listing(KubeConfigManager()) == ({'z': 'web', 'y': None}, 'z')
+
+
+def test_delete_in_session_deletes_shared_context(session):
+    shared, overlay = session
+    assert KubeConfigManager().delete_context('x')
+    assert contexts_of(shared) == {'y': None}
+    assert contexts_of(overlay) == {}
+    assert listing(KubeConfigManager()) == ({'y': None}, 'y')
+
+
+def test_switch_in_session_leaves_shared_file(session):
+    shared, overlay = session
+    before = shared.read_bytes()
+    KubeConfigManager().set_current_context('y')
+    assert shared.read_bytes() == before
+    assert listing(KubeConfigManager())[1] == 'y'
+
+
+def test_overlays_leave_no_sidecar_files(session, tmp_path):
+    shared, overlay = session
+    manager = KubeConfigManager()
+    manager.get_context_listing()
+    manager.set_current_context('y')
+    assert os.listdir(os.path.dirname(overlay)) == [os.path.basename(overlay)]
+    assert manager.end_session('s1')[0]
+    assert os.listdir(os.path.dirname(overlay)) == []
+
+
+def test_gc_removes_dead_sessions_and_stray_sidecars(tmp_path):
+    from kube_config_sessions import collect_sessions, overlay_path
+
+    directory = str(tmp_path)
+    dead = overlay_path('pid-999999999', directory)
+    alive = overlay_path(f'pid-{os.getpid()}', directory)
+    for path in (dead, alive):
+        with open(path, 'w') as f:
+            f.write('current-context: x\n')
+    # Left by earlier versions next to overlays
+    for name in (os.path.basename(dead), os.path.basename(alive), 'gone.yaml'):
+        for suffix in ('.kcm-cache', '.kcm-lock'):
+            open(os.path.join(directory, f'.{name}{suffix}'), 'w').close()
+    assert collect_sessions(directory) == [dead]
+    assert sorted(os.listdir(directory)) == sorted([os.path.basename(alive), f'.{os.path.basename(alive)}.kcm-cache',
+                                                    f'.{os.path.basename(alive)}.kcm-lock'])
+
+
+def test_session_of_an_exited_process_is_dead(tmp_path):
+    from kube_config_sessions import overlay_path, session_alive
+
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    for pid, alive in ((process.pid, False), (os.getpid(), True)):
+        path = overlay_path(f'pid-{pid}', str(tmp_path))
+        with open(path, 'w') as f:
+            f.write('current-context: x\n')
+        assert session_alive(path) is alive
+
+
+def test_frozen_session_id_skips_the_bootloader():
+    # The middle process stands in for the PyInstaller bootloader: same executable, exits with kcm
+    probe = "import sys; sys.frozen = {}; import kube_config_sessions; print(kube_config_sessions.shell_pid())"
+    middle = ("import subprocess, sys; sys.exit(subprocess.run([sys.executable, '-c', {!r}]).returncode)")
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.pop('KCM_SESSION', None)
+    frozen = subprocess.run([sys.executable, '-c', middle.format(probe.format(True))],
+                            stdout=subprocess.PIPE, env=env, check=True)
+    assert int(frozen.stdout) == os.getpid()
+    plain = subprocess.run([sys.executable, '-c', middle.format(probe.format(False))],
+                           stdout=subprocess.PIPE, env=env, check=True)
+    assert int(plain.stdout) != os.getpid()
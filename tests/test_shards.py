@@ -0,0 +1,46 @@
+"""Sharded storage keeps the copies of shared clusters and users in step."""
+
+import pytest
+import yaml
+
+from kube_config_manager import KubeConfigManager
+from kube_config_shards import shard_paths, split_config
+
+
+@pytest.fixture
+def shard_dir(tmp_path):
+    source = tmp_path / 'config'
+    source.write_text(yaml.safe_dump({
+        'apiVersion': 'v1', 'kind': 'Config', 'current-context': 'a',
+        'clusters': [{'name': 'shared', 'cluster': {'server': 'https://old'}}],
+        'contexts': [{'name': name, 'context': {'cluster': 'shared', 'user': 'admin'}} for name in ('a', 'b')],
+        'users': [{'name': 'admin', 'user': {'token': 'old'}}]}), encoding='utf-8')
+    directory = str(tmp_path / 'config.d')
+    assert split_config(str(source), directory) == 2
+    return directory
+
+
+def shard_entries(directory, section):
+    entries = []
+    for path in shard_paths(directory):
+        with open(path, encoding='utf-8') as f:
+            entries.extend(yaml.safe_load(f)[section])
+    return entries
+
+
+def test_updates_reach_every_copy(shard_dir):
+    manager = KubeConfigManager(shard_dir=shard_dir)
+    config = manager.load_config()
+    config['clusters'][0]['cluster']['server'] = 'https://new'
+    config['users'][0]['user']['token'] = 'new'
+    assert manager.save_config(config)
+
+    assert [entry['cluster']['server'] for entry in shard_entries(shard_dir, 'clusters')] == ['https://new'] * 2
+    assert [entry['user']['token'] for entry in shard_entries(shard_dir, 'users')] == ['new'] * 2
+
+    # With the owning shard gone, the other copy must not bring the old values back
+    assert manager.delete_context('a')
+    config = KubeConfigManager(shard_dir=shard_dir).load_config()
+    assert [context['name'] for context in config['contexts']] == ['b']
+    assert config['clusters'] == [{'name': 'shared', 'cluster': {'server': 'https://new'}}]
+    assert config['users'] == [{'name': 'admin', 'user': {'token': 'new'}}]
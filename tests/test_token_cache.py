@@ -0,0 +1,60 @@
+"""The exec-credential cache, against the fake ncp-iam-authenticator from benchmark.py."""
+
+import json
+import os
+import subprocess
+
+import pytest
+
+from benchmark import write_fake_authenticator
+from kube_config_token_cache import wrap_user
+
+
+@pytest.fixture
+def authenticator(tmp_path):
+    directory = tmp_path / 'bin'
+    directory.mkdir()
+    return write_fake_authenticator(str(directory), 0)
+
+
+def run_exec(exec_config, cache_dir):
+    """Run an exec plugin the way kubectl does and return its ExecCredential."""
+    process = subprocess.run([exec_config['command']] + exec_config['args'], stdout=subprocess.PIPE,
+                             env=dict(os.environ, KCM_TOKEN_CACHE_DIR=cache_dir), check=True)
+    return json.loads(process.stdout)
+
+
+def test_token_cache_hits_until_expiry(authenticator, tmp_path):
+    cache_dir = str(tmp_path / 'tokens')
+    user = {'name': 'nks', 'user': {'exec': {'command': authenticator,
+                                             'args': ['token', '--clusterUuid', 'c1', '--region', 'KR']}}}
+    exec_config = wrap_user(user)['user']['exec']
+
+    # The fake authenticator puts the time into every token, so equal tokens mean a cache hit
+    first = run_exec(exec_config, cache_dir)
+    assert run_exec(exec_config, cache_dir) == first
+    assert run_exec(user['user']['exec'], cache_dir) != first
+
+    cached = [name for name in os.listdir(cache_dir) if name.endswith('.json')]
+    assert len(cached) == 1
+    path = os.path.join(cache_dir, cached[0])
+    with open(path, 'r', encoding='utf-8') as f:
+        credential = json.load(f)
+    credential['status']['expirationTimestamp'] = '2000-01-01T00:00:00Z'
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(credential, f)
+
+    renewed = run_exec(exec_config, cache_dir)
+    assert renewed['status']['token'] != first['status']['token']
+    assert run_exec(exec_config, cache_dir) == renewed
+
+
+def test_token_cache_keys_by_cluster(authenticator, tmp_path):
+    cache_dir = str(tmp_path / 'tokens')
+    tokens = set()
+    for uuid in ('c1', 'c2'):
+        user = {'name': uuid, 'user': {'exec': {'command': authenticator,
+                                                'args': ['token', '--clusterUuid', uuid, '--region', 'KR']}}}
+        tokens.add(run_exec(wrap_user(user)['user']['exec'], cache_dir)['status']['token'])
+    assert len(tokens) == 2
+    assert len([name for name in os.listdir(cache_dir) if name.endswith('.json')]) == 2
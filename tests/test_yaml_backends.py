@@ -0,0 +1,164 @@
+"""The libyaml and pure-Python YAML backends must read and write kubeconfigs identically."""
+
+import base64
+import os
+import shutil
+
+import pytest
+import yaml
+
+from kube_config_manager import DEFAULT_YAML_BACKEND, YAML_BACKENDS, KubeConfigManager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE = os.path.join(ROOT, 'sample_kubeconfig.yaml')
+
+needs_libyaml = pytest.mark.skipif('libyaml' not in YAML_BACKENDS, reason='PyYAML built without libyaml')
+
+
+def certificate_config() -> str:
+    """Contexts with long base64 payloads, like kubectl writes them."""
+    data = base64.b64encode(os.urandom(3000)).decode()
+    document = {'apiVersion': 'v1', 'kind': 'Config', 'preferences': {}, 'current-context': 'ctx-0',
+                'clusters': [], 'contexts': [], 'users': []}
+    for i in range(20):
+        document['clusters'].append({'name': f'cluster-{i}', 'cluster': {
+            'server': f'https://10.0.0.{i}:6443', 'certificate-authority-data': data}})
+        document['contexts'].append({'name': f'ctx-{i}', 'context': {'cluster': f'cluster-{i}', 'user': f'user-{i}'}})
+        document['users'].append({'name': f'user-{i}', 'user': {'client-certificate-data': data,
+                                                               'client-key-data': data[::-1]}})
+    return yaml.safe_dump(document, default_flow_style=False)
+
+
+# Scalars that need quoting or escapes, non-ASCII names, flow style and comments
+TRICKY_CONFIG = """\
+apiVersion: v1
+kind: Config
+# written by hand
+current-context: "개발-클러스터"
+preferences: {colors: true}
+clusters:
+- name: "yes"
+  cluster: {server: 'https://[::1]:6443', insecure-skip-tls-verify: true}
+- name: '0123'
+  cluster:
+    server: https://example.com
+    extensions:
+    - name: note
+      extension: {text: "tab\\there, quote ' and \\" and: colon # not a comment"}
+contexts:
+- name: "개발-클러스터"
+  context: {cluster: "yes", user: "null", namespace: ''}
+- name: ünïcode
+  context:
+    cluster: '0123'
+    user: ~
+users:
+- name: "null"
+  user:
+    exec:
+      apiVersion: client.authentication.k8s.io/v1beta1
+      command: ncp-iam-authenticator
+      args: [token, --clusterUuid, 1e10, --region, KR]
+      env: null
+- name: multi
+  user:
+    token: |
+      line one
+      line two
+"""
+
+
+def samples():
+    with open(SAMPLE, 'r', encoding='utf-8') as f:
+        sample = f.read()
+    return {'sample_kubeconfig.yaml': sample, 'certificates': certificate_config(), 'tricky': TRICKY_CONFIG}
+
+
+SAMPLES = samples()
+
+
+def test_default_backend_is_reported():
+    assert DEFAULT_YAML_BACKEND == ('libyaml' if getattr(yaml, '__with_libyaml__', False) else 'python')
+    assert KubeConfigManager(SAMPLE, create=False).yaml_backend == DEFAULT_YAML_BACKEND
+    assert KubeConfigManager(SAMPLE, yaml_backend='python', create=False).yaml_backend == 'python'
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        KubeConfigManager(SAMPLE, yaml_backend='nope', create=False)
+
+
+@needs_libyaml
+@pytest.mark.parametrize('name', sorted(SAMPLES))
+def test_loaders_agree(name):
+    documents = [yaml.load(SAMPLES[name], Loader=YAML_BACKENDS[backend][0]) for backend in ('python', 'libyaml')]
+    assert documents[0] == documents[1]
+
+
+@needs_libyaml
+@pytest.mark.parametrize('name', sorted(SAMPLES))
+def test_dumpers_agree(name, tmp_path):
+    document = yaml.safe_load(SAMPLES[name])
+    outputs = [KubeConfigManager(str(tmp_path / backend), yaml_backend=backend, create=False)._dump_yaml(document)
+               for backend in ('python', 'libyaml')]
+    assert outputs[0] == outputs[1]
+    assert yaml.safe_load(outputs[0]) == document
+
+
+@needs_libyaml
+@pytest.mark.parametrize('name', sorted(SAMPLES))
+def test_saved_files_agree(name, tmp_path):
+    """Switch (spliced), rename (spliced) and a full rewrite give the same bytes with either backend."""
+    results = []
+    for backend in ('python', 'libyaml'):
+        path = tmp_path / backend / 'config'
+        path.parent.mkdir()
+        path.write_text(SAMPLES[name], encoding='utf-8')
+        manager = KubeConfigManager(str(path), yaml_backend=backend, use_snapshot=False)
+        contexts, current = manager.get_context_listing()
+        other = next(context['name'] for context in contexts if context['name'] != current)
+        manager.set_current_context(other)
+        spliced = path.read_bytes()
+        assert manager.rename_context(other, 'renamed')[0]
+        renamed = path.read_bytes()
+        assert manager.save_model(manager.load_model(), rewrite=True)
+        results.append((spliced, renamed, path.read_bytes(), manager.load_config()))
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize('backend', sorted(YAML_BACKENDS))
+def test_sample_round_trip(backend, tmp_path):
+    path = tmp_path / 'config'
+    shutil.copy(SAMPLE, path)
+    manager = KubeConfigManager(str(path), yaml_backend=backend, use_snapshot=False)
+    with open(SAMPLE, 'r', encoding='utf-8') as f:
+        original = yaml.safe_load(f)
+    assert manager.load_config() == original
+    assert manager.save_config(original)
+    assert yaml.safe_load(path.read_text(encoding='utf-8')) == original
+
+
+@pytest.mark.parametrize('use_snapshot', [False, True])
+@pytest.mark.parametrize('backend', sorted(YAML_BACKENDS))
+def test_crlf_files_keep_their_line_endings(backend, use_snapshot, tmp_path):
+    """Spliced entries of a CRLF file are written with CRLF too."""
+    path = tmp_path / 'config'
+    with open(SAMPLE, 'r', encoding='utf-8') as f:
+        original = yaml.safe_load(f)
+    path.write_bytes(yaml.safe_dump(original).replace('\n', '\r\n').encode('utf-8'))
+    addition = tmp_path / 'addition'
+    addition.write_text(yaml.safe_dump({
+        'clusters': [{'name': 'added', 'cluster': {'server': 'https://added'}}],
+        'contexts': [{'name': 'added', 'context': {'cluster': 'added', 'user': 'added'}}],
+        'users': [{'name': 'added', 'user': {'token': 'added'}}]}))
+    manager = KubeConfigManager(str(path), yaml_backend=backend, use_snapshot=use_snapshot)
+    manager.load_model()
+    assert manager.add_context_from_file(str(addition))
+    manager.set_current_context('added')
+    assert manager.rename_context('added', 'renamed')[0]
+    data = path.read_bytes()
+    assert data.count(b'\n') == data.count(b'\r\n')
+    document = yaml.safe_load(data)
+    assert document['current-context'] == 'renamed'
+    assert [context['name'] for context in document['contexts']][-1] == 'renamed'
+    assert document['clusters'] == original['clusters'] + [{'name': 'added', 'cluster': {'server': 'https://added'}}]